@@ -0,0 +1,175 @@
+"""
+Kommandozeilenbefehle für ByteDohm (flask <befehl>)
+Für Cronjobs und Wartungsaufgaben außerhalb der Web-Requests
+"""
+
+import click
+from app import app
+from backend.services.background_jobs import job_manager
+
+
+@app.cli.command('poll-tracking')
+@click.option('--batch-size', type=int, default=None, help='Bestellungen pro Datenbank-Seite')
+@click.option('--workers', type=int, default=None, help='Parallele DHL-Anfragen')
+@click.option('--rate', type=float, default=None, help='Maximale DHL-Anfragen pro Sekunde')
+def poll_tracking_command(batch_size, workers, rate):
+    """Versendete Bestellungen bei DHL abgleichen und Zustellungen übernehmen"""
+    from backend.services.email_service import email_queue
+    from backend.services.tracking_poller import poll_shipped_orders
+
+    summary = job_manager.run_inline('poll_tracking', poll_shipped_orders,
+                                     batch_size=batch_size, max_workers=workers,
+                                     rate_per_second=rate, created_by='cli')
+    if summary is None:
+        raise click.ClickException('Tracking-Abgleich fehlgeschlagen - siehe Log')
+
+    # Warteschlange vor Prozessende abarbeiten, sonst gehen E-Mails verloren
+    email_queue.join()
+    click.echo(f"Geprüft: {summary['checked']}, zugestellt: {summary['delivered']}, "
+               f"Fehler: {summary['errors']}")
+
+
+@app.cli.command('rebuild-customer-stats')
+@click.option('--batch-size', type=int, default=1000, help='Kunden pro Transaktion')
+def rebuild_customer_stats_command(batch_size):
+    """Kundenkennzahlen (customer_stats) vollständig aus den Bestellungen aufbauen"""
+    from backend.services.order_rollups import rebuild_customer_stats
+
+    total = rebuild_customer_stats(batch_size=batch_size)
+    click.echo(f"Kennzahlen für {total} Kunden neu aufgebaut")
+
+
+@app.cli.command('rebuild-daily-rollups')
+@click.option('--days-per-batch', type=int, default=31, help='Tage pro Transaktion')
+def rebuild_daily_rollups_command(days_per_batch):
+    """Tageskennzahlen (Umsatz, Status, Artikel, Kunden) vollständig aus den Bestellungen aufbauen"""
+    from backend.services.daily_rollups import rebuild_daily_rollups
+
+    total = rebuild_daily_rollups(days_per_batch=days_per_batch)
+    click.echo(f"Tageskennzahlen für {total} Tage neu aufgebaut")
+
+
+@app.cli.command('rebuild-search-index')
+@click.option('--batch-size', type=int, default=1000, help='Kunden pro Transaktion')
+def rebuild_search_index_command(batch_size):
+    """Kunden-Suchindex (customer_search_index) vollständig aufbauen"""
+    from backend.services.customer_search import rebuild_search_index
+
+    total = rebuild_search_index(batch_size=batch_size)
+    click.echo(f"Suchindex für {total} Kunden aufgebaut")
+
+
+@app.cli.command('upgrade-schema')
+@click.option('--allow-locking', is_flag=True, help='Indizes notfalls mit Tabellensperre anlegen')
+def upgrade_schema_command(allow_locking):
+    """Fehlende Spalten und Indizes anlegen - Indizes online (ALGORITHM=INPLACE, LOCK=NONE)"""
+    from app import db
+    from backend.config.schema_upgrade import upgrade_schema
+
+    changes = upgrade_schema(db.engine, db.metadata, allow_locking=allow_locking)
+    for change in changes:
+        click.echo(change)
+    click.echo(f"{len(changes)} Schema-Änderungen ausgeführt")
+
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Ausführungspläne der häufigsten Abfragen prüfen (EXPLAIN) - schlägt bei Full Table Scans fehl"""
+    from backend.utils.query_plans import check_query_plans
+
+    report = check_query_plans()
+    if report.get('error'):
+        raise click.ClickException(report['error'])
+    for entry in report['results']:
+        click.echo(f"{entry['name']:32} type={entry['type']} key={entry['key']} rows={entry['rows']}")
+    for entry in report['warnings']:
+        click.echo(f"Hinweis: {entry['name']} liest die (kleine) Tabelle komplett", err=True)
+    if report['regressions']:
+        names = ', '.join(entry['name'] for entry in report['regressions'])
+        raise click.ClickException(f"Full Table Scan bei: {names}")
+    click.echo('Alle Abfragen nutzen ihren Index')
+
+
+@app.cli.command('check-query-counts', with_appcontext=False)
+def check_query_counts_command():
+    """SQL-Anweisungen je Bestellseite bei 1 und N Zeilen zählen - schlägt fehl, wenn sie mit N wachsen"""
+    from backend.utils.query_counts import check_query_counts
+
+    report = check_query_counts()
+    for entry in report['results']:
+        click.echo(f"{entry['name']:24} Zeilen {entry['rows'][0]}/{entry['rows'][1]}  "
+                   f"Anweisungen {entry['statements'][0]}/{entry['statements'][1]}")
+    for name in report['skipped']:
+        click.echo(f"Hinweis: {name} übersprungen - keine Daten mit mehreren Zeilen", err=True)
+    if report['regressions']:
+        names = ', '.join(entry['name'] for entry in report['regressions'])
+        raise click.ClickException(f"Anweisungen wachsen mit der Zeilenzahl bei: {names}")
+    click.echo('Keine Seite lädt Beziehungen einzeln nach')
+
+
+@app.cli.command('run-retention')
+@click.option('--batch-size', type=int, default=None, help='Zeilen pro DELETE-Stapel')
+@click.option('--pause', type=float, default=None, help='Pause zwischen Stapeln in Sekunden')
+@click.option('--dry-run', is_flag=True, help='Nur zählen, nichts löschen')
+def run_retention_command(batch_size, pause, dry_run):
+    """Abgelaufene Sessions und alte anonyme Konfigurationen löschen (für Cronjobs)"""
+    from backend.services.data_retention import run_retention
+
+    summary = job_manager.run_inline('retention', run_retention, batch_size=batch_size, pause=pause,
+                                     dry_run=dry_run, created_by='cli')
+    if summary is None:
+        raise click.ClickException('Aufbewahrungslauf fehlgeschlagen - siehe Log')
+
+    for name, metrics in summary['policies'].items():
+        if dry_run:
+            click.echo(f"{name:28} würde löschen: {metrics['candidates']}")
+        else:
+            click.echo(f"{name:28} gelöscht: {metrics['deleted']} "
+                       f"({metrics['batches']} Stapel, {metrics['seconds']}s)")
+    if not dry_run:
+        click.echo(f"Insgesamt gelöscht: {summary['deleted']}")
+
+
+@app.cli.command('archive-orders')
+@click.option('--months', type=int, default=None, help='Abgeschlossene Bestellungen älter als N Monate')
+@click.option('--batch-size', type=int, default=None, help='Bestellungen pro Transaktion')
+@click.option('--max-batches', type=int, default=None, help='Höchstens so viele Stapel je Lauf')
+def archive_orders_command(months, batch_size, max_batches):
+    """Gelieferte/stornierte alte Bestellungen samt Positionen und Rechnungen ins Archiv verschieben"""
+    from backend.services.order_archive import archive_orders
+
+    summary = job_manager.run_inline('archive_orders', archive_orders, months=months,
+                                     batch_size=batch_size, max_batches=max_batches, created_by='cli')
+    if summary is None:
+        raise click.ClickException('Archivierung fehlgeschlagen - siehe Log')
+    click.echo(f"Archiviert: {summary['archived']} Bestellungen in {summary['batches']} Stapeln "
+               f"({summary['seconds']}s, vor {summary['cutoff']})")
+
+
+@app.cli.command('init-db')
+@click.option('--allow-locking', is_flag=True, help='Indizes notfalls mit Tabellensperre anlegen')
+@click.option('--seed', is_flag=True, help='Anschließend Admin und Beispieldaten anlegen')
+def init_db_command(allow_locking, seed):
+    """Tabellen anlegen und Schema abgleichen (einmalig bei Installation und nach Updates)"""
+    from backend.config.database_setup import init_database, seed_database
+
+    changes = init_database(allow_locking=allow_locking)
+    for change in changes:
+        click.echo(change)
+    click.echo(f"Datenbank bereit ({len(changes)} Schema-Änderungen)")
+    if seed:
+        _echo_seed(seed_database())
+
+
+@app.cli.command('seed')
+def seed_command():
+    """Standard-Admin, Beispielkomponenten und Fertig-PCs anlegen (nur in leere Tabellen)"""
+    from backend.config.database_setup import seed_database
+
+    _echo_seed(seed_database())
+
+
+def _echo_seed(created):
+    if created['admin']:
+        click.echo('Admin angelegt: admin / admin123 - Passwort sofort ändern!')
+    click.echo(f"Beispieldaten: {created['components']} Komponenten, {created['prebuilts']} Fertig-PCs")
@@ -0,0 +1,101 @@
+"""
+Schema-Abgleich für bestehende Datenbanken
+db.create_all() legt nur fehlende Tabellen an - neue Spalten und Indizes bestehender Tabellen ergänzt dieses Modul
+"""
+
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+
+def _missing_columns(table, existing):
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        if not column.nullable and column.server_default is None and not column.primary_key:
+            # Pflichtspalte ohne Server-Default kann nicht automatisch ergänzt werden
+            logging.warning(f"Schema: Spalte {table.name}.{column.name} fehlt und ist NOT NULL - bitte manuell migrieren")
+            continue
+        yield column
+
+
+def _index_statement(engine, table, index, online=True):
+    """
+    ALTER TABLE ... ADD INDEX für MySQL - online ohne Schreibsperre (ALGORITHM=INPLACE, LOCK=NONE)
+
+    MySQL bricht mit einem Fehler ab, statt die Tabelle zu sperren, wenn die Änderung
+    nicht online möglich ist. FULLTEXT-Indizes erlauben höchstens LOCK=SHARED.
+    """
+    preparer = engine.dialect.identifier_preparer
+    prefix = index.dialect_options['mysql'].get('prefix')
+    kind = 'UNIQUE INDEX' if index.unique else f'{prefix} INDEX' if prefix else 'INDEX'
+    columns = ', '.join(preparer.quote(column.name) for column in index.columns)
+    statement = (f"ALTER TABLE {preparer.quote(table.name)} "
+                 f"ADD {kind} {preparer.quote(index.name)} ({columns})")
+    if online:
+        lock = 'SHARED' if prefix == 'FULLTEXT' else 'NONE'
+        statement += f", ALGORITHM=INPLACE, LOCK={lock}"
+    return statement
+
+
+def upgrade_schema(engine, metadata, allow_locking=False):
+    """
+    Fehlende nullable Spalten und Indizes aller Modelle ergänzen
+
+    Indizes werden auf MySQL online angelegt. Ist das nicht möglich, wird der Index
+    übersprungen (Warnung) - außer allow_locking=True (z.B. im Wartungsfenster).
+
+    Args:
+        engine: SQLAlchemy Engine
+        metadata: db.metadata der Modelle
+        allow_locking (bool): Indizes notfalls mit Tabellensperre anlegen
+
+    Returns:
+        list: ausgeführte Änderungen
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    changes = []
+
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {c['name'] for c in inspector.get_columns(table.name)}
+        preparer = engine.dialect.identifier_preparer
+        for column in _missing_columns(table, existing_columns):
+            column_type = column.type.compile(dialect=engine.dialect)
+            statement = (f"ALTER TABLE {preparer.quote(table.name)} "
+                         f"ADD COLUMN {preparer.quote(column.name)} {column_type} NULL")
+            with engine.begin() as connection:
+                connection.execute(text(statement))
+            changes.append(statement)
+
+        existing_indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            if engine.dialect.name != 'mysql':
+                with engine.begin() as connection:
+                    index.create(bind=connection)
+                changes.append(f"CREATE INDEX {index.name} ON {table.name}")
+                continue
+
+            statement = _index_statement(engine, table, index)
+            try:
+                with engine.begin() as connection:
+                    connection.execute(text(statement))
+            except (OperationalError, ProgrammingError) as e:
+                if not allow_locking:
+                    logging.warning(f"Schema: Index {table.name}.{index.name} nicht online möglich - "
+                                    f"übersprungen ({e.orig}). 'flask upgrade-schema --allow-locking' "
+                                    f"im Wartungsfenster ausführen")
+                    continue
+                statement = _index_statement(engine, table, index, online=False)
+                with engine.begin() as connection:
+                    connection.execute(text(statement))
+            changes.append(statement)
+
+    for change in changes:
+        logging.info(f"Schema aktualisiert: {change}")
+    return changes
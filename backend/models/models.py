@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime
+from sqlalchemy import func
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 import json
@@ -19,6 +20,10 @@ class AdminUser(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
     
+    def get_id(self):
+        # Typed id - admins and customers share one Flask-Login manager
+        return f'admin:{self.id}'
+    
     def __repr__(self):
         return f'<AdminUser {self.username}>'
 
@@ -31,6 +36,10 @@ class Configuration(db.Model):
     customer_id = db.Column(db.Integer, nullable=True)  # Link to customer (no FK for now)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_configurations_customer_created', 'customer_id', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<Configuration {self.name}>'
 
@@ -42,6 +51,11 @@ class Component(db.Model):
     price = db.Column(db.Float, nullable=False)
     specifications = db.Column(db.Text, nullable=False)  # JSON string of specs
     is_active = db.Column(db.Boolean, default=True)
+    # Versanddaten - leer = Standardgewicht der Kategorie
+    weight_kg = db.Column(db.Float, nullable=True)
+    length_cm = db.Column(db.Float, nullable=True)
+    width_cm = db.Column(db.Float, nullable=True)
+    height_cm = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -54,6 +68,14 @@ class Component(db.Model):
     def set_specs(self, specs_dict):
         self.specifications = json.dumps(specs_dict)
     
+    # Keyset-Pagination der Admin-Liste (created_at, id)
+    __table_args__ = (
+        db.Index('ix_components_created_id', 'created_at', 'id'),
+        db.Index('ix_components_category_created', 'category', 'created_at', 'id'),
+        # Katalog des Konfigurators
+        db.Index('ix_components_category_active', 'category', 'is_active'),
+    )
+    
     def __repr__(self):
         return f'<Component {self.name}>'
 
@@ -68,6 +90,11 @@ class PrebuiltPC(db.Model):
     specifications = db.Column(db.Text, nullable=False)  # JSON string of specs
     features = db.Column(db.Text, nullable=False)  # JSON string of features list
     is_active = db.Column(db.Boolean, default=True)
+    # Versanddaten - leer = Standardgewicht für Komplett-PCs
+    weight_kg = db.Column(db.Float, nullable=True)
+    length_cm = db.Column(db.Float, nullable=True)
+    width_cm = db.Column(db.Float, nullable=True)
+    height_cm = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -112,6 +139,13 @@ class Customer(UserMixin, db.Model):
     # Relationships
     orders = db.relationship('Order', backref='customer', lazy=True)
     
+    __table_args__ = (
+        db.Index('ix_customers_created_id', 'created_at', 'id'),
+        # Login, Checkout und Gastbestellungen suchen Kunden per E-Mail
+        db.Index('ix_customers_email', 'email'),
+        db.Index('ix_customers_newsletter', 'newsletter_subscription'),
+    )
+    
     def set_password(self, password):
         """Set password hash"""
         from werkzeug.security import generate_password_hash
@@ -124,6 +158,10 @@ class Customer(UserMixin, db.Model):
             return False
         return check_password_hash(self.password_hash, password)
     
+    def get_id(self):
+        # Typed id - admins and customers share one Flask-Login manager
+        return f'customer:{self.id}'
+    
     def get_full_name(self):
         """Get full name"""
         if self.first_name and self.last_name:
@@ -135,16 +173,27 @@ class Customer(UserMixin, db.Model):
         return self.address or ''
     
     def get_order_count(self):
-        """Get total number of orders"""
-        return len(self.orders)
+        """Get total number of orders (from the customer_stats rollup)"""
+        stats = db.session.get(CustomerStats, self.id)
+        if stats:
+            return stats.order_count or 0
+        return db.session.query(func.count(Order.id)).filter(Order.customer_id == self.id).scalar()
     
     def get_total_spent(self):
-        """Get total amount spent"""
-        return sum(order.total_amount for order in self.orders if order.payment_status == 'paid')
+        """Get total amount spent (from the customer_stats rollup)"""
+        stats = db.session.get(CustomerStats, self.id)
+        if stats:
+            return stats.paid_total or 0.0
+        return db.session.query(func.coalesce(func.sum(Order.total_amount), 0.0)).filter(
+            Order.customer_id == self.id,
+            Order.payment_status == 'paid'
+        ).scalar()
     
     def get_recent_orders(self, limit=5):
-        """Get recent orders"""
-        return sorted(self.orders, key=lambda x: x.created_at, reverse=True)[:limit]
+        """Get recent orders (uses the customer_id/created_at index)"""
+        return Order.query.filter_by(customer_id=self.id).order_by(
+            Order.created_at.desc(), Order.id.desc()
+        ).limit(limit).all()
     
     def update_last_login(self):
         """Update last login timestamp"""
@@ -168,12 +217,27 @@ class Order(db.Model):
     stripe_session_id = db.Column(db.String(200), nullable=True)
     tracking_number = db.Column(db.String(100), nullable=True)  # DHL Tracking Number
     shipping_label_url = db.Column(db.String(500), nullable=True)  # DHL Label URL
+    shipping_label_sha256 = db.Column(db.String(64), nullable=True)  # Etikett in der lokalen Ablage
+    shipping_label_created_at = db.Column(db.DateTime, nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship to order items
     order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
+    # Abgeschlossene alte Bestellungen liegen in orders_archive (ArchivedOrder)
+    is_archived = False
+    
+    __table_args__ = (
+        db.Index('ix_orders_customer_created', 'customer_id', 'created_at'),
+        # Keyset-Pagination der Admin-Bestellliste, auch gefiltert nach Status
+        db.Index('ix_orders_created_id', 'created_at', 'id'),
+        db.Index('ix_orders_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_orders_payment_created', 'payment_status', 'created_at', 'id'),
+        # Stripe-Webhooks und Checkout-Erfolgsseite
+        db.Index('ix_orders_stripe_session', 'stripe_session_id'),
+    )
+    
     def __repr__(self):
         return f'<Order {self.order_number}>'
 
@@ -205,6 +269,14 @@ class Invoice(db.Model):
     # Relationship to order
     order = db.relationship('Order', backref='invoice', uselist=False)
     
+    is_archived = False
+    
+    __table_args__ = (
+        db.Index('ix_invoices_issue_id', 'issue_date', 'id'),
+        db.Index('ix_invoices_status_issue', 'status', 'issue_date', 'id'),
+        db.Index('ix_invoices_order_id', 'order_id'),
+    )
+    
     def __repr__(self):
         return f'<Invoice {self.invoice_number}>'
 
@@ -223,5 +295,250 @@ class CustomerSession(db.Model):
     
     customer = db.relationship('Customer', backref='sessions')
     
+    # session_token ist bereits eindeutig indiziert - Aufräumen läuft über Ablaufdatum
+    __table_args__ = (
+        db.Index('ix_customer_sessions_active_expires', 'is_active', 'expires_at'),
+        db.Index('ix_customer_sessions_expires', 'expires_at'),
+    )
+    
     def __repr__(self):
         return f'<CustomerSession {self.customer_id}>'
+
+
+class EmailLog(db.Model):
+    __tablename__ = 'email_logs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    mail_type = db.Column(db.String(30), nullable=False, index=True)  # registration, order_confirmation, shipping_notification, status_update, newsletter, test, bounce
+    recipient = db.Column(db.String(120), nullable=False, index=True)
+    subject = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(20), nullable=False)  # sent, failed, bounced
+    smtp_code = db.Column(db.Integer, nullable=True)
+    smtp_response = db.Column(db.String(255), nullable=True)
+    retry_count = db.Column(db.Integer, default=0)
+    queue_ms = db.Column(db.Float, nullable=True)  # Zeit zwischen Auftrag und Verbindungsaufbau
+    connect_ms = db.Column(db.Float, nullable=True)
+    login_ms = db.Column(db.Float, nullable=True)
+    send_ms = db.Column(db.Float, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<EmailLog {self.mail_type} {self.recipient} {self.status}>'
+
+
+class BackgroundJob(db.Model):
+    __tablename__ = 'background_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    name = db.Column(db.String(50), nullable=False)  # tracking_poll, bulk_labels, bulk_order_status, ...
+    status = db.Column(db.String(20), default='queued')  # queued, running, finished, failed
+    total = db.Column(db.Integer, default=0)
+    done = db.Column(db.Integer, default=0)
+    failed = db.Column(db.Integer, default=0)
+    results = db.Column(db.Text, nullable=True)  # JSON list of per-item results
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.String(80), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def get_results(self):
+        try:
+            return json.loads(self.results) if self.results else []
+        except:
+            return []
+    
+    def to_dict(self, include_results=False):
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'total': self.total or 0,
+            'done': self.done or 0,
+            'failed': self.failed or 0,
+            'progress': round((self.done or 0) / self.total * 100, 1) if self.total else (100.0 if self.status == 'finished' else 0.0),
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_results:
+            data['results'] = self.get_results()
+        return data
+    
+    def __repr__(self):
+        return f'<BackgroundJob {self.name} {self.status}>'
+
+
+class CustomerStats(db.Model):
+    """Per-customer order rollup - maintained by backend/services/order_rollups.py"""
+    __tablename__ = 'customer_stats'
+    
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    paid_total = db.Column(db.Float, nullable=False, default=0.0)
+    pending_count = db.Column(db.Integer, nullable=False, default=0)
+    processing_count = db.Column(db.Integer, nullable=False, default=0)
+    shipped_count = db.Column(db.Integer, nullable=False, default=0)
+    delivered_count = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_count = db.Column(db.Integer, nullable=False, default=0)
+    last_order_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def status_counts(self):
+        return {
+            'pending': self.pending_count or 0,
+            'processing': self.processing_count or 0,
+            'shipped': self.shipped_count or 0,
+            'delivered': self.delivered_count or 0,
+            'cancelled': self.cancelled_count or 0
+        }
+    
+    def __repr__(self):
+        return f'<CustomerStats {self.customer_id}>'
+
+
+class DailyOrderRollup(db.Model):
+    """Orders per day by status / payment status - maintained by backend/services/daily_rollups.py"""
+    __tablename__ = 'daily_order_rollups'
+    
+    day = db.Column(db.Date, primary_key=True)
+    dimension = db.Column(db.String(20), primary_key=True)  # status, payment
+    value = db.Column(db.String(20), primary_key=True)  # z.B. 'delivered' bzw. 'paid'
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0.0)  # Summe total_amount
+    
+    __table_args__ = (
+        db.Index('ix_daily_order_rollups_dimension_day', 'dimension', 'value', 'day'),
+    )
+    
+    def __repr__(self):
+        return f'<DailyOrderRollup {self.day} {self.dimension}={self.value}>'
+
+
+class DailyItemSales(db.Model):
+    """Order items per day and article - maintained by backend/services/daily_rollups.py"""
+    __tablename__ = 'daily_item_sales'
+    
+    day = db.Column(db.Date, primary_key=True)
+    item_type = db.Column(db.String(20), primary_key=True)  # component, prebuilt
+    item_name = db.Column(db.String(200), primary_key=True)
+    line_count = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<DailyItemSales {self.day} {self.item_name}>'
+
+
+class DailyCustomerSales(db.Model):
+    """Orders per day and customer - maintained by backend/services/daily_rollups.py"""
+    __tablename__ = 'daily_customer_sales'
+    
+    day = db.Column(db.Date, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    paid_count = db.Column(db.Integer, nullable=False, default=0)
+    paid_total = db.Column(db.Float, nullable=False, default=0.0)
+    
+    __table_args__ = (
+        db.Index('ix_daily_customer_sales_customer_day', 'customer_id', 'day'),
+    )
+    
+    def __repr__(self):
+        return f'<DailyCustomerSales {self.day} {self.customer_id}>'
+
+
+class CustomerSearchIndex(db.Model):
+    """Search document per customer (FULLTEXT) - maintained by backend/services/customer_search.py"""
+    __tablename__ = 'customer_search_index'
+    
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), primary_key=True)
+    document = db.Column(db.Text, nullable=False)  # E-Mail, Name, Ort, PLZ, Bestellnummern
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ft_customer_search_document', 'document', mysql_prefix='FULLTEXT'),
+    )
+    
+    def __repr__(self):
+        return f'<CustomerSearchIndex {self.customer_id}>'
+
+
+class ArchivedOrder(db.Model):
+    """Closed order moved out of orders - written by backend/services/order_archive.py"""
+    __tablename__ = 'orders_archive'
+    
+    is_archived = True
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # id aus orders
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    order_number = db.Column(db.String(50), unique=True, nullable=False)
+    order_type = db.Column(db.String(20), nullable=False)
+    total_amount = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20))
+    payment_status = db.Column(db.String(20))
+    stripe_session_id = db.Column(db.String(200), nullable=True)
+    tracking_number = db.Column(db.String(100), nullable=True)
+    shipping_label_url = db.Column(db.String(500), nullable=True)
+    shipping_label_sha256 = db.Column(db.String(64), nullable=True)
+    shipping_label_created_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    customer = db.relationship('Customer')
+    order_items = db.relationship('ArchivedOrderItem', backref='order', lazy=True, order_by='ArchivedOrderItem.id')
+    invoice = db.relationship('ArchivedInvoice', back_populates='order')
+    
+    __table_args__ = (
+        db.Index('ix_orders_archive_customer_created', 'customer_id', 'created_at', 'id'),
+        db.Index('ix_orders_archive_created_id', 'created_at', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<ArchivedOrder {self.order_number}>'
+
+
+class ArchivedOrderItem(db.Model):
+    """Item of an archived order"""
+    __tablename__ = 'order_items_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # id aus order_items
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id'), nullable=False, index=True)
+    item_type = db.Column(db.String(20), nullable=False)
+    item_id = db.Column(db.Integer, nullable=False)
+    item_name = db.Column(db.String(200), nullable=False)
+    quantity = db.Column(db.Integer, default=1)
+    unit_price = db.Column(db.Float, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self):
+        return f'<ArchivedOrderItem {self.item_name}>'
+
+
+class ArchivedInvoice(db.Model):
+    """Invoice of an archived order"""
+    __tablename__ = 'invoices_archive'
+    
+    is_archived = True
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # id aus invoices
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id'), nullable=False)
+    invoice_number = db.Column(db.String(50), unique=True, nullable=False)
+    issue_date = db.Column(db.DateTime)
+    due_date = db.Column(db.DateTime, nullable=True)
+    total_amount = db.Column(db.Float, nullable=False)
+    tax_amount = db.Column(db.Float, default=0.0)
+    status = db.Column(db.String(20))
+    
+    order = db.relationship('ArchivedOrder', back_populates='invoice')
+    
+    __table_args__ = (
+        db.Index('ix_invoices_archive_order_id', 'order_id'),
+        db.Index('ix_invoices_archive_issue_id', 'issue_date', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<ArchivedInvoice {self.invoice_number}>'
@@ -1,14 +1,31 @@
 import json
 from datetime import datetime
-from flask import request, render_template, redirect, url_for, flash, session, jsonify
+from flask import request, render_template, redirect, url_for, flash, session, jsonify, send_file, Response
 from flask_login import login_required, login_user, logout_user, UserMixin, current_user
 from werkzeug.security import check_password_hash
+from sqlalchemy.orm import joinedload, selectinload
 from app import app, db
-from backend.models.models import Component, PrebuiltPC, AdminUser, Order, OrderItem, Customer, Invoice
+from backend.models.models import (Component, PrebuiltPC, AdminUser, Order, Customer, Invoice,
+                                   ArchivedOrder, ArchivedInvoice)
 from backend.services.dhl_integration import create_shipping_label_for_order, track_order_shipment
 from backend.services.email_service import send_registration_email, EmailService, send_newsletter_email
+from backend.utils.pagination import keyset_paginate, approximate_count
+from backend.services.order_rollups import get_order_counts
+from backend.services.admin_metrics import get_dashboard_metrics
+from backend.services.daily_rollups import get_sales_statistics
+from backend.services.customer_search import search_customers
 
 # Admin Authentication
+@app.before_request
+def restrict_admin_area():
+    """Admin-Bereich nur für Admin-Konten - Kunden nutzen denselben LoginManager"""
+    if not request.path.startswith('/admin') or request.endpoint == 'admin_login':
+        return None
+    if current_user.is_authenticated and not isinstance(current_user, AdminUser):
+        flash('Bitte melden Sie sich mit einem Admin-Konto an.', 'error')
+        return redirect(url_for('admin_login'))
+    return None
+
 @app.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
     """Admin login page"""
@@ -18,10 +35,17 @@ def admin_login():
         
         user = AdminUser.query.filter_by(username=username).first()
         
-        if user and user.check_password(password):
+        from customer.auth import get_customer_ip
+        from backend.services.login_throttle import check_login
+        result = check_login(user, password, get_customer_ip(), f'admin:{username}')
+        
+        if result['success']:
             login_user(user)
             flash('Erfolgreich angemeldet', 'success')
             return redirect(url_for('admin_dashboard'))
+        elif result.get('status') == 429:
+            flash(result['error'], 'error')
+            return render_template('admin/login.html'), 429, {'Retry-After': str(result['retry_after'])}
         else:
             flash('Ungültige Anmeldedaten', 'error')
     
@@ -31,6 +55,8 @@ def admin_login():
 @login_required
 def admin_logout():
     """Admin logout"""
+    from backend.services.identity_cache import invalidate_identity
+    invalidate_identity(current_user)
     logout_user()
     flash('Erfolgreich abgemeldet', 'info')
     return redirect(url_for('admin_login'))
@@ -41,88 +67,47 @@ def admin_logout():
 @login_required
 def admin_dashboard():
     """Admin dashboard with overview statistics"""
-    from sqlalchemy import func
-    
-    # Component and prebuilt stats
-    component_count = Component.query.count()
-    active_component_count = Component.query.filter_by(is_active=True).count()
-    prebuilt_count = PrebuiltPC.query.count()
-    active_prebuilt_count = PrebuiltPC.query.filter_by(is_active=True).count()
-    
-    # Order and customer stats
-    total_orders = Order.query.count()
-    pending_orders = Order.query.filter_by(status='pending').count()
-    processing_orders = Order.query.filter_by(status='processing').count()
-    completed_orders = Order.query.filter_by(status='delivered').count()
-    total_customers = Customer.query.count()
-    
-    # Revenue stats
-    total_revenue = db.session.query(func.sum(Order.total_amount)).filter_by(payment_status='paid').scalar() or 0
-    pending_revenue = db.session.query(func.sum(Order.total_amount)).filter_by(payment_status='pending').scalar() or 0
-    
-    # Invoice stats
-    total_invoices = Invoice.query.count()
-    paid_invoices = Invoice.query.filter_by(status='paid').count()
-    overdue_invoices = Invoice.query.filter_by(status='overdue').count()
-    
-    # Recent data
-    recent_components = Component.query.order_by(Component.created_at.desc()).limit(5).all()
-    recent_prebuilts = PrebuiltPC.query.order_by(PrebuiltPC.created_at.desc()).limit(5).all()
-    recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
-    recent_invoices = Invoice.query.order_by(Invoice.issue_date.desc()).limit(5).all()
-    
-    stats = {
-        'components': {
-            'total': component_count,
-            'active': active_component_count,
-            'inactive': component_count - active_component_count
-        },
-        'prebuilts': {
-            'total': prebuilt_count,
-            'active': active_prebuilt_count,
-            'inactive': prebuilt_count - active_prebuilt_count
-        },
-        'orders': {
-            'total': total_orders,
-            'pending': pending_orders,
-            'processing': processing_orders,
-            'completed': completed_orders
-        },
-        'customers': {
-            'total': total_customers
-        },
-        'revenue': {
-            'total': total_revenue,
-            'pending': pending_revenue
-        },
-        'invoices': {
-            'total': total_invoices,
-            'paid': paid_invoices,
-            'overdue': overdue_invoices
-        }
-    }
+    # Kennzahlen aus dem Snapshot (eine Abfrage je Neuberechnung), ?refresh=1 berechnet sofort neu
+    metrics = get_dashboard_metrics(refresh=request.args.get('refresh') == '1')
     
     return render_template('admin/dashboard.html', 
-                         stats=stats, 
-                         recent_components=recent_components,
-                         recent_prebuilts=recent_prebuilts,
-                         recent_orders=recent_orders,
-                         recent_invoices=recent_invoices)
+                         stats=metrics['stats'], 
+                         recent_orders=metrics['recent_orders'],
+                         metrics_generated_at=metrics['generated_at'])
+
+# Versanddaten aus den Produktformularen
+SHIPPING_FIELDS = ('weight_kg', 'length_cm', 'width_cm', 'height_cm')
+
+def _parse_shipping_fields(form):
+    """Gewicht und Maße lesen - leere Felder bleiben None (Standardgewicht)"""
+    values = {}
+    for field in SHIPPING_FIELDS:
+        raw = (form.get(field) or '').strip().replace(',', '.')
+        if not raw:
+            values[field] = None
+            continue
+        value = float(raw)
+        if value < 0:
+            raise ValueError(field)
+        values[field] = value
+    return values
 
 # Component Management
 @app.route('/admin/components')
 @login_required
 def admin_components():
     """List all components"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     category = request.args.get('category', '')
     
     query = Component.query
     if category:
         query = query.filter_by(category=category)
     
-    components = query.order_by(Component.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
+    # Keyset-Pagination über (created_at, id) - Gesamtzahl nur ungefiltert (geschätzt)
+    components = keyset_paginate(
+        query, Component.created_at, Component.id, cursor=cursor, per_page=20,
+        total=None if category else approximate_count('components'), total_is_estimate=True
     )
     
     categories = ['cpus', 'motherboards', 'ram', 'gpus', 'ssds', 'cases', 'psus', 'coolers']
@@ -152,6 +137,12 @@ def admin_add_component():
                 flash('Ungültiger Preis', 'error')
                 return render_template('admin/add_component.html')
             
+            try:
+                shipping = _parse_shipping_fields(request.form)
+            except ValueError:
+                flash('Ungültiges Gewicht oder ungültige Maße', 'error')
+                return render_template('admin/add_component.html')
+            
             # Parse specifications JSON
             specs_json = request.form.get('specifications', '{}')
             try:
@@ -164,7 +155,8 @@ def admin_add_component():
                 name=name,
                 category=category,
                 price=price,
-                specifications=json.dumps(specs)
+                specifications=json.dumps(specs),
+                **shipping
             )
             
             db.session.add(component)
@@ -192,6 +184,13 @@ def admin_edit_component(component_id):
             component.price = float(request.form['price'])
             component.is_active = bool(int(request.form.get('is_active', 1)))
             
+            try:
+                for field, value in _parse_shipping_fields(request.form).items():
+                    setattr(component, field, value)
+            except ValueError:
+                flash('Ungültiges Gewicht oder ungültige Maße', 'error')
+                return render_template('admin/edit_component.html', component=component)
+            
             # Parse and validate specifications JSON
             try:
                 specs = json.loads(request.form['specifications'])
@@ -271,6 +270,12 @@ def admin_add_prebuilt():
                 flash('Ungültiger Preis', 'error')
                 return render_template('admin/add_prebuilt.html')
             
+            try:
+                shipping = _parse_shipping_fields(request.form)
+            except ValueError:
+                flash('Ungültiges Gewicht oder ungültige Maße', 'error')
+                return render_template('admin/add_prebuilt.html')
+            
             # Parse specifications JSON
             specs_json = request.form.get('specifications', '{}')
             try:
@@ -296,7 +301,8 @@ def admin_add_prebuilt():
                 description=description,
                 image_url=image_url if image_url else None,
                 specifications=json.dumps(specs),
-                features=json.dumps(features)
+                features=json.dumps(features),
+                **shipping
             )
             
             db.session.add(prebuilt)
@@ -326,6 +332,13 @@ def admin_edit_prebuilt(prebuilt_id):
             prebuilt.image_url = request.form.get('image_url') or None
             prebuilt.is_active = bool(int(request.form.get('is_active', 1)))
             
+            try:
+                for field, value in _parse_shipping_fields(request.form).items():
+                    setattr(prebuilt, field, value)
+            except ValueError:
+                flash('Ungültiges Gewicht oder ungültige Maße', 'error')
+                return render_template('admin/edit_prebuilt.html', prebuilt=prebuilt)
+            
             # Parse and validate specifications JSON
             try:
                 specs = json.loads(request.form['specifications'])
@@ -394,18 +407,21 @@ def get_component_fields(category):
 @login_required
 def admin_orders():
     """List all orders"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     status = request.args.get('status', '')
     payment_status = request.args.get('payment_status', '')
     
-    query = Order.query
+    # Kunde per JOIN mitladen - die Liste zeigt Name und E-Mail je Zeile
+    query = Order.query.options(joinedload(Order.customer))
     if status:
         query = query.filter_by(status=status)
     if payment_status:
         query = query.filter_by(payment_status=payment_status)
     
-    orders = query.order_by(Order.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
+    filtered = bool(status or payment_status)
+    orders = keyset_paginate(
+        query, Order.created_at, Order.id, cursor=cursor, per_page=20,
+        total=None if filtered else approximate_count('orders'), total_is_estimate=True
     )
     
     return render_template('admin/orders.html', 
@@ -417,7 +433,16 @@ def admin_orders():
 @login_required
 def admin_order_detail(order_id):
     """View order details"""
-    order = Order.query.get_or_404(order_id)
+    order = Order.query.options(
+        joinedload(Order.customer),
+        selectinload(Order.order_items)
+    ).filter_by(id=order_id).first()
+    if order is None:
+        # Abgeschlossene alte Bestellungen liegen im Archiv (gleiche ID)
+        order = ArchivedOrder.query.options(
+            joinedload(ArchivedOrder.customer),
+            selectinload(ArchivedOrder.order_items)
+        ).filter_by(id=order_id).first_or_404()
     return render_template('admin/order_detail.html', order=order)
 
 @app.route('/admin/orders/<int:order_id>/create-shipping-label', methods=['POST'])
@@ -461,6 +486,160 @@ def admin_create_shipping_label(order_id):
     
     return redirect(url_for('admin_order_detail', order_id=order_id))
 
+@app.route('/admin/orders/bulk-shipping-labels', methods=['POST'])
+@login_required
+def admin_bulk_shipping_labels():
+    """Erstelle DHL Versandetiketten für mehrere Bestellungen im Hintergrund"""
+    from backend.services.background_jobs import submit_job
+    from backend.services.dhl_integration import create_shipping_labels_for_orders
+
+    data = request.get_json(silent=True) or {}
+    raw_ids = data.get('order_ids') or request.form.getlist('order_ids')
+    try:
+        order_ids = [int(order_id) for order_id in raw_ids]
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Ungültige Bestellungs-IDs'}), 400
+
+    if not order_ids:
+        return jsonify({'success': False, 'error': 'Keine Bestellungen ausgewählt'}), 400
+
+    job_id = submit_job('bulk_shipping_labels', create_shipping_labels_for_orders, order_ids,
+                        total=len(order_ids), created_by=getattr(current_user, 'username', None))
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('admin_job_status', job_id=job_id)
+    }), 202
+
+@app.route('/admin/orders/bulk-action', methods=['POST'])
+@login_required
+def admin_bulk_order_action():
+    """Sammelaktion für ausgewählte Bestellungen als Hintergrund-Job starten"""
+    from backend.services.background_jobs import submit_job
+    from backend.services.dhl_integration import create_shipping_labels_for_orders
+    from backend.services.bulk_order_actions import (bulk_update_orders, bulk_update_invoice_status,
+                                                     ORDER_FIELDS, INVOICE_STATUSES)
+
+    data = request.get_json(silent=True) or {}
+    action = data.get('action') or request.form.get('action')
+    value = data.get('value') or request.form.get('value')
+    raw_ids = data.get('order_ids') or request.form.getlist('order_ids')
+    try:
+        order_ids = sorted({int(order_id) for order_id in raw_ids})
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Ungültige Bestellungs-IDs'}), 400
+
+    if not order_ids:
+        return jsonify({'success': False, 'error': 'Keine Bestellungen ausgewählt'}), 400
+
+    created_by = getattr(current_user, 'username', None)
+    if action in ORDER_FIELDS:
+        if value not in ORDER_FIELDS[action][1]:
+            return jsonify({'success': False, 'error': 'Ungültiger Status'}), 400
+        job_id = submit_job(f'bulk_order_{action}', bulk_update_orders, order_ids, action, value,
+                            total=len(order_ids), created_by=created_by)
+    elif action == 'invoice_status':
+        if value not in INVOICE_STATUSES:
+            return jsonify({'success': False, 'error': 'Ungültiger Rechnungsstatus'}), 400
+        job_id = submit_job('bulk_invoice_status', bulk_update_invoice_status, order_ids, value,
+                            total=len(order_ids), created_by=created_by)
+    elif action == 'labels':
+        job_id = submit_job('bulk_shipping_labels', create_shipping_labels_for_orders, order_ids,
+                            total=len(order_ids), created_by=created_by)
+    else:
+        return jsonify({'success': False, 'error': 'Unbekannte Aktion'}), 400
+
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('admin_job_status', job_id=job_id)
+    }), 202
+
+@app.route('/admin/orders/<int:order_id>/label.pdf')
+@login_required
+def admin_download_label(order_id):
+    """Versandetikett aus der lokalen Ablage (mit Range-Unterstützung)"""
+    from backend.services.label_store import label_store, store_label_from_url
+
+    order = Order.query.get(order_id) or ArchivedOrder.query.get_or_404(order_id)
+
+    if not label_store.exists(order.shipping_label_sha256) and order.status in ['shipped', 'delivered']:
+        # Etikett wurde vor Einführung der Ablage erstellt - einmalig nachladen
+        label_sha256 = store_label_from_url(order.shipping_label_url)
+        if label_sha256:
+            order.shipping_label_sha256 = label_sha256
+            db.session.commit()
+
+    path = label_store.path_for(order.shipping_label_sha256)
+    if not path or not label_store.exists(order.shipping_label_sha256):
+        if order.shipping_label_url:
+            return redirect(order.shipping_label_url)
+        flash('Kein Versandetikett vorhanden', 'error')
+        return redirect(url_for('admin_order_detail', order_id=order_id))
+
+    return send_file(path, mimetype='application/pdf', conditional=True,
+                     etag=order.shipping_label_sha256, max_age=3600,
+                     download_name=f'Etikett_{order.order_number}.pdf')
+
+@app.route('/admin/labels/today.pdf')
+@login_required
+def admin_print_labels_today():
+    """Alle heute erstellten Versandetiketten als ein PDF"""
+    import importlib.util
+    from backend.services.label_store import label_paths, stream_merged_labels, label_day_range
+
+    today, day_start, day_end = label_day_range()
+    label_hashes = [row.shipping_label_sha256 for row in
+                    db.session.query(Order.shipping_label_sha256)
+                    .filter(Order.shipping_label_created_at >= day_start,
+                            Order.shipping_label_created_at < day_end,
+                            Order.shipping_label_sha256.isnot(None))
+                    .order_by(Order.shipping_label_created_at, Order.id)]
+
+    if not label_hashes:
+        flash('Heute wurden noch keine Versandetiketten erstellt', 'info')
+        return redirect(url_for('admin_orders'))
+
+    # Vor dem Streamen prüfen - danach ist kein Redirect mehr möglich
+    if importlib.util.find_spec('pypdf') is None:
+        flash('PDF-Zusammenführung nicht verfügbar (pypdf nicht installiert)', 'error')
+        return redirect(url_for('admin_orders'))
+
+    paths = label_paths(label_hashes)
+    if not paths:
+        flash('Keine Etiketten in der lokalen Ablage gefunden', 'warning')
+        return redirect(url_for('admin_orders'))
+
+    # Etikett für Etikett erzeugen und sofort senden - ohne Content-Length, der Umfang steht erst am Ende fest
+    filename = f"Etiketten_{today.strftime('%Y-%m-%d')}.pdf"
+    return Response(stream_merged_labels(paths), mimetype='application/pdf', headers={
+        'Content-Disposition': f'inline; filename="{filename}"'
+    })
+
+@app.route('/admin/export/<entity>')
+@login_required
+def admin_export(entity):
+    """Bestellungen, Kunden oder Rechnungen als CSV/JSONL streamen (?format=csv|jsonl&gzip=0|1)"""
+    from flask import stream_with_context
+    from backend.services.data_export import (EXPORTS, EXPORT_FORMATS, stream_export,
+                                              export_filename, export_mimetype)
+
+    if entity not in EXPORTS:
+        return jsonify({'success': False, 'error': 'Unbekannter Export'}), 404
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'Format muss csv oder jsonl sein'}), 400
+    compress = request.args.get('gzip', '1') != '0'
+    filters = {key: request.args.get(key, '') for key in EXPORTS[entity][1]}
+
+    # stream_with_context hält Request und Datenbank-Session bis zum letzten Block offen
+    return Response(stream_with_context(stream_export(entity, export_format, filters, compress)),
+                    mimetype=export_mimetype(export_format, compress),
+                    headers={
+                        'Content-Disposition': f'attachment; filename="{export_filename(entity, export_format, compress)}"',
+                        'X-Accel-Buffering': 'no'
+                    })
+
 @app.route('/admin/dhl-api-guide')
 @login_required
 def admin_dhl_api_guide():
@@ -471,7 +650,7 @@ def admin_dhl_api_guide():
 @login_required
 def admin_track_shipment(order_id):
     """Verfolge DHL Sendung"""
-    order = Order.query.get_or_404(order_id)
+    order = Order.query.get(order_id) or ArchivedOrder.query.get_or_404(order_id)
     
     if not order.tracking_number:
         flash('Keine Tracking-Nummer verfügbar', 'warning')
@@ -491,6 +670,66 @@ def admin_track_shipment(order_id):
     
     return redirect(url_for('admin_order_detail', order_id=order_id))
 
+@app.route('/admin/api/tracking-cache')
+@login_required
+def admin_tracking_cache_stats():
+    """Kennzahlen des Sendungsverfolgungs-Caches (pro Worker)"""
+    from backend.services.tracking_cache import tracking_cache
+    return jsonify({'success': True, 'cache': tracking_cache.stats()})
+
+@app.route('/admin/api/dhl-metrics')
+@login_required
+def admin_dhl_metrics():
+    """Latenz und Circuit-Breaker-Status der DHL Endpunkte (pro Worker)"""
+    from backend.services.http_transport import dhl_transport
+    return jsonify({'success': True, 'endpoints': dhl_transport.metrics()})
+
+@app.route('/admin/api/analytics')
+@login_required
+def admin_analytics_api():
+    """Umsatzanalyse für beliebige Zeiträume (?start=&end=&granularity=day|week|month&compare=yoy)"""
+    from backend.services.analytics import get_analytics, parse_range, AnalyticsError
+
+    try:
+        start, end, granularity = parse_range(request.args.get('start'), request.args.get('end'),
+                                              request.args.get('granularity'))
+    except AnalyticsError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    top = min(max(request.args.get('top', 10, type=int), 1), 100)
+    analytics = get_analytics(start, end, granularity,
+                              compare=request.args.get('compare') == 'yoy',
+                              top=top, item_type=request.args.get('item_type') or None)
+    return jsonify({'success': True, 'analytics': analytics})
+
+@app.route('/admin/tracking/poll', methods=['POST'])
+@login_required
+def admin_poll_tracking():
+    """Sendungsverfolgung aller versendeten Bestellungen im Hintergrund abgleichen"""
+    from backend.services.background_jobs import submit_job
+    from backend.services.tracking_poller import poll_shipped_orders
+
+    job_id = submit_job('poll_tracking', poll_shipped_orders,
+                        created_by=getattr(current_user, 'username', None))
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('admin_job_status', job_id=job_id)
+    }), 202
+
+@app.route('/admin/jobs/<job_id>')
+@login_required
+def admin_job_status(job_id):
+    """Fortschritt eines Hintergrund-Jobs"""
+    from backend.services.background_jobs import get_job
+
+    include_results = request.args.get('results') == '1'
+    job = get_job(job_id, include_results=include_results)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job nicht gefunden'}), 404
+
+    return jsonify({'success': True, 'job': job.to_dict(include_results=include_results)})
+
 @app.route('/admin/orders/<int:order_id>/update-status', methods=['POST'])
 @login_required
 def admin_update_order_status(order_id):
@@ -520,28 +759,16 @@ def admin_update_order_status(order_id):
     try:
         db.session.commit()
         
-        # E-Mail-Benachrichtigung bei Status-Änderung
+        # E-Mail-Benachrichtigung bei Status-Änderung (Versand im Hintergrund)
         if status_changed:
-            try:
-                from email_service import send_status_update_email
-                
-                # Bei "shipped" Status auch Versandbenachrichtigung senden (falls Tracking-Nummer vorhanden)
-                if new_status == 'shipped' and order.tracking_number:
-                    from email_service import send_shipping_notification_email
-                    success = send_shipping_notification_email(order)
-                    if success:
-                        flash(f'Bestellung {order.order_number} als versandt markiert - Versandbenachrichtigung mit Tracking-Nummer gesendet', 'success')
-                    else:
-                        flash(f'Bestellung {order.order_number} Status aktualisiert - Versandbenachrichtigung fehlgeschlagen', 'warning')
-                else:
-                    # Standard Status-Update E-Mail
-                    success = send_status_update_email(order, old_status, new_status)
-                    if success:
-                        flash(f'Bestellung {order.order_number} Status aktualisiert - E-Mail an Kunde gesendet', 'success')
-                    else:
-                        flash(f'Bestellung {order.order_number} Status aktualisiert - E-Mail-Versand fehlgeschlagen', 'warning')
-            except Exception as e:
-                flash(f'Bestellung {order.order_number} Status aktualisiert - E-Mail-Fehler: {str(e)}', 'warning')
+            from backend.services.bulk_order_actions import notify_status_change
+            
+            # Bei "shipped" Status Versandbenachrichtigung senden (falls Tracking-Nummer vorhanden)
+            notify_status_change(order.id, old_status, new_status, order.tracking_number)
+            if new_status == 'shipped' and order.tracking_number:
+                flash(f'Bestellung {order.order_number} als versandt markiert - Versandbenachrichtigung wird gesendet', 'success')
+            else:
+                flash(f'Bestellung {order.order_number} Status aktualisiert - E-Mail an Kunde wird gesendet', 'success')
         else:
             flash(f'Bestellung {order.order_number} Status aktualisiert', 'success')
             
@@ -556,23 +783,23 @@ def admin_update_order_status(order_id):
 @login_required
 def admin_customers():
     """List all customers"""
-    page = request.args.get('page', 1, type=int)
-    search = request.args.get('search', '')
+    cursor = request.args.get('cursor')
+    search = request.args.get('search', '').strip()
     
-    query = Customer.query
     if search:
-        query = query.filter(
-            Customer.email.contains(search) | 
-            Customer.first_name.contains(search) | 
-            Customer.last_name.contains(search)
+        # FULLTEXT-Suche (E-Mail, Name, Ort, PLZ, Bestellnummern) - beste Treffer zuerst
+        customers = search_customers(search, cursor=cursor)
+    else:
+        customers = keyset_paginate(
+            Customer.query, Customer.created_at, Customer.id, cursor=cursor, per_page=20,
+            total=approximate_count('customers'), total_is_estimate=True
         )
-    
-    customers = query.order_by(Customer.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    # Bestellanzahl aus customer_stats statt alle Bestellungen je Kunde zu laden
+    order_counts = get_order_counts([customer.id for customer in customers.items])
     
     return render_template('admin/customers.html', 
                          customers=customers, 
+                         order_counts=order_counts,
                          search=search)
 
 @app.route('/admin/customers/<int:customer_id>')
@@ -581,6 +808,9 @@ def admin_customer_detail(customer_id):
     """View customer details"""
     customer = Customer.query.get_or_404(customer_id)
     orders = Order.query.filter_by(customer_id=customer_id).order_by(Order.created_at.desc()).all()
+    # Archivierte Bestellungen sind älter als jede offene - hinten anhängen und gemeinsam sortieren
+    orders += ArchivedOrder.query.filter_by(customer_id=customer_id).order_by(ArchivedOrder.created_at.desc()).all()
+    orders.sort(key=lambda order: order.created_at or datetime.min, reverse=True)
     
     return render_template('admin/customer_detail.html', 
                          customer=customer, 
@@ -591,15 +821,16 @@ def admin_customer_detail(customer_id):
 @login_required
 def admin_invoices():
     """List all invoices"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     status = request.args.get('status', '')
     
-    query = Invoice.query
+    query = Invoice.query.options(joinedload(Invoice.order).joinedload(Order.customer))
     if status:
         query = query.filter_by(status=status)
     
-    invoices = query.order_by(Invoice.issue_date.desc()).paginate(
-        page=page, per_page=20, error_out=False
+    invoices = keyset_paginate(
+        query, Invoice.issue_date, Invoice.id, cursor=cursor, per_page=20,
+        total=None if status else approximate_count('invoices'), total_is_estimate=True
     )
     
     return render_template('admin/invoices.html', 
@@ -610,7 +841,15 @@ def admin_invoices():
 @login_required
 def admin_invoice_detail(invoice_id):
     """View invoice details"""
-    invoice = Invoice.query.get_or_404(invoice_id)
+    invoice = Invoice.query.options(
+        joinedload(Invoice.order).joinedload(Order.customer),
+        joinedload(Invoice.order).selectinload(Order.order_items)
+    ).filter_by(id=invoice_id).first()
+    if invoice is None:
+        invoice = ArchivedInvoice.query.options(
+            joinedload(ArchivedInvoice.order).joinedload(ArchivedOrder.customer),
+            joinedload(ArchivedInvoice.order).selectinload(ArchivedOrder.order_items)
+        ).filter_by(id=invoice_id).first_or_404()
     return render_template('admin/invoice_detail.html', invoice=invoice)
 
 @app.route('/admin/invoices/<int:invoice_id>/update-status', methods=['POST'])
@@ -638,104 +877,8 @@ def admin_update_invoice_status(invoice_id):
 @login_required
 def admin_statistics():
     """Advanced statistics and reports"""
-    from sqlalchemy import func, extract
-    from datetime import datetime, timedelta
-    
-    # Date range for statistics
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=30)
-    
-    # Sales statistics
-    total_sales = db.session.query(func.sum(Order.total_amount)).filter_by(payment_status='paid').scalar() or 0
-    monthly_sales = db.session.query(func.sum(Order.total_amount)).filter(
-        Order.payment_status == 'paid',
-        Order.created_at >= start_date
-    ).scalar() or 0
-    
-    # Order statistics by status
-    order_stats = db.session.query(
-        Order.status,
-        func.count(Order.id).label('count')
-    ).group_by(Order.status).all()
-    
-    # Payment statistics
-    payment_stats_raw = db.session.query(
-        Order.payment_status,
-        func.count(Order.id).label('count'),
-        func.sum(Order.total_amount).label('total')
-    ).group_by(Order.payment_status).all()
-    
-    payment_stats = []
-    for stat in payment_stats_raw:
-        payment_stats.append({
-            'payment_status': stat.payment_status,
-            'count': stat.count,
-            'total': float(stat.total) if stat.total else 0.0
-        })
-    
-    # Monthly revenue trend
-    monthly_revenue_raw = db.session.query(
-        extract('month', Order.created_at).label('month'),
-        func.sum(Order.total_amount).label('revenue')
-    ).filter(
-        Order.payment_status == 'paid',
-        Order.created_at >= start_date
-    ).group_by(extract('month', Order.created_at)).all()
-    
-    monthly_revenue = []
-    for revenue in monthly_revenue_raw:
-        monthly_revenue.append({
-            'month': int(revenue.month),
-            'revenue': float(revenue.revenue) if revenue.revenue else 0.0
-        })
-    
-    # Top customers
-    top_customers_raw = db.session.query(
-        Customer.email,
-        Customer.first_name,
-        Customer.last_name,
-        func.count(Order.id).label('order_count'),
-        func.sum(Order.total_amount).label('total_spent')
-    ).join(Order).filter(
-        Order.payment_status == 'paid'
-    ).group_by(Customer.id).order_by(func.sum(Order.total_amount).desc()).limit(10).all()
-    
-    top_customers = []
-    for customer in top_customers_raw:
-        top_customers.append({
-            'email': customer.email,
-            'first_name': customer.first_name,
-            'last_name': customer.last_name,
-            'order_count': customer.order_count,
-            'total_spent': float(customer.total_spent) if customer.total_spent else 0.0
-        })
-    
-    # Popular PCs statistics
-    popular_pcs_raw = db.session.query(
-        OrderItem.item_name,
-        func.count(OrderItem.id).label('order_count'),
-        func.sum(OrderItem.total_price).label('total_revenue')
-    ).filter(
-        OrderItem.item_type == 'prebuilt'
-    ).group_by(OrderItem.item_name).order_by(func.count(OrderItem.id).desc()).limit(10).all()
-    
-    popular_pcs = []
-    for pc in popular_pcs_raw:
-        popular_pcs.append({
-            'item_name': pc.item_name,
-            'order_count': pc.order_count,
-            'total_revenue': float(pc.total_revenue) if pc.total_revenue else 0.0
-        })
-    
-    stats = {
-        'total_sales': float(total_sales) if total_sales else 0.0,
-        'monthly_sales': float(monthly_sales) if monthly_sales else 0.0,
-        'order_stats': dict(order_stats),
-        'payment_stats': payment_stats,
-        'monthly_revenue': monthly_revenue,
-        'top_customers': top_customers,
-        'popular_pcs': popular_pcs
-    }
+    # Nur Tageskennzahlen lesen - kein Scan über orders/order_items
+    stats = get_sales_statistics()
     
     return render_template('admin/statistics.html', stats=stats)
 
@@ -917,6 +1060,18 @@ def admin_newsletter_send():
             'error': str(e)
         }), 500
 
+@app.route('/admin/email-metrics')
+@login_required
+def admin_email_metrics():
+    """E-Mail-Versandkennzahlen und Bounces"""
+    from backend.services.email_service import get_delivery_metrics
+    
+    days = request.args.get('days', 30, type=int)
+    days = max(1, min(days, 365))
+    
+    metrics = get_delivery_metrics(days)
+    return render_template('admin/email_metrics.html', metrics=metrics)
+
 @app.route('/admin/newsletter/history')
 @login_required
 def admin_newsletter_history():
@@ -7,6 +7,7 @@ from flask import jsonify, request, render_template
 from app import app
 from backend.services.dhl_integration import create_shipping_label_for_order, track_order_shipment, get_shipping_quote
 from backend.models.models import Order
+from backend.services.shipping_rates import quote_cart
 import logging
 
 @app.route('/api/shipping/rates', methods=['POST'])
@@ -79,8 +80,10 @@ def tracking_page():
                 error = result['error']
                 
             # Immer alternative Optionen bereitstellen
-            from backend.services.dhl_alternatives import get_alternative_tracking_data
-            alternatives = get_alternative_tracking_data(tracking_number)
+            alternatives = result.get('alternatives')
+            if alternatives is None:
+                from backend.services.dhl_alternatives import get_alternative_tracking_data
+                alternatives = get_alternative_tracking_data(tracking_number)
             
         except Exception as e:
             error = f"Fehler beim Verfolgen: {str(e)}"
@@ -104,47 +107,25 @@ def estimate_shipping():
         data = request.get_json()
         cart_items = data.get('cart_items', [])
         destination = data.get('country', 'DE')
+        # Optional mehrere Zielländer auf einmal (z.B. Länderauswahl im Checkout)
+        countries = list(data.get('countries') or [])
+        if destination not in countries:
+            countries.insert(0, destination)
         
-        # Gewicht basierend auf Artikeln schätzen
-        total_weight = 0.0
-        for item in cart_items:
-            # Standard-Gewichte für PC-Komponenten
-            if item.get('type') == 'component':
-                category = item.get('category', '')
-                if 'cpu' in category.lower():
-                    total_weight += 0.5
-                elif 'gpu' in category.lower():
-                    total_weight += 1.5
-                elif 'motherboard' in category.lower():
-                    total_weight += 1.0
-                elif 'ram' in category.lower():
-                    total_weight += 0.2
-                elif 'ssd' in category.lower():
-                    total_weight += 0.1
-                elif 'case' in category.lower():
-                    total_weight += 3.0
-                elif 'psu' in category.lower():
-                    total_weight += 1.5
-                else:
-                    total_weight += 0.5
-            elif item.get('type') == 'prebuilt':
-                total_weight += 8.0  # Kompletter PC
-        
-        # Mindestgewicht 1kg
-        total_weight = max(1.0, total_weight)
+        result = quote_cart(cart_items, countries)
+        rates = result['quotes'][destination]
         
-        result = get_shipping_quote(destination, total_weight)
-        
-        if result['success']:
+        if rates:
             return jsonify({
                 'success': True,
-                'rates': result['rates'],
-                'estimated_weight': total_weight
+                'rates': rates,
+                'quotes': result['quotes'],
+                'estimated_weight': result['weight']
             })
         else:
             return jsonify({
                 'success': False,
-                'error': result['error']
+                'error': 'Kein Versand in dieses Land verfügbar'
             }), 400
             
     except Exception as e:
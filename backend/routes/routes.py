@@ -1,6 +1,7 @@
 from flask import render_template, request, jsonify, redirect, url_for, flash
 from app import app, db
 from backend.models.models import Configuration, Component, PrebuiltPC, Customer, Order, OrderItem, Invoice
+from backend.services.component_loader import get_component_loader, resolve_configuration
 import json
 import os
 import stripe
@@ -17,6 +18,8 @@ def load_components():
     try:
         # Load from MySQL database only
         db_components = Component.query.filter_by(is_active=True).all()
+        # Catalog snapshot lets saved configurations resolve without further queries
+        get_component_loader().add(db_components)
         for comp in db_components:
             if comp.category not in components:
                 components[comp.category] = []
@@ -63,8 +66,10 @@ def configurator():
         try:
             saved_config = Configuration.query.get(int(load_config_id))
             if saved_config:
-                # Parse the components JSON
-                saved_config.components_data = json.loads(saved_config.components)
+                # Resolve components against the catalog loaded above
+                saved_config.components_data = {
+                    key: part['id'] for key, part in resolve_configuration(saved_config).items()
+                }
         except:
             saved_config = None
     
@@ -322,11 +327,15 @@ def create_checkout_session():
         # Create line items from components
         line_items = []
         
+        # Load all selected components with one query
+        loader = get_component_loader()
+        loader.load(int(component_id) for component_id in data['components'].values() if component_id)
+        
         # Add each component as a line item
         for category, component_id in data['components'].items():
             if component_id:
                 # Find component details
-                component = Component.query.get(component_id)
+                component = loader.get(int(component_id))
                 if component:
                     line_items.append({
                         'price_data': {
@@ -394,10 +403,10 @@ def create_checkout_session():
         db.session.add(order)
         db.session.commit()
         
-        # Create order items
+        # Create order items (components were loaded in one query above)
         for category, component_id in data['components'].items():
             if component_id:
-                component = Component.query.get(component_id)
+                component = loader.get(int(component_id))
                 if component:
                     order_item = OrderItem(
                         order_id=order.id,
@@ -576,6 +585,33 @@ def stripe_webhook():
     
     return '', 200
 
+@app.route('/webhook/email-bounce', methods=['POST'])
+def email_bounce_webhook():
+    """Bounce-Meldungen des Mailproviders verarbeiten"""
+    expected_token = os.environ.get('EMAIL_BOUNCE_TOKEN')
+    if not expected_token or request.headers.get('X-Bounce-Token') != expected_token:
+        return '', 403
+    
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'JSON-Objekt erwartet'}), 400
+    bounces = data.get('bounces', [data])
+    if not isinstance(bounces, list) or not all(isinstance(bounce, dict) for bounce in bounces):
+        return jsonify({'error': 'bounces muss eine Liste von Objekten sein'}), 400
+    
+    from backend.services.email_service import process_bounce
+    unsubscribed = 0
+    for bounce in bounces:
+        result = process_bounce(
+            bounce.get('email'),
+            bounce_type=bounce.get('type', 'hard'),
+            smtp_code=bounce.get('code'),
+            reason=bounce.get('reason')
+        )
+        unsubscribed += result.get('unsubscribed', 0)
+    
+    return jsonify({'success': True, 'processed': len(bounces), 'unsubscribed': unsubscribed})
+
 
 # Legal pages
 @app.route('/widerrufsrecht')
@@ -602,7 +638,7 @@ def zahlungsmethoden():
 def test_email():
     """Test E-Mail-System mit verschiedenen Konfigurationen"""
     try:
-        from email_service import EmailService
+        from backend.services.email_service import EmailService
         email_service = EmailService()
         
         # Netzwerk-Tests
@@ -673,7 +709,8 @@ def test_email():
         
         # E-Mail senden mit Fehlerbehandlung
         try:
-            success = email_service._send_email(test_email, subject, html_body, text_body)
+            success = email_service._send_email(test_email, subject, html_body, text_body,
+                                                mail_type='test')
         except Exception as email_error:
             print(f"E-Mail-Fehler: {email_error}")
             success = False
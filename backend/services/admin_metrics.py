@@ -0,0 +1,165 @@
+"""
+Dashboard-Kennzahlen für den ByteDohm Admin-Bereich
+Alle Zähler mit einer Abfrage (bedingte Aggregate) - als Snapshot pro Worker für kurze Zeit zwischengespeichert
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import select, func, case, true, and_
+from app import db
+from backend.models.models import (Component, PrebuiltPC, Order, Customer, Invoice, ArchivedInvoice,
+                                   DailyOrderRollup)
+
+ADMIN_METRICS_TTL = float(os.environ.get('ADMIN_METRICS_TTL', '60'))
+RECENT_ORDER_LIMIT = 5
+
+rollup = DailyOrderRollup.__table__.c
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _sum_if(column, condition):
+    return func.coalesce(func.sum(case((condition, column), else_=0)), 0)
+
+
+def _rollup_is(dimension, value):
+    return and_(rollup.dimension == dimension, rollup.value == value)
+
+
+def _metrics_statement():
+    """Eine SELECT-Anweisung: je Tabelle ein aggregierter Block, per CROSS JOIN verbunden"""
+    components = select(
+        func.count().label('component_total'),
+        _count_if(Component.is_active.is_(True)).label('component_active')
+    ).subquery()
+    prebuilts = select(
+        func.count().label('prebuilt_total'),
+        _count_if(PrebuiltPC.is_active.is_(True)).label('prebuilt_active')
+    ).subquery()
+    # Bestellzahlen aus den Tageskennzahlen - enthalten auch archivierte Bestellungen
+    orders = select(
+        _sum_if(rollup.order_count, rollup.dimension == 'status').label('order_total'),
+        _sum_if(rollup.order_count, _rollup_is('status', 'pending')).label('order_pending'),
+        _sum_if(rollup.order_count, _rollup_is('status', 'processing')).label('order_processing'),
+        _sum_if(rollup.order_count, _rollup_is('status', 'delivered')).label('order_completed'),
+        _sum_if(rollup.amount, _rollup_is('payment', 'paid')).label('revenue_total'),
+        _sum_if(rollup.amount, _rollup_is('payment', 'pending')).label('revenue_pending')
+    ).subquery()
+    customers = select(func.count().label('customer_total')).select_from(Customer).subquery()
+    invoices = select(
+        func.count().label('invoice_total'),
+        _count_if(Invoice.status == 'paid').label('invoice_paid'),
+        _count_if(Invoice.status == 'overdue').label('invoice_overdue')
+    ).subquery()
+    archived_invoices = select(
+        func.count().label('archived_invoice_total'),
+        _count_if(ArchivedInvoice.status == 'paid').label('archived_invoice_paid'),
+        _count_if(ArchivedInvoice.status == 'overdue').label('archived_invoice_overdue')
+    ).subquery()
+
+    return select(components, prebuilts, orders, customers, invoices, archived_invoices).select_from(
+        components.join(prebuilts, true())
+        .join(orders, true())
+        .join(customers, true())
+        .join(invoices, true())
+        .join(archived_invoices, true())
+    )
+
+
+def _recent_orders():
+    """Letzte Bestellungen als Projektion (Nummer, Kunde, Betrag, Status)"""
+    rows = db.session.execute(
+        select(Order.id, Order.order_number, Order.total_amount, Order.status, Customer.email)
+        .outerjoin(Customer, Customer.id == Order.customer_id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(RECENT_ORDER_LIMIT)
+    ).all()
+    return [{
+        'id': row.id,
+        'order_number': row.order_number,
+        'total_amount': row.total_amount,
+        'status': row.status,
+        'customer': {'email': row.email}
+    } for row in rows]
+
+
+def collect_dashboard_metrics():
+    """
+    Kennzahlen des Admin-Dashboards neu berechnen
+
+    Returns:
+        dict: {'stats': {...}, 'recent_orders': [...], 'generated_at': datetime}
+    """
+    row = db.session.execute(_metrics_statement()).one()
+    stats = {
+        'components': {
+            'total': row.component_total,
+            'active': int(row.component_active),
+            'inactive': row.component_total - int(row.component_active)
+        },
+        'prebuilts': {
+            'total': row.prebuilt_total,
+            'active': int(row.prebuilt_active),
+            'inactive': row.prebuilt_total - int(row.prebuilt_active)
+        },
+        'orders': {
+            'total': int(row.order_total),
+            'pending': int(row.order_pending),
+            'processing': int(row.order_processing),
+            'completed': int(row.order_completed)
+        },
+        'customers': {
+            'total': row.customer_total
+        },
+        'revenue': {
+            'total': float(row.revenue_total or 0),
+            'pending': float(row.revenue_pending or 0)
+        },
+        'invoices': {
+            'total': row.invoice_total + row.archived_invoice_total,
+            'paid': int(row.invoice_paid) + int(row.archived_invoice_paid),
+            'overdue': int(row.invoice_overdue) + int(row.archived_invoice_overdue)
+        }
+    }
+    return {'stats': stats, 'recent_orders': _recent_orders(), 'generated_at': datetime.utcnow()}
+
+
+class MetricsSnapshot:
+    """Zuletzt berechnete Kennzahlen pro Worker - nur ein Request berechnet gleichzeitig neu"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or ADMIN_METRICS_TTL
+        self._snapshot = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, refresh=False):
+        if not refresh and self._snapshot and self._expires_at > time.monotonic():
+            return self._snapshot
+        with self._lock:
+            # Ein anderer Thread hat inzwischen neu berechnet
+            if not refresh and self._snapshot and self._expires_at > time.monotonic():
+                return self._snapshot
+            started = time.monotonic()
+            self._snapshot = collect_dashboard_metrics()
+            self._expires_at = time.monotonic() + self.ttl
+            logging.debug(f"Dashboard-Kennzahlen berechnet in {(time.monotonic() - started) * 1000:.1f} ms")
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0
+
+
+# Global instance (pro Worker-Prozess)
+dashboard_metrics = MetricsSnapshot()
+
+
+def get_dashboard_metrics(refresh=False):
+    """Kennzahlen aus dem Snapshot - refresh=True erzwingt eine Neuberechnung"""
+    return dashboard_metrics.get(refresh=refresh)
@@ -0,0 +1,220 @@
+"""
+Umsatzanalyse für den ByteDohm Admin-Bereich
+Beliebige Zeiträume in Tages-, Wochen- oder Monatsauflösung - aus den Tageskennzahlen, mit NumPy zusammengefasst
+"""
+
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import select, func, case, and_
+from app import db
+from backend.models.models import DailyOrderRollup, DailyItemSales
+
+GRANULARITIES = ('day', 'week', 'month')
+MAX_RANGE_DAYS = int(5 * 366)
+
+rollup_table = DailyOrderRollup.__table__
+item_sales_table = DailyItemSales.__table__
+
+
+class AnalyticsError(ValueError):
+    """Ungültige Parameter der Analyse-Anfrage"""
+
+
+def parse_range(start, end, granularity):
+    """
+    Anfrageparameter prüfen
+
+    Returns:
+        tuple: (start, end, granularity) - Standard sind die letzten 30 Tage in Tagen
+    """
+    try:
+        end = date.fromisoformat(end) if end else date.today()
+        start = date.fromisoformat(start) if start else end - timedelta(days=29)
+    except ValueError:
+        raise AnalyticsError('Datum im Format JJJJ-MM-TT angeben')
+    granularity = granularity or 'day'
+    if granularity not in GRANULARITIES:
+        raise AnalyticsError(f"Auflösung muss eine von {', '.join(GRANULARITIES)} sein")
+    if start > end:
+        raise AnalyticsError('Startdatum liegt nach dem Enddatum')
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise AnalyticsError('Zeitraum darf höchstens fünf Jahre umfassen')
+    return start, end, granularity
+
+
+def _shift_year(day, years=-1):
+    """Gleicher Kalendertag im Vorjahr (29.02. -> 28.02.)"""
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        return day.replace(year=day.year + years, day=28)
+
+
+def _calendar_key(period, granularity, years=0):
+    """
+    Kalenderschlüssel einer Periode für den Vorjahresvergleich
+
+    Tag -> Datum, Woche -> (ISO-Jahr, ISO-Woche), Monat -> (Jahr, Monat), jeweils um `years`
+    verschoben. None, wenn es die Periode im Zieljahr nicht gibt (29.02.).
+    """
+    day = date.fromisoformat(period)
+    if granularity == 'week':
+        iso_year, iso_week, _ = day.isocalendar()
+        return iso_year + years, iso_week
+    if granularity == 'month':
+        return day.year + years, day.month
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        return None
+
+
+def load_daily_series(start, end):
+    """
+    Tageswerte eines Zeitraums als dichte Arrays (Tage ohne Bestellungen = 0)
+
+    Returns:
+        dict: days (datetime64[D]), revenue, paid_orders, orders
+    """
+    rollup = rollup_table.c
+    is_paid = and_(rollup.dimension == 'payment', rollup.value == 'paid')
+    rows = db.session.execute(
+        select(rollup.day,
+               func.sum(case((is_paid, rollup.amount), else_=0)).label('revenue'),
+               func.sum(case((is_paid, rollup.order_count), else_=0)).label('paid_orders'),
+               func.sum(case((rollup.dimension == 'status', rollup.order_count), else_=0)).label('orders'))
+        .where(rollup.day >= start, rollup.day <= end)
+        .group_by(rollup.day)
+    ).all()
+
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    series = {
+        'days': days,
+        'revenue': np.zeros(len(days)),
+        'paid_orders': np.zeros(len(days)),
+        'orders': np.zeros(len(days))
+    }
+    if rows:
+        index = (np.array([np.datetime64(row.day, 'D') for row in rows]) - days[0]).astype(int)
+        series['revenue'][index] = [float(row.revenue or 0) for row in rows]
+        series['paid_orders'][index] = [int(row.paid_orders or 0) for row in rows]
+        series['orders'][index] = [int(row.orders or 0) for row in rows]
+    return series
+
+
+def _bucket_starts(days, granularity):
+    """Beginn des Intervalls je Tag: Tag selbst, Montag der Woche oder Monatserster"""
+    if granularity == 'week':
+        # 1970-01-01 war ein Donnerstag - Tage seit Montag über den Wochentag bestimmen
+        weekday = (days.astype('int64') + 3) % 7
+        return days - weekday.astype('timedelta64[D]')
+    if granularity == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+
+def resample(series, granularity):
+    """
+    Tageswerte auf Wochen oder Monate verdichten
+
+    Returns:
+        list: [{'period', 'revenue', 'orders', 'paid_orders', 'average_order_value'}]
+    """
+    buckets, inverse = np.unique(_bucket_starts(series['days'], granularity), return_inverse=True)
+    size = len(buckets)
+    revenue = np.bincount(inverse, weights=series['revenue'], minlength=size)
+    paid_orders = np.bincount(inverse, weights=series['paid_orders'], minlength=size)
+    orders = np.bincount(inverse, weights=series['orders'], minlength=size)
+    average = np.divide(revenue, paid_orders, out=np.zeros(size), where=paid_orders > 0)
+
+    return [{
+        'period': str(bucket),
+        'revenue': round(float(revenue[i]), 2),
+        'orders': int(orders[i]),
+        'paid_orders': int(paid_orders[i]),
+        'average_order_value': round(float(average[i]), 2)
+    } for i, bucket in enumerate(buckets)]
+
+
+def _totals(series):
+    revenue = float(series['revenue'].sum())
+    paid_orders = int(series['paid_orders'].sum())
+    return {
+        'revenue': round(revenue, 2),
+        'orders': int(series['orders'].sum()),
+        'paid_orders': paid_orders,
+        'average_order_value': round(revenue / paid_orders, 2) if paid_orders else 0.0
+    }
+
+
+def _change(current, previous):
+    """Veränderung in Prozent - None ohne Vorjahreswert"""
+    if not previous:
+        return None
+    return round((current - previous) / previous * 100, 1)
+
+
+def top_items(start, end, limit=10, item_type=None):
+    """Umsatzstärkste Artikel des Zeitraums"""
+    items = item_sales_table.c
+    query = select(items.item_type, items.item_name,
+                   func.sum(items.units).label('units'),
+                   func.sum(items.revenue).label('revenue')) \
+        .where(items.day >= start, items.day <= end)
+    if item_type:
+        query = query.where(items.item_type == item_type)
+    query = query.group_by(items.item_type, items.item_name) \
+        .order_by(func.sum(items.revenue).desc()) \
+        .limit(limit)
+    return [{
+        'item_type': row.item_type,
+        'item_name': row.item_name,
+        'units': int(row.units or 0),
+        'revenue': round(float(row.revenue or 0), 2)
+    } for row in db.session.execute(query)]
+
+
+def get_analytics(start, end, granularity='day', compare=False, top=10, item_type=None):
+    """
+    Umsatz, Bestellungen, durchschnittlicher Bestellwert und Top-Artikel eines Zeitraums
+
+    Args:
+        start, end (date): Zeitraum inklusive beider Tage
+        granularity (str): 'day', 'week' oder 'month'
+        compare (bool): gleichen Zeitraum des Vorjahres mitliefern
+
+    Returns:
+        dict: Zeitreihe, Summen, Top-Artikel und optional der Vorjahresvergleich
+    """
+    series = load_daily_series(start, end)
+    totals = _totals(series)
+    result = {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'totals': totals,
+        'series': resample(series, granularity),
+        'top_items': top_items(start, end, limit=top, item_type=item_type)
+    }
+
+    if compare:
+        previous_start, previous_end = _shift_year(start), _shift_year(end)
+        previous = load_daily_series(previous_start, previous_end)
+        previous_totals = _totals(previous)
+        previous_series = resample(previous, granularity)
+        # Perioden über den Kalender zuordnen (Tag zu Tag, ISO-Woche zu ISO-Woche, Monat zu Monat) -
+        # nicht über die Position, sonst verschiebt ein 29.02. oder ein anderer Wochenbeginn alles danach
+        previous_by_key = {_calendar_key(entry['period'], granularity): entry for entry in previous_series}
+        for entry in result['series']:
+            previous_entry = previous_by_key.get(_calendar_key(entry['period'], granularity, years=-1))
+            previous_revenue = previous_entry['revenue'] if previous_entry else None
+            entry['previous_revenue'] = previous_revenue
+            entry['revenue_change'] = _change(entry['revenue'], previous_revenue)
+        result['comparison'] = {
+            'start': previous_start.isoformat(),
+            'end': previous_end.isoformat(),
+            'totals': previous_totals,
+            'series': previous_series,
+            'change': {key: _change(totals[key], previous_totals[key]) for key in totals}
+        }
+    return result
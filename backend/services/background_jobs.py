@@ -0,0 +1,167 @@
+"""
+Hintergrund-Jobs für ByteDohm
+Führt lange Admin-Aktionen (Tracking-Abgleich, Sammel-Etiketten, Sammelaktionen) außerhalb des Requests aus
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import defer
+from app import db
+from backend.models.models import BackgroundJob
+
+# Ergebnisse pro Job werden auf diese Anzahl begrenzt gespeichert
+MAX_STORED_RESULTS = 5000
+
+
+class JobContext:
+    """Fortschritt eines laufenden Jobs - wird gedrosselt in background_jobs geschrieben"""
+
+    def __init__(self, job_id, total=0, flush_interval=1.0):
+        self.id = job_id
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.results = []
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def set_total(self, total):
+        with self._lock:
+            self.total = total
+        self.flush(force=True)
+
+    def advance(self, done=1, failed=0, result=None):
+        """Fortschritt melden (thread-sicher)"""
+        with self._lock:
+            self.done += done
+            self.failed += failed
+            if result is not None and len(self.results) < MAX_STORED_RESULTS:
+                self.results.append(result)
+        self.flush()
+
+    def flush(self, force=False, **fields):
+        now = time.time()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        with self._lock:
+            values = {
+                'total': self.total,
+                'done': self.done,
+                'failed': self.failed,
+                'results': json.dumps(self.results, default=str)
+            }
+        values.update(fields)
+        _update_job(self.id, **values)
+
+
+def _update_job(job_id, **values):
+    """Job-Status unabhängig von der ORM-Session des Jobs speichern"""
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(
+                BackgroundJob.__table__.update()
+                .where(BackgroundJob.__table__.c.id == job_id)
+                .values(**values))
+    except Exception as e:
+        logging.warning(f"Job-Status {job_id} konnte nicht gespeichert werden: {e}")
+
+
+class JobManager:
+    """Begrenzter Thread-Pool für Hintergrund-Jobs eines Workers"""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or int(os.environ.get('BACKGROUND_JOB_WORKERS', '2'))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='bytedohm-job')
+            return self._executor
+
+    def submit(self, name, fn, *args, total=0, created_by=None, **kwargs):
+        """
+        Job anlegen und im Hintergrund starten
+
+        Args:
+            name (str): Job-Typ
+            fn (callable): fn(job, *args, **kwargs) - job ist ein JobContext
+
+        Returns:
+            str: Job-ID für den Fortschritts-Endpunkt
+        """
+        job_id = uuid.uuid4().hex
+        with db.engine.begin() as connection:
+            connection.execute(BackgroundJob.__table__.insert().values(
+                id=job_id,
+                name=name,
+                status='queued',
+                total=total,
+                done=0,
+                failed=0,
+                created_by=created_by,
+                created_at=datetime.utcnow()
+            ))
+
+        self._get_executor().submit(self._run, job_id, total, fn, args, kwargs)
+        logging.info(f"Hintergrund-Job {name} ({job_id}) gestartet")
+        return job_id
+
+    def run_inline(self, name, fn, *args, total=0, created_by=None, **kwargs):
+        """Job im aktuellen Thread ausführen (CLI / Cron) - mit gleichem Fortschritts-Tracking"""
+        job_id = uuid.uuid4().hex
+        with db.engine.begin() as connection:
+            connection.execute(BackgroundJob.__table__.insert().values(
+                id=job_id, name=name, status='queued', total=total, done=0, failed=0,
+                created_by=created_by, created_at=datetime.utcnow()
+            ))
+        return self._execute(job_id, total, fn, args, kwargs)
+
+    def _run(self, job_id, total, fn, args, kwargs):
+        from app import app
+        with app.app_context():
+            try:
+                self._execute(job_id, total, fn, args, kwargs)
+            finally:
+                db.session.remove()
+
+    def _execute(self, job_id, total, fn, args, kwargs):
+        job = JobContext(job_id, total)
+        _update_job(job_id, status='running', started_at=datetime.utcnow())
+        try:
+            outcome = fn(job, *args, **kwargs)
+            job.flush(force=True, status='finished', finished_at=datetime.utcnow())
+            return outcome
+        except Exception as e:
+            db.session.rollback()
+            logging.exception(f"Hintergrund-Job {job_id} fehlgeschlagen")
+            job.flush(force=True, status='failed', error=str(e)[:2000],
+                      finished_at=datetime.utcnow())
+            return None
+
+
+# Global instance
+job_manager = JobManager()
+
+
+def submit_job(name, fn, *args, **kwargs):
+    """Starte Hintergrund-Job"""
+    return job_manager.submit(name, fn, *args, **kwargs)
+
+
+def get_job(job_id, include_results=False):
+    """Lade Job-Status - die Ergebnisliste nur bei Bedarf (Fortschrittsabfragen bleiben klein)"""
+    query = db.session.query(BackgroundJob)
+    if not include_results:
+        query = query.options(defer(BackgroundJob.results))
+    return query.filter(BackgroundJob.id == job_id).first()
@@ -0,0 +1,118 @@
+"""
+Sammelaktionen für Bestellungen im ByteDohm Admin-Bereich
+Status-, Zahlungs- und Rechnungsänderungen als Hintergrund-Job - je Stapel wenige UPDATE-Anweisungen
+"""
+
+import os
+import logging
+from datetime import datetime
+from app import db
+from backend.models.models import Order, Invoice
+from backend.services.order_rollups import refresh_stats_for_orders
+from backend.services.email_service import queue_status_update_email, queue_shipping_notification_email
+
+ORDER_STATUSES = ('pending', 'processing', 'shipped', 'delivered', 'cancelled')
+PAYMENT_STATUSES = ('pending', 'paid', 'failed', 'refunded')
+INVOICE_STATUSES = ('draft', 'sent', 'paid', 'overdue', 'cancelled')
+
+BULK_BATCH_SIZE = int(os.environ.get('BULK_ACTION_BATCH_SIZE', '500'))
+
+# Aktion -> (Spalte der Bestellung, erlaubte Werte)
+ORDER_FIELDS = {
+    'status': (Order.status, ORDER_STATUSES),
+    'payment_status': (Order.payment_status, PAYMENT_STATUSES)
+}
+
+
+def _batches(ids, size):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def notify_status_change(order_id, old_status, new_status, tracking_number=None):
+    """Kunden-E-Mail zu einem Statuswechsel in die Versand-Warteschlange stellen"""
+    if new_status == 'shipped' and tracking_number:
+        queue_shipping_notification_email(order_id)
+    else:
+        queue_status_update_email(order_id, old_status, new_status)
+
+
+def bulk_update_orders(job, order_ids, field, value, batch_size=None):
+    """
+    Status oder Zahlungsstatus vieler Bestellungen setzen
+
+    Je Stapel werden die alten Werte mit SELECT ... FOR UPDATE gelesen und alle abweichenden
+    Zeilen mit einem UPDATE geändert. Kennzahlen werden im selben Commit nachgezogen,
+    E-Mails erst danach in die Warteschlange gestellt.
+
+    Args:
+        job (JobContext): Fortschritt des Hintergrund-Jobs
+        field (str): 'status' oder 'payment_status'
+
+    Returns:
+        dict: Zusammenfassung
+    """
+    column, allowed = ORDER_FIELDS[field]
+    if value not in allowed:
+        raise ValueError(f'Ungültiger Wert für {field}: {value}')
+
+    summary = {'updated': 0, 'unchanged': 0, 'missing': 0}
+    for batch in _batches(order_ids, batch_size or BULK_BATCH_SIZE):
+        # Zeilen bis zum Commit sperren - parallele Änderungen warten, alter Wert und Update passen zusammen
+        rows = db.session.query(Order.id, column.label('old'), Order.tracking_number) \
+            .filter(Order.id.in_(batch)).with_for_update().all()
+        found = {row.id: row for row in rows}
+
+        changed = [row.id for row in rows if row.old != value]
+        if changed:
+            Order.query.filter(Order.id.in_(changed)) \
+                .update({column: value, Order.updated_at: datetime.utcnow()}, synchronize_session=False)
+        # Massen-Update löst keine Flush-Events aus - Kennzahlen direkt nachziehen
+        refresh_stats_for_orders(changed)
+        db.session.commit()
+
+        changed_set = set(changed)
+        for order_id in batch:
+            row = found.get(order_id)
+            if row is None:
+                summary['missing'] += 1
+                job.advance(failed=1, result={'order_id': order_id, 'error': 'Bestellung nicht gefunden'})
+            elif order_id in changed_set:
+                summary['updated'] += 1
+                if field == 'status':
+                    notify_status_change(order_id, row.old, value, row.tracking_number)
+                job.advance(result={'order_id': order_id, 'old': row.old, 'new': value})
+            else:
+                summary['unchanged'] += 1
+                job.advance(result={'order_id': order_id, 'old': row.old, 'new': row.old})
+
+        db.session.expunge_all()
+
+    logging.info(f"Sammelaktion {field}={value}: {summary}")
+    return summary
+
+
+def bulk_update_invoice_status(job, order_ids, value, batch_size=None):
+    """Status der Rechnungen vieler Bestellungen setzen - ein UPDATE je Stapel"""
+    if value not in INVOICE_STATUSES:
+        raise ValueError(f'Ungültiger Rechnungsstatus: {value}')
+
+    summary = {'updated': 0, 'without_invoice': 0}
+    for batch in _batches(order_ids, batch_size or BULK_BATCH_SIZE):
+        with_invoice = {order_id for order_id, in
+                        db.session.query(Invoice.order_id).filter(Invoice.order_id.in_(batch))}
+        if with_invoice:
+            summary['updated'] += Invoice.query.filter(Invoice.order_id.in_(with_invoice)) \
+                .update({Invoice.status: value}, synchronize_session=False)
+        db.session.commit()
+
+        for order_id in batch:
+            if order_id in with_invoice:
+                job.advance(result={'order_id': order_id, 'invoice_status': value})
+            else:
+                summary['without_invoice'] += 1
+                job.advance(failed=1, result={'order_id': order_id, 'error': 'Keine Rechnung vorhanden'})
+
+    logging.info(f"Sammelaktion Rechnungsstatus={value}: {summary}")
+    return summary
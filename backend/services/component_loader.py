@@ -0,0 +1,122 @@
+"""
+Komponenten-Auflösung für gespeicherte Konfigurationen
+Sammelt alle Komponenten-IDs eines Requests und lädt sie mit einer einzigen IN-Abfrage
+"""
+
+import json
+import logging
+from flask import g, has_request_context
+from backend.models.models import Component
+
+# Konfigurationen speichern Kategorien im Singular, die Komponenten-Tabelle im Plural
+CATEGORY_MAPPING = {
+    'cpu': 'cpus',
+    'motherboard': 'motherboards',
+    'ram': 'ram',
+    'gpu': 'gpus',
+    'ssd': 'ssds',
+    'case': 'cases',
+    'psu': 'psus',
+    'cooler': 'coolers'
+}
+
+
+def component_category(key):
+    """'cpu' -> 'cpus' (RAM bleibt 'ram')"""
+    return CATEGORY_MAPPING.get(key, key + 's')
+
+
+def parse_components(config):
+    """Gespeicherte Auswahl einer Konfiguration - {kategorie: komponenten_id}"""
+    try:
+        data = json.loads(config.components or '{}')
+    except (TypeError, ValueError):
+        logging.warning(f"Konfiguration {config.id}: ungültige Komponentenliste")
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    selection = {}
+    for key, component_id in data.items():
+        if isinstance(component_id, dict):
+            component_id = component_id.get('id')
+        try:
+            selection[key] = int(component_id)
+        except (TypeError, ValueError):
+            continue
+    return selection
+
+
+class ComponentLoader:
+    """Komponenten pro Request: bereits geladene werden nicht erneut abgefragt"""
+
+    def __init__(self):
+        self._components = {}  # id -> Component oder None (nicht vorhanden)
+
+    def add(self, components):
+        """Bereits geladene Komponenten übernehmen (z.B. den Katalog des Konfigurators)"""
+        for component in components:
+            self._components[component.id] = component
+
+    def load(self, ids):
+        """Fehlende IDs mit einer Abfrage nachladen"""
+        missing = {component_id for component_id in ids if component_id not in self._components}
+        if not missing:
+            return
+        for component in Component.query.filter(Component.id.in_(missing)).all():
+            self._components[component.id] = component
+        for component_id in missing:
+            self._components.setdefault(component_id, None)
+
+    def get(self, component_id):
+        self.load([component_id])
+        return self._components.get(component_id)
+
+    def resolve(self, configs):
+        """
+        Komponenten mehrerer Konfigurationen auflösen
+
+        Args:
+            configs (list): Configuration-Objekte
+
+        Returns:
+            dict: {config_id: {kategorie: {'id', 'name', 'price', 'category'}}}
+        """
+        selections = {config.id: parse_components(config) for config in configs}
+        self.load(component_id for selection in selections.values() for component_id in selection.values())
+
+        resolved = {}
+        for config_id, selection in selections.items():
+            parts = {}
+            for key, component_id in selection.items():
+                component = self._components.get(component_id)
+                # Nur Komponenten der passenden Kategorie übernehmen
+                if component is None or component.category != component_category(key):
+                    continue
+                parts[key] = {
+                    'id': component.id,
+                    'name': component.name,
+                    'price': component.price,
+                    'category': component.category
+                }
+            resolved[config_id] = parts
+        return resolved
+
+
+def get_component_loader():
+    """Loader des aktuellen Requests (außerhalb eines Requests jeweils neu)"""
+    if not has_request_context():
+        return ComponentLoader()
+    if '_component_loader' not in g:
+        g._component_loader = ComponentLoader()
+    return g._component_loader
+
+
+def resolve_configurations(configs):
+    """Komponenten für viele Konfigurationen mit einer Abfrage auflösen"""
+    return get_component_loader().resolve(configs)
+
+
+def resolve_configuration(config):
+    """Komponenten einer Konfiguration auflösen - {kategorie: teil}"""
+    return resolve_configurations([config]).get(config.id, {})
@@ -0,0 +1,220 @@
+"""
+Kundensuche für den ByteDohm Admin-Bereich
+Ein FULLTEXT-Suchdokument je Kunde (E-Mail, Name, Ort, PLZ, Bestellnummern) - im Flush fortgeschrieben
+"""
+
+import re
+import logging
+from datetime import datetime
+from sqlalchemy import event, select, delete, update, func, inspect, and_, or_, type_coerce, Float
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+from app import db
+from backend.models.models import Customer, Order, CustomerSearchIndex
+from backend.services.order_archive import all_orders
+from backend.utils.pagination import keyset_paginate, encode_cursor, decode_cursor, KeysetPage
+
+# Kürzere Begriffe indiziert InnoDB nicht (innodb_ft_min_token_size)
+MIN_TERM_LENGTH = 3
+SEARCH_PAGE_SIZE = 20
+CUSTOMER_FIELDS = ('email', 'first_name', 'last_name', 'city', 'postal_code')
+
+index_table = CustomerSearchIndex.__table__
+customers_table = Customer.__table__
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _document(customer_values, order_numbers):
+    parts = [str(customer_values[field]) for field in CUSTOMER_FIELDS if customer_values.get(field)]
+    parts.extend(order_numbers)
+    return ' '.join(parts)
+
+
+def refresh_search_documents(customer_ids, connection=None):
+    """Suchdokumente einzelner Kunden vollständig neu aufbauen"""
+    customer_ids = [cid for cid in set(customer_ids) if cid is not None]
+    if not customer_ids:
+        return 0
+    connection = connection or db.session.connection()
+
+    customers = {row.id: row._mapping for row in connection.execute(
+        select(customers_table.c.id, *(customers_table.c[field] for field in CUSTOMER_FIELDS))
+        .where(customers_table.c.id.in_(customer_ids)))}
+    # Archivierte Bestellungen bleiben über ihre Nummer auffindbar
+    orders = all_orders(['id', 'customer_id', 'order_number'],
+                        lambda table: table.c.customer_id.in_(customer_ids))
+    order_numbers = {}
+    for row in connection.execute(
+        select(orders.c.customer_id, orders.c.order_number).order_by(orders.c.id)
+    ):
+        order_numbers.setdefault(row.customer_id, []).append(row.order_number)
+
+    # Gelöschte Kunden aus dem Index entfernen
+    gone = [cid for cid in customer_ids if cid not in customers]
+    if gone:
+        connection.execute(delete(index_table).where(index_table.c.customer_id.in_(gone)))
+    if not customers:
+        return 0
+
+    now = datetime.utcnow()
+    stmt = mysql_insert(index_table).values([
+        {'customer_id': cid, 'document': _document(values, order_numbers.get(cid, [])), 'updated_at': now}
+        for cid, values in customers.items()
+    ])
+    connection.execute(stmt.on_duplicate_key_update(document=stmt.inserted.document,
+                                                    updated_at=stmt.inserted.updated_at))
+    return len(customers)
+
+
+def _append_order_numbers(connection, appended):
+    """Neue Bestellnummern an bestehende Dokumente anhängen - fehlende Dokumente vollständig aufbauen"""
+    existing = set(connection.execute(
+        select(index_table.c.customer_id).where(index_table.c.customer_id.in_(list(appended)))
+    ).scalars())
+    missing = [cid for cid in appended if cid not in existing]
+    if missing:
+        refresh_search_documents(missing, connection)
+    now = datetime.utcnow()
+    for cid in existing:
+        connection.execute(update(index_table)
+                           .where(index_table.c.customer_id == cid)
+                           .values(document=func.concat(index_table.c.document, ' ', ' '.join(appended[cid])),
+                                   updated_at=now))
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_search_index(session, flush_context):
+    """Geänderte Kunden und Bestellnummern im selben Flush nachziehen"""
+    rebuild = set()
+    appended = {}
+
+    for instance in session.new:
+        if isinstance(instance, Customer):
+            rebuild.add(instance.id)
+        elif isinstance(instance, Order) and instance.order_number:
+            appended.setdefault(instance.customer_id, []).append(instance.order_number)
+
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Customer):
+            state = inspect(instance)
+            if instance in session.deleted or any(state.attrs[field].history.has_changes()
+                                                  for field in CUSTOMER_FIELDS):
+                rebuild.add(instance.id)
+        elif isinstance(instance, Order):
+            state = inspect(instance)
+            customer_history = state.attrs.customer_id.history
+            if instance in session.deleted or customer_history.has_changes() \
+                    or state.attrs.order_number.history.has_changes():
+                rebuild.add(instance.customer_id)
+                rebuild.update(cid for cid in customer_history.deleted or () if cid is not None)
+
+    rebuild.discard(None)
+    appended.pop(None, None)
+    for cid in rebuild:
+        appended.pop(cid, None)
+    if not rebuild and not appended:
+        return
+
+    connection = session.connection()
+    if rebuild:
+        refresh_search_documents(rebuild, connection)
+    if appended:
+        _append_order_numbers(connection, appended)
+
+
+def boolean_query(term):
+    """Eingabe -> BOOLEAN MODE Ausdruck: jeder Begriff muss vorkommen, als Präfix ('+max* +muster*')"""
+    terms = [t for t in _TERM_RE.findall(term or '') if len(t) >= MIN_TERM_LENGTH]
+    if not terms:
+        return None
+    return ' '.join(f'+{t}*' for t in terms)
+
+
+def legacy_condition(term):
+    """Teilstring-Suche für Begriffe unter der FULLTEXT-Mindestlänge (ohne Index)"""
+    return (Customer.email.contains(term) |
+            Customer.first_name.contains(term) |
+            Customer.last_name.contains(term))
+
+
+def search_condition(term):
+    """WHERE-Bedingung auf Customer für Filter (z.B. Export) - nutzt den FULLTEXT-Index"""
+    query = boolean_query(term)
+    if query is None:
+        return legacy_condition(term)
+    return Customer.id.in_(
+        select(index_table.c.customer_id).where(index_table.c.document.match(query))
+    )
+
+
+def search_customers(term, cursor=None, per_page=SEARCH_PAGE_SIZE):
+    """
+    Kunden nach Relevanz suchen - seitenweise
+
+    Geblättert wird per Keyset über (Relevanz, id), so bleibt jeder Treffer erreichbar.
+    Begriffe unter der FULLTEXT-Mindestlänge blättern nach (created_at, id).
+
+    Returns:
+        KeysetPage: Customer-Objekte, beste Treffer zuerst
+    """
+    query = boolean_query(term)
+    if query is None:
+        return keyset_paginate(Customer.query.filter(legacy_condition(term)),
+                               Customer.created_at, Customer.id, cursor=cursor, per_page=per_page)
+
+    # MATCH ist in SQLAlchemy boolesch typisiert - für Vergleiche mit dem Cursor als Zahl behandeln
+    score = type_coerce(index_table.c.document.match(query), Float)
+    position = decode_cursor(cursor, score)
+    direction = position[2] if position else 'next'
+
+    statement = db.session.query(Customer, score.label('score')) \
+        .join(index_table, index_table.c.customer_id == Customer.id) \
+        .filter(score > 0)
+    if position:
+        value, row_id, _ = position
+        if direction == 'next':
+            statement = statement.filter(or_(score < value, and_(score == value, Customer.id < row_id)))
+        else:
+            statement = statement.filter(or_(score > value, and_(score == value, Customer.id > row_id)))
+    if direction == 'next':
+        statement = statement.order_by(score.desc(), Customer.id.desc())
+    else:
+        statement = statement.order_by(score.asc(), Customer.id.asc())
+
+    # Eine Zeile mehr laden, um zu wissen, ob es weitergeht
+    rows = statement.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+    if direction == 'next':
+        has_next, has_prev = has_more, position is not None
+    else:
+        has_next, has_prev = True, has_more
+
+    next_cursor = encode_cursor(rows[-1].score, rows[-1].Customer.id, 'next') if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0].score, rows[0].Customer.id, 'prev') if rows and has_prev else None
+    return KeysetPage([row.Customer for row in rows], per_page, next_cursor is not None,
+                      prev_cursor is not None, next_cursor, prev_cursor)
+
+
+def rebuild_search_index(batch_size=1000):
+    """Suchindex aller Kunden neu aufbauen - seitenweise nach Kunden-ID"""
+    last_id = 0
+    total = 0
+    while True:
+        customer_ids = db.session.execute(
+            select(Customer.id).where(Customer.id > last_id).order_by(Customer.id).limit(batch_size)
+        ).scalars().all()
+        if not customer_ids:
+            break
+        total += refresh_search_documents(customer_ids)
+        db.session.commit()
+        last_id = customer_ids[-1]
+    # Einträge gelöschter Kunden entfernen
+    db.session.execute(delete(index_table).where(
+        index_table.c.customer_id.notin_(select(customers_table.c.id))))
+    db.session.commit()
+    logging.info(f"Kunden-Suchindex neu aufgebaut: {total} Kunden")
+    return total
@@ -0,0 +1,447 @@
+"""
+Tägliche Verkaufskennzahlen für ByteDohm
+Umsatz, Bestellstatus, Artikel und Kunden je Tag - fortgeschrieben im Flush der Bestellung, gelesen von der Statistikseite
+"""
+
+import logging
+from datetime import datetime, date, timedelta
+from sqlalchemy import event, select, delete, func, case, literal, and_, or_, inspect, extract
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from app import db
+from backend.models.models import (Order, OrderItem, Customer, DailyOrderRollup, DailyItemSales,
+                                   DailyCustomerSales)
+from backend.services.order_archive import all_orders, all_order_items
+
+# Platzhalter für fehlenden Status (Teil des Primärschlüssels)
+UNKNOWN_VALUE = 'unknown'
+# Dimensionen in daily_order_rollups -> Spalte der Bestellung
+ORDER_DIMENSIONS = {
+    'status': 'status',
+    'payment': 'payment_status'
+}
+# Positionsfelder, die daily_item_sales beeinflussen
+ITEM_ATTRIBUTES = ('order_id', 'item_type', 'item_name', 'quantity', 'total_price')
+
+order_rollup_table = DailyOrderRollup.__table__
+item_sales_table = DailyItemSales.__table__
+customer_sales_table = DailyCustomerSales.__table__
+orders_table = Order.__table__
+order_items_table = OrderItem.__table__
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _day_ranges(days):
+    """Tage zu zusammenhängenden Zeiträumen [Beginn, Ende) zusammenfassen"""
+    ranges = []
+    for day in sorted(days):
+        if ranges and ranges[-1][1] == day:
+            ranges[-1][1] = day + timedelta(days=1)
+        else:
+            ranges.append([day, day + timedelta(days=1)])
+    return [(datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time()))
+            for start, end in ranges]
+
+
+def _created_in(days, table=orders_table):
+    """Bereichsbedingung auf created_at (nutzt den Index statt DATE(created_at))"""
+    return or_(*(and_(table.c.created_at >= start, table.c.created_at < end)
+                 for start, end in _day_ranges(days)))
+
+
+# --- Fortschreibung im Flush ---------------------------------------------------------------
+
+def apply_daily_deltas(connection, changes):
+    """
+    Bestelländerungen als Deltas auf Tages- und Kunden-Tageszeilen addieren
+
+    Args:
+        changes (list): (alt, neu) Snapshots aus order_rollups.collect_order_changes
+    """
+    order_deltas = {}     # (tag, dimension, wert) -> [anzahl, betrag]
+    customer_deltas = {}  # (tag, kunde) -> [anzahl, bezahlt, bezahlt_summe]
+
+    def add(values, sign):
+        day = _day(values['created_at'])
+        if day is None:
+            return
+        amount = float(values['total_amount'] or 0)
+        for dimension, key in ORDER_DIMENSIONS.items():
+            entry = order_deltas.setdefault((day, dimension, values[key] or UNKNOWN_VALUE), [0, 0.0])
+            entry[0] += sign
+            entry[1] += sign * amount
+        if values['customer_id'] is not None:
+            paid = values['payment_status'] == 'paid'
+            entry = customer_deltas.setdefault((day, values['customer_id']), [0, 0, 0.0])
+            entry[0] += sign
+            entry[1] += sign * int(paid)
+            entry[2] += sign * (amount if paid else 0.0)
+
+    for old, new in changes:
+        if old:
+            add(old, -1)
+        if new:
+            add(new, 1)
+
+    rows = [{'day': day, 'dimension': dimension, 'value': value, 'order_count': count, 'amount': amount}
+            for (day, dimension, value), (count, amount) in order_deltas.items() if count or amount]
+    if rows:
+        stmt = mysql_insert(order_rollup_table).values(rows)
+        connection.execute(stmt.on_duplicate_key_update(
+            order_count=order_rollup_table.c.order_count + stmt.inserted.order_count,
+            amount=order_rollup_table.c.amount + stmt.inserted.amount
+        ))
+
+    rows = [{'day': day, 'customer_id': customer_id, 'order_count': count, 'paid_count': paid_count,
+             'paid_total': paid_total}
+            for (day, customer_id), (count, paid_count, paid_total) in customer_deltas.items()
+            if count or paid_count or paid_total]
+    if rows:
+        stmt = mysql_insert(customer_sales_table).values(rows)
+        connection.execute(stmt.on_duplicate_key_update(
+            order_count=customer_sales_table.c.order_count + stmt.inserted.order_count,
+            paid_count=customer_sales_table.c.paid_count + stmt.inserted.paid_count,
+            paid_total=customer_sales_table.c.paid_total + stmt.inserted.paid_total
+        ))
+
+
+def _old_value(state, key):
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(state.obj(), key)
+
+
+def _order_days(session):
+    """Bestell-ID -> (alter Tag, neuer Tag) aller Bestellungen dieses Flushes"""
+    days = {}
+    for order in session.new:
+        if isinstance(order, Order):
+            days[order.id] = (None, _day(order.created_at))
+    for order in session.dirty:
+        if isinstance(order, Order):
+            days[order.id] = (_day(_old_value(inspect(order), 'created_at')), _day(order.created_at))
+    for order in session.deleted:
+        if isinstance(order, Order):
+            days[order.id] = (_day(_old_value(inspect(order), 'created_at')), None)
+    return days
+
+
+def collect_item_changes(session):
+    """
+    Alte und neue Werte geänderter Positionen aus einem Flush
+
+    Returns:
+        list: (Vorzeichen, 'old'/'new', Werte) - alte Werte mit -1, neue mit +1
+    """
+    changes = []
+    for item in session.new:
+        if isinstance(item, OrderItem):
+            changes.append((1, 'new', {key: getattr(item, key) for key in ITEM_ATTRIBUTES}))
+    for item in session.dirty:
+        if isinstance(item, OrderItem):
+            state = inspect(item)
+            if not any(state.attrs[key].history.has_changes() for key in ITEM_ATTRIBUTES):
+                continue
+            changes.append((-1, 'old', {key: _old_value(state, key) for key in ITEM_ATTRIBUTES}))
+            changes.append((1, 'new', {key: getattr(item, key) for key in ITEM_ATTRIBUTES}))
+    for item in session.deleted:
+        if isinstance(item, OrderItem):
+            changes.append((-1, 'old', {key: _old_value(inspect(item), key) for key in ITEM_ATTRIBUTES}))
+    return changes
+
+
+def apply_item_deltas(session, connection):
+    """
+    Positionsänderungen eines Flushes als Deltas auf daily_item_sales addieren
+
+    Der Tag einer Position ist der Bestelltag - für alte Werte der Tag vor dem Flush.
+    Umdatierte Bestellungen verschieben ihre übrigen Positionen vom alten auf den neuen Tag.
+    """
+    order_days = _order_days(session)
+    changes = collect_item_changes(session)
+    flushed_ids = {item.id for item in list(session.new) + list(session.dirty) + list(session.deleted)
+                   if isinstance(item, OrderItem)}
+
+    # Bestellungen außerhalb dieses Flushes haben sich nicht verändert: alter Tag = neuer Tag
+    unknown = {values['order_id'] for _, _, values in changes
+               if values['order_id'] is not None and values['order_id'] not in order_days}
+    if unknown:
+        for order_id, created_at in connection.execute(
+            select(orders_table.c.id, orders_table.c.created_at).where(orders_table.c.id.in_(unknown))
+        ):
+            order_days[order_id] = (_day(created_at), _day(created_at))
+
+    moved = {order_id: days for order_id, days in order_days.items()
+             if days[0] and days[1] and days[0] != days[1]}
+    if moved:
+        for row in connection.execute(
+            select(*(order_items_table.c[key] for key in ITEM_ATTRIBUTES), order_items_table.c.id)
+            .where(order_items_table.c.order_id.in_(list(moved)))
+        ):
+            if row.id in flushed_ids:
+                continue
+            values = {key: row._mapping[key] for key in ITEM_ATTRIBUTES}
+            changes.append((-1, 'old', values))
+            changes.append((1, 'new', values))
+
+    deltas = {}  # (tag, typ, name) -> [positionen, stück, umsatz]
+    for sign, side, values in changes:
+        days = order_days.get(values['order_id'])
+        day = days and (days[0] if side == 'old' else days[1])
+        if day is None:
+            continue
+        entry = deltas.setdefault((day, values['item_type'], values['item_name']), [0, 0, 0.0])
+        entry[0] += sign
+        entry[1] += sign * int(values['quantity'] or 0)
+        entry[2] += sign * float(values['total_price'] or 0)
+
+    rows = [{'day': day, 'item_type': item_type, 'item_name': item_name,
+             'line_count': lines, 'units': units, 'revenue': revenue}
+            for (day, item_type, item_name), (lines, units, revenue) in deltas.items()
+            if lines or units or revenue]
+    if rows:
+        stmt = mysql_insert(item_sales_table).values(rows)
+        connection.execute(stmt.on_duplicate_key_update(
+            line_count=item_sales_table.c.line_count + stmt.inserted.line_count,
+            units=item_sales_table.c.units + stmt.inserted.units,
+            revenue=item_sales_table.c.revenue + stmt.inserted.revenue
+        ))
+
+
+def update_daily_rollups(session, connection, changes):
+    """Aus dem after_flush-Hook von order_rollups aufgerufen - nur Deltas, keine Neuberechnung"""
+    if changes:
+        apply_daily_deltas(connection, changes)
+    apply_item_deltas(session, connection)
+
+
+# Alte Werte auch bei nicht geladenen Attributen vorhalten, damit Deltas exakt sind
+def _keep_history(target, value, oldvalue, initiator):
+    pass
+
+
+for _key in ITEM_ATTRIBUTES:
+    event.listen(getattr(OrderItem, _key), 'set', _keep_history, active_history=True)
+
+
+# --- Neuberechnung einzelner Tage ------------------------------------------------------------
+
+def refresh_item_sales(days, connection=None):
+    """
+    Artikelzahlen der angegebenen Tage vollständig aus order_items (inkl. Archiv) neu berechnen
+
+    Nur für Massen-Updates und den Backfill - im Flush laufen Deltas (apply_item_deltas).
+    """
+    days = {day for day in days if day}
+    if not days:
+        return
+    connection = connection or db.session.connection()
+    items = all_order_items(lambda table: _created_in(days, table))
+    day_column = func.date(items.c.created_at)
+
+    connection.execute(delete(item_sales_table).where(item_sales_table.c.day.in_(days)))
+    connection.execute(item_sales_table.insert().from_select(
+        ['day', 'item_type', 'item_name', 'line_count', 'units', 'revenue'],
+        select(day_column,
+               items.c.item_type,
+               items.c.item_name,
+               func.count(),
+               func.coalesce(func.sum(items.c.quantity), 0),
+               func.coalesce(func.sum(items.c.total_price), 0))
+        .group_by(day_column, items.c.item_type, items.c.item_name)
+    ))
+
+
+def refresh_daily_rollups(days, connection=None):
+    """
+    Alle Tageskennzahlen der angegebenen Tage vollständig neu berechnen
+
+    Für Massen-Updates (Query.update, bulk_update_mappings) und den Backfill.
+    Archivierte Bestellungen zählen mit (orders und orders_archive per UNION ALL).
+    """
+    days = {_day(day) for day in days if day}
+    if not days:
+        return 0
+    connection = connection or db.session.connection()
+    orders = all_orders(['customer_id', 'status', 'payment_status', 'total_amount', 'created_at'],
+                        lambda table: _created_in(days, table))
+    day_column = func.date(orders.c.created_at)
+
+    connection.execute(delete(order_rollup_table).where(order_rollup_table.c.day.in_(days)))
+    for dimension, key in ORDER_DIMENSIONS.items():
+        value_column = func.coalesce(orders.c[key], UNKNOWN_VALUE)
+        connection.execute(order_rollup_table.insert().from_select(
+            ['day', 'dimension', 'value', 'order_count', 'amount'],
+            select(day_column, literal(dimension), value_column, func.count(),
+                   func.coalesce(func.sum(orders.c.total_amount), 0))
+            .group_by(day_column, value_column)
+        ))
+
+    paid = orders.c.payment_status == 'paid'
+    connection.execute(delete(customer_sales_table).where(customer_sales_table.c.day.in_(days)))
+    connection.execute(customer_sales_table.insert().from_select(
+        ['day', 'customer_id', 'order_count', 'paid_count', 'paid_total'],
+        select(day_column, orders.c.customer_id, func.count(),
+               func.coalesce(func.sum(case((paid, 1), else_=0)), 0),
+               func.coalesce(func.sum(case((paid, orders.c.total_amount), else_=0)), 0))
+        .where(orders.c.customer_id.isnot(None))
+        .group_by(day_column, orders.c.customer_id)
+    ))
+
+    refresh_item_sales(days, connection)
+    return len(days)
+
+
+def refresh_daily_for_orders(order_ids, connection=None):
+    """Tageskennzahlen aller Tage der angegebenen Bestellungen neu berechnen"""
+    if not order_ids:
+        return 0
+    connection = connection or db.session.connection()
+    days = {_day(value) for value in connection.execute(
+        select(orders_table.c.created_at).where(orders_table.c.id.in_(order_ids))
+    ).scalars() if value}
+    return refresh_daily_rollups(days, connection)
+
+
+def rebuild_daily_rollups(days_per_batch=31):
+    """Alle Tageskennzahlen neu aufbauen (Backfill) - in Zeitfenstern, je Fenster eine Transaktion"""
+    orders = all_orders(['created_at'])
+    first, last = db.session.execute(
+        select(func.min(orders.c.created_at), func.max(orders.c.created_at))
+    ).one()
+    if first is None:
+        for table in (order_rollup_table, item_sales_table, customer_sales_table):
+            db.session.execute(delete(table))
+        db.session.commit()
+        return 0
+
+    first, last = first.date(), last.date()
+    # Zeilen außerhalb des Bestellzeitraums (z.B. gelöschte Bestellungen) entfernen
+    for table in (order_rollup_table, item_sales_table, customer_sales_table):
+        db.session.execute(delete(table).where(or_(table.c.day < first, table.c.day > last)))
+    db.session.commit()
+
+    total = 0
+    day = first
+    while day <= last:
+        window = [day + timedelta(days=offset) for offset in range(days_per_batch)
+                  if day + timedelta(days=offset) <= last]
+        total += refresh_daily_rollups(window)
+        db.session.commit()
+        day = window[-1] + timedelta(days=1)
+    logging.info(f"Tageskennzahlen neu aufgebaut: {total} Tage ({first} bis {last})")
+    return total
+
+
+# --- Auswertung ------------------------------------------------------------------------------
+
+def get_sales_statistics(recent_days=30, months=12, top_limit=10):
+    """
+    Kennzahlen der Statistikseite - liest ausschließlich die Tagestabellen
+
+    Returns:
+        dict: total_sales, monthly_sales, order_stats, payment_stats, monthly_revenue,
+              top_customers, popular_pcs
+    """
+    today = date.today()
+    recent_start = today - timedelta(days=recent_days)
+    month_start = date(today.year, today.month, 1)
+    for _ in range(months - 1):
+        month_start = (month_start - timedelta(days=1)).replace(day=1)
+
+    rollup = order_rollup_table.c
+    is_paid = and_(rollup.dimension == 'payment', rollup.value == 'paid')
+
+    # Status- und Zahlungsverteilung in einer Abfrage
+    order_stats = {}
+    payment_stats = []
+    total_sales = 0.0
+    for row in db.session.execute(
+        select(rollup.dimension, rollup.value,
+               func.sum(rollup.order_count).label('count'),
+               func.sum(rollup.amount).label('total'))
+        .group_by(rollup.dimension, rollup.value)
+    ):
+        if not row.count:
+            continue
+        if row.dimension == 'status':
+            order_stats[row.value] = int(row.count)
+        else:
+            payment_stats.append({
+                'payment_status': row.value,
+                'count': int(row.count),
+                'total': float(row.total or 0)
+            })
+            if row.value == 'paid':
+                total_sales = float(row.total or 0)
+
+    monthly_sales = db.session.execute(
+        select(func.coalesce(func.sum(rollup.amount), 0)).where(is_paid, rollup.day >= recent_start)
+    ).scalar()
+
+    # Umsatz je Kalendermonat (Jahr und Monat getrennt)
+    year_column = extract('year', rollup.day)
+    month_column = extract('month', rollup.day)
+    monthly_revenue = [{
+        'year': int(row.year),
+        'month': int(row.month),
+        'revenue': float(row.revenue or 0)
+    } for row in db.session.execute(
+        select(year_column.label('year'), month_column.label('month'), func.sum(rollup.amount).label('revenue'))
+        .where(is_paid, rollup.day >= month_start)
+        .group_by(year_column, month_column)
+        .order_by(year_column, month_column)
+    )]
+
+    customer_sales = customer_sales_table.c
+    top = select(customer_sales.customer_id,
+                 func.sum(customer_sales.paid_count).label('order_count'),
+                 func.sum(customer_sales.paid_total).label('total_spent')) \
+        .group_by(customer_sales.customer_id) \
+        .having(func.sum(customer_sales.paid_count) > 0) \
+        .order_by(func.sum(customer_sales.paid_total).desc()) \
+        .limit(top_limit) \
+        .subquery()
+    top_customers = [{
+        'email': row.email,
+        'first_name': row.first_name,
+        'last_name': row.last_name,
+        'order_count': int(row.order_count),
+        'total_spent': float(row.total_spent or 0)
+    } for row in db.session.execute(
+        select(Customer.email, Customer.first_name, Customer.last_name, top.c.order_count, top.c.total_spent)
+        .join(top, top.c.customer_id == Customer.id)
+        .order_by(top.c.total_spent.desc())
+    )]
+
+    items = item_sales_table.c
+    popular_pcs = [{
+        'item_name': row.item_name,
+        'order_count': int(row.order_count),
+        'total_revenue': float(row.total_revenue or 0)
+    } for row in db.session.execute(
+        select(items.item_name,
+               func.sum(items.line_count).label('order_count'),
+               func.sum(items.revenue).label('total_revenue'))
+        .where(items.item_type == 'prebuilt')
+        .group_by(items.item_name)
+        .order_by(func.sum(items.line_count).desc())
+        .limit(top_limit)
+    )]
+
+    return {
+        'total_sales': total_sales,
+        'monthly_sales': float(monthly_sales or 0),
+        'order_stats': order_stats,
+        'payment_stats': payment_stats,
+        'monthly_revenue': monthly_revenue,
+        'top_customers': top_customers,
+        'popular_pcs': popular_pcs
+    }
@@ -0,0 +1,149 @@
+"""
+Datenexport für den ByteDohm Admin-Bereich
+Bestellungen, Kunden und Rechnungen als CSV oder JSONL - zeilenweise vom Server-Cursor gelesen und gestreamt
+"""
+
+import io
+import csv
+import json
+import zlib
+from datetime import datetime, date
+from sqlalchemy import select
+from app import db
+from backend.models.models import Order, Customer, Invoice
+from backend.services.customer_search import search_condition
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_BATCH_SIZE = 1000
+# Ausgabe in Blöcken dieser Größe an den Client geben
+FLUSH_BYTES = 64 * 1024
+
+
+def _orders_statement(filters):
+    stmt = select(Order.id, Order.order_number, Order.order_type, Order.status, Order.payment_status,
+                  Order.total_amount, Order.tracking_number, Order.created_at, Order.updated_at,
+                  Customer.id.label('customer_id'), Customer.email.label('customer_email'),
+                  Customer.first_name.label('customer_first_name'),
+                  Customer.last_name.label('customer_last_name')) \
+        .outerjoin(Customer, Customer.id == Order.customer_id)
+    # Gleiche Filter wie admin_orders()
+    if filters.get('status'):
+        stmt = stmt.where(Order.status == filters['status'])
+    if filters.get('payment_status'):
+        stmt = stmt.where(Order.payment_status == filters['payment_status'])
+    return stmt.order_by(Order.created_at.desc(), Order.id.desc())
+
+
+def _customers_statement(filters):
+    stmt = select(Customer.id, Customer.email, Customer.first_name, Customer.last_name, Customer.phone,
+                  Customer.street, Customer.house_number, Customer.postal_code, Customer.city,
+                  Customer.country, Customer.newsletter_subscription, Customer.created_at)
+    # Gleiche Suche wie admin_customers() (FULLTEXT-Index)
+    search = (filters.get('search') or '').strip()
+    if search:
+        stmt = stmt.where(search_condition(search))
+    return stmt.order_by(Customer.created_at.desc(), Customer.id.desc())
+
+
+def _invoices_statement(filters):
+    stmt = select(Invoice.id, Invoice.invoice_number, Invoice.status, Invoice.issue_date, Invoice.due_date,
+                  Invoice.total_amount, Invoice.tax_amount,
+                  Order.order_number, Order.payment_status,
+                  Customer.email.label('customer_email')) \
+        .join(Order, Order.id == Invoice.order_id) \
+        .outerjoin(Customer, Customer.id == Order.customer_id)
+    # Gleiche Filter wie admin_invoices()
+    if filters.get('status'):
+        stmt = stmt.where(Invoice.status == filters['status'])
+    return stmt.order_by(Invoice.issue_date.desc(), Invoice.id.desc())
+
+
+EXPORTS = {
+    'orders': (_orders_statement, ('status', 'payment_status')),
+    'customers': (_customers_statement, ('search',)),
+    'invoices': (_invoices_statement, ('status',))
+}
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class _Output:
+    """Sammelt Text und gibt ihn blockweise (optional gzip-komprimiert) als bytes aus"""
+
+    def __init__(self, compress):
+        self._buffer = io.StringIO()
+        # wbits 16 + MAX_WBITS: gzip-Header statt zlib
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+
+    def write(self, text):
+        self._buffer.write(text)
+
+    def pending(self):
+        return self._buffer.tell() >= FLUSH_BYTES
+
+    def take(self, final=False):
+        data = self._buffer.getvalue().encode('utf-8')
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        if self._compressor:
+            data = self._compressor.compress(data)
+            if final:
+                data += self._compressor.flush()
+        return data
+
+
+def stream_export(entity, export_format='csv', filters=None, compress=True):
+    """
+    Export als Generator von bytes-Blöcken
+
+    Die Zeilen kommen als Core-Tupel über einen Server-Cursor (stream_results/yield_per),
+    es wird also weder die Ergebnismenge noch ein ORM-Objekt im Speicher gehalten.
+
+    Args:
+        entity (str): 'orders', 'customers' oder 'invoices'
+        export_format (str): 'csv' oder 'jsonl'
+        filters (dict): Filter wie in den Admin-Listen
+        compress (bool): gzip on the fly
+    """
+    build_statement, _ = EXPORTS[entity]
+    statement = build_statement(filters or {}).execution_options(stream_results=True,
+                                                                 yield_per=EXPORT_BATCH_SIZE)
+    output = _Output(compress)
+    writer = csv.writer(output) if export_format == 'csv' else None
+
+    result = db.session.execute(statement)
+    try:
+        columns = list(result.keys())
+        if writer:
+            writer.writerow(columns)
+
+        for row in result:
+            values = [_plain(value) for value in row]
+            if writer:
+                writer.writerow(values)
+            else:
+                output.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False, default=str))
+                output.write('\n')
+            if output.pending():
+                chunk = output.take()
+                if chunk:
+                    yield chunk
+    finally:
+        result.close()
+
+    yield output.take(final=True)
+
+
+def export_filename(entity, export_format, compress):
+    name = f"{entity}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return name + '.gz' if compress else name
+
+
+def export_mimetype(export_format, compress):
+    if compress:
+        return 'application/gzip'
+    return 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson; charset=utf-8'
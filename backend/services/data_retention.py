@@ -0,0 +1,104 @@
+"""
+Aufbewahrungsregeln für ByteDohm
+Abgelaufene Kunden-Sessions und verwaiste anonyme Konfigurationen in kleinen DELETE ... LIMIT Stapeln löschen
+"""
+
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import db
+
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', '1000'))
+# Pause zwischen zwei Stapeln - hält Sperren und Replikationsverzug klein
+RETENTION_PAUSE = float(os.environ.get('RETENTION_PAUSE', '0.05'))
+
+# Abgelaufene und abgemeldete Sessions noch so viele Tage nach Ablauf aufheben (Nachvollziehbarkeit
+# von Logins). is_active unterscheidet beides nicht - validate_customer_session und
+# cleanup_expired_sessions deaktivieren auch abgelaufene Sessions -, daher gilt nur expires_at.
+SESSION_RETENTION_DAYS = int(os.environ.get('SESSION_RETENTION_DAYS', '7'))
+# Anonyme Konfigurationen werden nur für Warenkorb und Stripe-Checkout gebraucht
+CONFIGURATION_RETENTION_DAYS = int(os.environ.get('CONFIGURATION_RETENTION_DAYS', '30'))
+
+
+def _policies(now):
+    """
+    Regeln als (Name, Tabelle, WHERE-Bedingung, Parameter)
+
+    Jede Bedingung läuft über einen Index (ix_customer_sessions_expires,
+    ix_configurations_customer_created).
+    """
+    return [
+        ('expired_sessions', 'customer_sessions',
+         'expires_at < :cutoff', {'cutoff': now - timedelta(days=SESSION_RETENTION_DAYS)}),
+        ('anonymous_configurations', 'configurations',
+         'customer_id IS NULL AND created_at < :cutoff',
+         {'cutoff': now - timedelta(days=CONFIGURATION_RETENTION_DAYS)}),
+    ]
+
+
+def delete_in_batches(table, condition, params, batch_size=None, pause=None, max_batches=None):
+    """
+    Zeilen stapelweise löschen - je Stapel eine eigene kurze Transaktion
+
+    Returns:
+        dict: {'deleted', 'batches', 'seconds'}
+    """
+    batch_size = batch_size or RETENTION_BATCH_SIZE
+    pause = RETENTION_PAUSE if pause is None else pause
+    statement = text(f"DELETE FROM {table} WHERE {condition} ORDER BY id LIMIT :batch_size")
+
+    deleted = 0
+    batches = 0
+    started = time.monotonic()
+    while max_batches is None or batches < max_batches:
+        with db.engine.begin() as connection:
+            count = connection.execute(statement, {**params, 'batch_size': batch_size}).rowcount
+        batches += 1
+        deleted += count
+        if count < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return {'deleted': deleted, 'batches': batches, 'seconds': round(time.monotonic() - started, 2)}
+
+
+def count_candidates(table, condition, params):
+    """Anzahl der Zeilen, die eine Regel löschen würde (für --dry-run)"""
+    with db.engine.connect() as connection:
+        return connection.execute(text(f"SELECT COUNT(*) FROM {table} WHERE {condition}"), params).scalar()
+
+
+def run_retention(job=None, batch_size=None, pause=None, dry_run=False):
+    """
+    Alle Aufbewahrungsregeln anwenden
+
+    Args:
+        job (JobContext): optional - Fortschritt je Regel
+        dry_run (bool): nur zählen, nichts löschen
+
+    Returns:
+        dict: Kennzahlen je Regel und Summe
+    """
+    policies = _policies(datetime.utcnow())
+    if job:
+        job.set_total(len(policies))
+
+    summary = {'dry_run': dry_run, 'deleted': 0, 'policies': {}}
+    for name, table, condition, params in policies:
+        if dry_run:
+            metrics = {'candidates': count_candidates(table, condition, params)}
+        else:
+            metrics = delete_in_batches(table, condition, params, batch_size=batch_size, pause=pause)
+            summary['deleted'] += metrics['deleted']
+            logging.info(f"Aufbewahrung {name}: {metrics['deleted']} Zeilen in {metrics['batches']} "
+                         f"Stapeln, {metrics['seconds']}s")
+        summary['policies'][name] = metrics
+        if job:
+            job.advance(result={'policy': name, **metrics})
+
+    if not dry_run:
+        # Sessions wurden außerhalb des ORM gelöscht - nichts Veraltetes in der Session halten
+        db.session.expire_all()
+    return summary
@@ -7,11 +7,23 @@ import os
 import requests
 import json
 import base64
-from datetime import datetime, timedelta
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import joinedload
 from backend.models.models import Order, Customer
+from backend.services.dhl_token_cache import DHLTokenCache, token_cache
+from backend.services.tracking_cache import tracking_cache
+from backend.services.http_transport import dhl_transport, CircuitOpenError
+from backend.services.dhl_alternatives import get_alternative_tracking_data
+from backend.services.shipping_rates import rate_table
+from backend.services.label_store import store_label_from_url
+from backend.services.order_rollups import refresh_stats_for_orders
 from app import db
 import logging
 
+# (Verbindungsaufbau, Lesen) in Sekunden - Tracking-Seiten sollen nicht lange blockieren
+TRACKING_TIMEOUT = (3.05, float(os.environ.get('DHL_TRACKING_READ_TIMEOUT', '8')))
+
 class DHLShippingAPI:
     """DHL Paket DE Versenden API - Geschäftskunden Integration"""
     
@@ -31,10 +43,12 @@ class DHLShippingAPI:
         self.auth_url = f"{self.base_url}/post-de/auth/v1/authenticate"
         self.shipping_url = f"{self.base_url}/post-de/shipping/v2/orders"
         self.track_url = f"{self.base_url}/track/shipments"
+        self.track_api_url = self.track_url
+        self.api_key = os.environ.get('DHL_API_KEY')  # Shipment Tracking - Unified API-Key
         
-        # OAuth Token
+        # OAuth Token - wird über token_cache zwischen allen Workern geteilt
         self.access_token = None
-        self.token_expires_at = None
+        self.token_cache_key = DHLTokenCache.cache_key(self.base_url, self.username, self.ekp_number)
         
         # Abrechnungsnummer: EKP + Verfahrensnummer + Teilnahmenummer
         # Verfahrensnummer "01" für DHL Paket
@@ -53,49 +67,54 @@ class DHLShippingAPI:
         }
         
     def authenticate(self):
-        """DHL API Authentifizierung"""
+        """DHL API Authentifizierung (Token wird prozessübergreifend gecacht)"""
         try:
             if not self.username or not self.password or not self.ekp_number:
                 return {'success': False, 'error': 'DHL Zugangsdaten (Username, Passwort, EKP) nicht vollständig konfiguriert'}
             
-            # Prüfe ob Token noch gültig ist
-            if self.access_token and self.token_expires_at and datetime.now() < self.token_expires_at:
-                return {'success': True}
-            
-            # DHL API Authentication - Direkte DHL Credentials
-            auth_data = {
-                'username': self.username,
-                'password': self.password,
-                'ekp_number': self.ekp_number,
-                'participation_number': self.participation_number
-            }
-            
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            
-            logging.info("Versuche DHL API Authentifizierung")
-            response = requests.post(self.auth_url, json=auth_data, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                token_data = response.json()
-                self.access_token = token_data.get('access_token')
-                expires_in = token_data.get('expires_in', 3600)  # Default 1 Stunde
-                self.token_expires_at = datetime.now() + timedelta(seconds=expires_in - 300)  # 5 Min Puffer
-                
-                logging.info("DHL API Authentifizierung erfolgreich")
-                return {'success': True}
-            else:
-                error_msg = f"DHL Authentifizierung fehlgeschlagen: {response.status_code}"
-                logging.error(f"{error_msg} - {response.text}")
-                return {'success': False, 'error': error_msg}
+            self.access_token = token_cache.get_token(self.token_cache_key, self._fetch_token)
+            return {'success': True}
                 
         except Exception as e:
             error_msg = f"DHL Authentifizierung Fehler: {str(e)}"
             logging.error(error_msg)
             return {'success': False, 'error': error_msg}
 
+    def invalidate_token(self):
+        """Gecachtes Token verwerfen (z.B. nach HTTP 401)"""
+        self.access_token = None
+        token_cache.invalidate(self.token_cache_key)
+
+    def _fetch_token(self):
+        """Neues Token bei DHL anfordern - Rückgabe (access_token, expires_in)"""
+        # DHL API Authentication - Direkte DHL Credentials
+        auth_data = {
+            'username': self.username,
+            'password': self.password,
+            'ekp_number': self.ekp_number,
+            'participation_number': self.participation_number
+        }
+        
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        
+        logging.info("Versuche DHL API Authentifizierung")
+        response = dhl_transport.post('auth', self.auth_url, json=auth_data, headers=headers, timeout=(5, 30))
+        
+        if response.status_code != 200:
+            logging.error(f"DHL Authentifizierung fehlgeschlagen: {response.status_code} - {response.text}")
+            raise RuntimeError(f"DHL Authentifizierung fehlgeschlagen: {response.status_code}")
+        
+        token_data = response.json()
+        access_token = token_data.get('access_token')
+        if not access_token:
+            raise RuntimeError("DHL Authentifizierung ohne access_token")
+        
+        logging.info("DHL API Authentifizierung erfolgreich")
+        return access_token, token_data.get('expires_in', 3600)  # Default 1 Stunde
+
     def create_shipping_label(self, order_id):
         """
         Erstelle DHL Versandetikett für eine Bestellung über DHL Paket DE API
@@ -117,7 +136,7 @@ class DHLShippingAPI:
             if not customer:
                 return {'success': False, 'error': 'Kunde nicht gefunden'}
             
-            # Versuche OAuth Authentifizierung
+            # Versuche OAuth Authentifizierung (Token meist aus dem Cache)
             auth_result = self.authenticate()
             
             if auth_result['success']:
@@ -127,17 +146,21 @@ class DHLShippingAPI:
                 # API Call für Label-Erstellung
                 response = self._make_shipping_request(shipment_data)
                 
+                if response.get('status_code') == 401:
+                    # Token wurde von DHL vorzeitig verworfen - einmal neu anmelden
+                    self.invalidate_token()
+                    if self.authenticate()['success']:
+                        response = self._make_shipping_request(shipment_data)
+                
                 if response.get('success'):
                     # Extrahiere Daten aus DHL Response
-                    order_data = response['data'].get('orders', [{}])[0]
-                    shipment = order_data.get('shipments', [{}])[0]
-                    
-                    tracking_number = shipment.get('shipmentNumber')
-                    label_url = shipment.get('labelUrl')
+                    order_data, tracking_number, label_url = self._extract_label(response['data'])
                     
                     # Speichere Tracking-Nummer in der Bestellung
                     order.tracking_number = tracking_number
                     order.shipping_label_url = label_url
+                    order.shipping_label_sha256 = store_label_from_url(label_url)
+                    order.shipping_label_created_at = datetime.utcnow()
                     order.status = 'shipped'
                     order.updated_at = datetime.utcnow()
                     db.session.commit()
@@ -148,35 +171,10 @@ class DHLShippingAPI:
                         'label_url': label_url,
                         'order_id': order_data.get('orderId')
                     }
-            
-            # Versuche DHL API Request
-            logging.info("Versuche DHL API für Versandetikett-Erstellung")
-            shipping_data = self._prepare_shipment_data_v2(order, customer)
-            result = self._make_shipping_request(shipping_data)
-            
-            if result.get('success'):
-                # DHL API-Antwort verarbeiten
-                label_data = result.get('data', {})
-                tracking_number = label_data.get('tracking_number')
-                label_url = label_data.get('label_url')
                 
-                if tracking_number:
-                    # Speichere echte Tracking-Daten
-                    order.tracking_number = tracking_number
-                    order.shipping_label_url = label_url
-                    order.status = 'shipped'
-                    order.updated_at = datetime.utcnow()
-                    db.session.commit()
-                    
-                    logging.info(f"DHL API: Echtes Label erstellt für Bestellung {order_id}: {tracking_number}")
-                    return {
-                        'success': True,
-                        'tracking_number': tracking_number,
-                        'label_url': label_url,
-                        'message': 'Versandetikett über DHL API erstellt'
-                    }
+                logging.warning(f"DHL API fehlgeschlagen: {response.get('error', 'Unbekannter Fehler')}")
             else:
-                logging.warning(f"DHL API fehlgeschlagen: {result.get('error', 'Unbekannter Fehler')}")
+                logging.warning(f"DHL Authentifizierung fehlgeschlagen: {auth_result['error']}")
             
             # Fallback: Erstelle detaillierte DHL Portal-Anweisungen für echte Versandmarken
             logging.warning("DHL API Freischaltung erforderlich - erstelle Portal-Anweisungen")
@@ -206,6 +204,142 @@ class DHLShippingAPI:
             logging.error(f"DHL Label Creation Error: {e}")
             return {'success': False, 'error': f'Fehler beim Erstellen des Labels: {str(e)}'}
     
+    def create_shipping_labels_bulk(self, order_ids, job=None, batch_size=50, max_workers=4):
+        """
+        Erstelle DHL Versandetiketten für mehrere Bestellungen
+        
+        Sendungsdaten werden in einem Datenbank-Durchgang vorbereitet, die DHL-Anfragen
+        laufen parallel. Tracking-Nummern werden je Batch in einer Transaktion gespeichert.
+        
+        Args:
+            order_ids (list): Bestellung IDs
+            job (JobContext): Optional - Fortschritt des Hintergrund-Jobs
+            
+        Returns:
+            dict: Ergebnis pro Bestellung
+        """
+        order_ids = list(dict.fromkeys(int(order_id) for order_id in order_ids))
+        results = []
+        
+        def report(result):
+            results.append(result)
+            if job:
+                job.advance(failed=0 if result['success'] else 1, result=result)
+        
+        # Ein Datenbank-Durchgang: Bestellungen samt Kunden laden und Sendungsdaten vorbereiten
+        orders = Order.query.options(joinedload(Order.customer)) \
+            .filter(Order.id.in_(order_ids)).all()
+        found = {order.id: order for order in orders}
+        
+        prepared = []
+        for order_id in order_ids:
+            order = found.get(order_id)
+            if not order:
+                report({'order_id': order_id, 'success': False, 'error': 'Bestellung nicht gefunden'})
+            elif not order.customer:
+                report({'order_id': order_id, 'success': False, 'error': 'Kunde nicht gefunden'})
+            elif order.status in ('shipped', 'delivered', 'cancelled'):
+                report({'order_id': order_id, 'success': False,
+                        'error': f'Bestellung hat bereits den Status {order.status}'})
+            else:
+                prepared.append({
+                    'order_id': order.id,
+                    'order_number': order.order_number,
+                    'payload': self._prepare_shipment_data_v2(order, order.customer),
+                    'portal_url': self._create_portal_shipping_instructions(order, order.customer)['portal_url']
+                })
+        db.session.expunge_all()
+        
+        if job:
+            job.set_total(len(order_ids))
+        
+        authenticated = self.authenticate()['success']
+        if not authenticated:
+            logging.warning("DHL Authentifizierung fehlgeschlagen - erstelle Portal-Anweisungen für alle Bestellungen")
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bytedohm-dhl-label') as executor:
+            for start in range(0, len(prepared), batch_size):
+                batch = prepared[start:start + batch_size]
+                
+                if authenticated:
+                    responses = list(executor.map(self._make_shipping_request,
+                                                  [item['payload'] for item in batch]))
+                    
+                    retry = [i for i, response in enumerate(responses) if response.get('status_code') == 401]
+                    if retry:
+                        # Token wurde von DHL vorzeitig verworfen - einmal neu anmelden
+                        self.invalidate_token()
+                        authenticated = self.authenticate()['success']
+                        if authenticated:
+                            retried = executor.map(self._make_shipping_request,
+                                                   [batch[i]['payload'] for i in retry])
+                            for i, response in zip(retry, retried):
+                                responses[i] = response
+                else:
+                    responses = [{'success': False, 'error': 'DHL Authentifizierung fehlgeschlagen'}] * len(batch)
+                
+                # Etiketten-PDFs parallel in die lokale Ablage laden
+                labels = [self._extract_label(response['data'])[1:] if response.get('success') else (None, None)
+                          for response in responses]
+                label_hashes = list(executor.map(store_label_from_url, [label_url for _, label_url in labels]))
+                
+                now = datetime.utcnow()
+                mappings = []
+                batch_results = []
+                for item, response, (tracking_number, label_url), label_sha256 in \
+                        zip(batch, responses, labels, label_hashes):
+                    if response.get('success'):
+                        mappings.append({'id': item['order_id'], 'tracking_number': tracking_number,
+                                         'shipping_label_url': label_url, 'status': 'shipped',
+                                         'shipping_label_sha256': label_sha256,
+                                         'shipping_label_created_at': now, 'updated_at': now})
+                        batch_results.append({'order_id': item['order_id'], 'order_number': item['order_number'],
+                                              'success': True, 'tracking_number': tracking_number,
+                                              'label_url': label_url})
+                    else:
+                        # Fallback wie bei Einzeletiketten: Portal-Anweisungen und vorläufige Tracking-Nummer
+                        temp_tracking = f"DHLDE{item['order_id']:08d}{datetime.now().strftime('%H%M')}"
+                        mappings.append({'id': item['order_id'], 'tracking_number': temp_tracking,
+                                         'shipping_label_url': item['portal_url'], 'status': 'processing',
+                                         'updated_at': now})
+                        batch_results.append({'order_id': item['order_id'], 'order_number': item['order_number'],
+                                              'success': True, 'tracking_number': temp_tracking,
+                                              'label_url': item['portal_url'], 'portal': True,
+                                              'error': response.get('error')})
+                
+                try:
+                    db.session.bulk_update_mappings(Order, mappings)
+                    refresh_stats_for_orders([mapping['id'] for mapping in mappings])
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logging.error(f"DHL Sammel-Etiketten: Speichern fehlgeschlagen: {e}")
+                    for result in batch_results:
+                        # Etikett existiert ggf. bei DHL - Tracking-Nummer im Ergebnis behalten
+                        result.update({'success': False, 'error': f'Speichern fehlgeschlagen: {str(e)}'})
+                
+                for result in batch_results:
+                    report(result)
+        
+        created = sum(1 for r in results if r['success'] and not r.get('portal'))
+        portal = sum(1 for r in results if r.get('portal') and r['success'])
+        failed = sum(1 for r in results if not r['success'])
+        logging.info(f"DHL Sammel-Etiketten: {created} erstellt, {portal} Portal-Anweisungen, {failed} fehlgeschlagen")
+        
+        return {
+            'success': failed == 0,
+            'created': created,
+            'portal': portal,
+            'failed': failed,
+            'results': results
+        }
+    
+    def _extract_label(self, response_data):
+        """Tracking-Nummer und Label-URL aus der DHL Antwort lesen"""
+        order_data = response_data.get('orders', [{}])[0]
+        shipment = order_data.get('shipments', [{}])[0]
+        return order_data, shipment.get('shipmentNumber'), shipment.get('labelUrl')
+    
     def _create_portal_shipping_instructions(self, order, customer):
         """Erstelle detaillierte Anweisungen für DHL Portal"""
         
@@ -411,7 +545,7 @@ class DHLShippingAPI:
             
             logging.info(f"DHL Shipping API Request: {self.shipping_url}")
             logging.info(f"DHL Request Data: {json.dumps(data, indent=2)}")
-            response = requests.post(self.shipping_url, json=data, headers=headers, timeout=30)
+            response = dhl_transport.post('shipping', self.shipping_url, json=data, headers=headers, timeout=(5, 30))
             logging.info(f"DHL Response Status: {response.status_code}")
             logging.info(f"DHL Response Body: {response.text[:1000]}")
             
@@ -434,9 +568,17 @@ class DHLShippingAPI:
                 
                 return {
                     'success': False,
+                    'status_code': response.status_code,
                     'error': f'DHL API Fehler: {error_msg}'
                 }
                 
+        except CircuitOpenError as e:
+            logging.warning(f"DHL Shipping API übersprungen: {e}")
+            return {
+                'success': False,
+                'circuit_open': True,
+                'error': 'DHL Versand-API vorübergehend nicht erreichbar'
+            }
         except requests.exceptions.RequestException as e:
             logging.error(f"DHL Shipping API Request Exception: {e}")
             return {
@@ -456,7 +598,8 @@ class DHLShippingAPI:
             
             params = {'trackingNumber': tracking_number}
             
-            response = requests.get(self.track_api_url, params=params, headers=headers, timeout=15)
+            response = dhl_transport.get('tracking', self.track_api_url, params=params, headers=headers,
+                                         timeout=TRACKING_TIMEOUT)
             
             logging.info(f"DHL Tracking API Response: {response.status_code} for {tracking_number}")
             
@@ -481,11 +624,13 @@ class DHLShippingAPI:
                 else:
                     return {
                         'success': False,
+                        'not_found': True,
                         'error': 'Keine Sendungsdaten gefunden'
                     }
             elif response.status_code == 404:
                 return {
                     'success': False,
+                    'not_found': True,
                     'error': 'Sendungsnummer nicht gefunden'
                 }
             else:
@@ -494,11 +639,20 @@ class DHLShippingAPI:
                     'error': f'DHL API Fehler: {response.status_code} - {response.text}'
                 }
                 
+        except CircuitOpenError:
+            # DHL gestört - sofort auf alternative Tracking-Optionen ausweichen
+            return {
+                'success': False,
+                'circuit_open': True,
+                'error': 'DHL Sendungsverfolgung vorübergehend nicht erreichbar',
+                'alternatives': get_alternative_tracking_data(tracking_number)
+            }
         except requests.RequestException as e:
             logging.error(f"DHL Tracking Request Error: {e}")
             return {
                 'success': False,
-                'error': f'Verbindungsfehler zur DHL API: {str(e)}'
+                'error': f'Verbindungsfehler zur DHL API: {str(e)}',
+                'alternatives': get_alternative_tracking_data(tracking_number)
             }
         except Exception as e:
             logging.error(f"DHL Tracking Error: {e}")
@@ -508,33 +662,18 @@ class DHLShippingAPI:
             }
     
     def get_shipping_rates(self, destination_country='DE', weight=1.0):
-        """Hole DHL Versandkosten"""
+        """Hole DHL Versandkosten aus der Zonen-/Gewichtsstaffel"""
         try:
-            # Für Deutschland meist kostenloser Versand
-            if destination_country == 'DE':
+            rates = rate_table.rates_for(destination_country, weight)
+            if not rates:
                 return {
-                    'success': True,
-                    'rates': [
-                        {
-                            'service': 'DHL Paket',
-                            'price': 0.00,  # Kostenloser Versand
-                            'currency': 'EUR',
-                            'delivery_time': '1-2 Werktage'
-                        }
-                    ]
-                }
-            else:
-                return {
-                    'success': True,
-                    'rates': [
-                        {
-                            'service': 'DHL Paket International',
-                            'price': 15.99,
-                            'currency': 'EUR', 
-                            'delivery_time': '3-5 Werktage'
-                        }
-                    ]
+                    'success': False,
+                    'error': f'Kein Versandtarif für {destination_country} ({weight} kg)'
                 }
+            return {
+                'success': True,
+                'rates': rates
+            }
                 
         except Exception as e:
             logging.error(f"DHL Rates Error: {e}")
@@ -549,10 +688,17 @@ def create_shipping_label_for_order(order_id):
     dhl = DHLShippingAPI()
     return dhl.create_shipping_label(order_id)
 
-def track_order_shipment(tracking_number):
-    """Verfolge Bestellung"""
+def create_shipping_labels_for_orders(job, order_ids):
+    """Erstelle Versandetiketten für mehrere Bestellungen (als Hintergrund-Job)"""
+    dhl = DHLShippingAPI()
+    return dhl.create_shipping_labels_bulk(order_ids, job=job)
+
+def track_order_shipment(tracking_number, use_cache=True):
+    """Verfolge Bestellung (über den Tracking-Cache des Workers)"""
     dhl = DHLShippingAPI()
-    return dhl.track_shipment(tracking_number)
+    if not use_cache:
+        return dhl.track_shipment(tracking_number)
+    return tracking_cache.get_or_fetch(tracking_number, dhl.track_shipment)
 
 def get_shipping_quote(destination='DE', weight=1.0):
     """Hole Versandkostenvoranschlag"""
@@ -0,0 +1,136 @@
+"""
+DHL OAuth Token Cache für ByteDohm
+Teilt das DHL Access-Token zwischen allen Passenger-Workern über eine Datei mit Dateisperre
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows - nur Prozess-interne Sperre
+    fcntl = None
+
+
+class DHLTokenCache:
+    """Datei-basierter Token-Cache mit Single-Flight-Refresh über Prozessgrenzen"""
+
+    def __init__(self, path=None, refresh_margin=None):
+        self.path = path or os.environ.get(
+            'DHL_TOKEN_CACHE_FILE',
+            os.path.join(tempfile.gettempdir(), 'bytedohm_dhl_token.json'))
+        self.lock_path = f"{self.path}.lock"
+
+        # Token wird so viele Sekunden vor Ablauf erneuert
+        self.refresh_margin = refresh_margin if refresh_margin is not None else \
+            int(os.environ.get('DHL_TOKEN_REFRESH_MARGIN', '300'))
+
+        self._thread_lock = threading.Lock()
+        self._memory = {}
+
+    @staticmethod
+    def cache_key(*parts):
+        """Schlüssel je Zugangsdaten/Umgebung, damit Sandbox- und Live-Token getrennt bleiben"""
+        return hashlib.sha256('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()[:16]
+
+    def get_token(self, key, fetch_token):
+        """
+        Liefere ein gültiges Access-Token
+
+        Args:
+            key (str): Cache-Schlüssel (siehe cache_key)
+            fetch_token (callable): Holt ein neues Token, Rückgabe (access_token, expires_in)
+
+        Returns:
+            str: Access-Token
+        """
+        token = self._valid_token(self._memory.get(key), key) or \
+            self._valid_token(self._read(), key)
+        if token:
+            return token
+
+        # Single-Flight: nur ein Thread pro Prozess und ein Prozess pro Host erneuert
+        with self._thread_lock:
+            with self._file_lock():
+                entry = self._read()
+                token = self._valid_token(entry, key)
+                if token:
+                    self._memory[key] = entry
+                    return token
+
+                access_token, expires_in = fetch_token()
+                entry = {
+                    'key': key,
+                    'access_token': access_token,
+                    'expires_at': time.time() + int(expires_in)
+                }
+                self._write(entry)
+                self._memory[key] = entry
+                logging.info("DHL Access-Token erneuert und im Cache gespeichert")
+                return access_token
+
+    def invalidate(self, key):
+        """Token verwerfen, z.B. nach einer 401-Antwort"""
+        with self._thread_lock:
+            self._memory.pop(key, None)
+            with self._file_lock():
+                entry = self._read()
+                if entry and entry.get('key') == key:
+                    try:
+                        os.remove(self.path)
+                    except OSError:
+                        pass
+
+    def _valid_token(self, entry, key):
+        if not entry or entry.get('key') != key:
+            return None
+        if entry.get('expires_at', 0) - self.refresh_margin <= time.time():
+            return None
+        return entry.get('access_token')
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, entry):
+        # Atomar schreiben, damit andere Worker nie eine halbe Datei lesen
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.dhl_token_')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"DHL Token-Cache konnte nicht geschrieben werden: {e}")
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        try:
+            lock_file = open(self.lock_path, 'a')
+        except OSError as e:
+            logging.warning(f"DHL Token-Cache Sperrdatei nicht verfügbar: {e}")
+            yield
+            return
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            lock_file.close()
+
+
+# Global instance
+token_cache = DHLTokenCache()
@@ -3,15 +3,68 @@ E-Mail Service für ByteDohm
 Sendet automatische E-Mails für Registrierung, Bestellungen, Status-Updates und Newsletter
 """
 import os
+import time
+import queue
+import socket
+import threading
 import smtplib
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from datetime import datetime
-from flask import render_template_string
-from backend.models.models import Customer, Order
+from datetime import datetime, timedelta
+from flask import render_template_string, has_app_context
+from sqlalchemy import func, case, select
+from app import db
+from backend.models.models import Customer, Order, EmailLog
+
+# Mail-Typen für Auswertungen im Admin-Bereich
+MAIL_TYPES = {
+    'registration': 'Registrierung',
+    'order_confirmation': 'Bestellbestätigung',
+    'shipping_notification': 'Versandbenachrichtigung',
+    'status_update': 'Status-Update',
+    'newsletter': 'Newsletter',
+    'test': 'Test',
+    'generic': 'Sonstige'
+}
+
+# Bounce-Meldungen des Mailproviders - eigene Zeilen in email_logs, aber kein eigener Mail-Typ
+BOUNCE_MAIL_TYPE = 'bounce'
+
+# Ab so vielen Soft-Bounces (innerhalb von SOFT_BOUNCE_WINDOW_DAYS) wird der Newsletter abbestellt
+SOFT_BOUNCE_LIMIT = int(os.environ.get('SOFT_BOUNCE_LIMIT', '3'))
+SOFT_BOUNCE_WINDOW_DAYS = 30
+
+
+def _decode_smtp_response(response):
+    """SMTP-Antwort (bytes) in kurzen Text umwandeln"""
+    if isinstance(response, bytes):
+        response = response.decode('utf-8', errors='replace')
+    return str(response)[:255] if response else None
+
+
+def _is_transient_smtp_error(error):
+    """Temporäre Fehler (Netzwerk, 4xx) dürfen wiederholt werden, 5xx nicht"""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected,
+                              smtplib.SMTPConnectError,
+                              socket.timeout,
+                              ConnectionError))
+
+
+def _record_delivery(record):
+    """Versandprotokoll unabhängig von der ORM-Session des Aufrufers speichern"""
+    if not has_app_context():
+        return
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(EmailLog.__table__.insert().values(
+                created_at=datetime.utcnow(), **record))
+    except Exception as e:
+        logging.warning(f"E-Mail-Protokoll konnte nicht gespeichert werden: {e}")
 
 
 class EmailService:
@@ -29,25 +82,45 @@ class EmailService:
                                            'no-reply@bytedohm.de')
         self.sender_name = "ByteDohm.de"
 
-    def _send_email(self, to_email, subject, html_body, text_body=None):
-        """Interne Funktion zum E-Mail-Versand"""
+        # Zustellung: Timeout und Wiederholungen bei temporären Fehlern
+        self.smtp_timeout = int(os.environ.get('SMTP_TIMEOUT', '30'))
+        self.max_retries = int(os.environ.get('SMTP_MAX_RETRIES', '2'))
+        self.retry_backoff = float(os.environ.get('SMTP_RETRY_BACKOFF', '2'))
+
+    def _send_email(self, to_email, subject, html_body, text_body=None,
+                    mail_type='generic', queued_at=None):
+        """Interne Funktion zum E-Mail-Versand
+
+        Jeder Versuch wird als EmailLog-Datensatz mit Warte-, Verbindungs-,
+        Login- und Sendezeit, SMTP-Antwortcode und Anzahl der Wiederholungen
+        protokolliert. queued_at (time.time()) erlaubt es Aufrufern aus einer
+        Warteschlange, die Wartezeit mitzumessen.
+        """
+        started_at = time.time()
+        record = {
+            'mail_type': mail_type,
+            'recipient': to_email,
+            'subject': (subject or '')[:255],
+            'status': 'failed',
+            'smtp_code': None,
+            'smtp_response': None,
+            'retry_count': 0,
+            'queue_ms': None,
+            'connect_ms': None,
+            'login_ms': None,
+            'send_ms': None,
+            'error': None
+        }
+
         try:
             print(f"\n=== E-MAIL DEBUG ===")
             print(f"SMTP Server: {self.smtp_server}")
             print(f"SMTP Port: {self.smtp_port}")
             print(f"SMTP Username: {self.smtp_username}")
-            print(
-                f"SMTP Password: {'*' * len(self.smtp_password) if self.smtp_password else 'None'}"
-            )
-            print(
-                f"Username length: {len(self.smtp_username) if self.smtp_username else 0}"
-            )
-            print(
-                f"Password length: {len(self.smtp_password) if self.smtp_password else 0}"
-            )
             print(f"From Email: {self.sender_email}")
             print(f"To Email: {to_email}")
             print(f"Subject: {subject}")
+            print(f"Mail-Typ: {mail_type}")
             print(f"===================\n")
 
             if not self.smtp_username or not self.smtp_password:
@@ -55,6 +128,7 @@ class EmailService:
                     "SMTP Credentials nicht konfiguriert - E-Mail wird nicht gesendet"
                 )
                 print("FEHLER: SMTP Credentials fehlen!")
+                record['error'] = 'SMTP Credentials nicht konfiguriert'
                 return False
 
             # E-Mail erstellen
@@ -72,54 +146,105 @@ class EmailService:
             html_part = MIMEText(html_body, 'html', 'utf-8')
             msg.attach(html_part)
 
-            print("Verbinde mit SMTP Server...")
-            # SMTP-Verbindung mit SSL/TLS-Verschlüsselung
-            import ssl
-
-            # Sichere SSL/TLS-Konfiguration
-            context = ssl.create_default_context()
-
-            # SMTP-Verbindung mit verbesserter Fehlerbehandlung
-            server = None
-            try:
-                if self.smtp_port == 465:
-                    # SSL-Verbindung für Port 465
-                    server = smtplib.SMTP_SSL(self.smtp_server,
-                                              self.smtp_port,
-                                              context=context)
-                    print("SSL-Verbindung hergestellt")
-                else:
-                    # STARTTLS für Port 587
-                    server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                    print("SMTP Verbindung hergestellt")
-                    server.starttls(context=context)
-                    print("TLS-Verschlüsselung aktiviert")
-
-                server.set_debuglevel(1)
-                server.login(self.smtp_username, self.smtp_password)
-                print("Login erfolgreich")
-                server.send_message(msg)
-                print("E-Mail gesendet!")
-
-            finally:
-                # Server-Verbindung sicher schließen
-                if server:
-                    try:
-                        server.quit()
-                    except:
-                        pass
-
+            # Wartezeit bis zum ersten Verbindungsversuch
+            record['queue_ms'] = (time.time() - (queued_at or started_at)) * 1000
+
+            attempt = 0
+            while True:
+                try:
+                    self._deliver(msg, record)
+                    break
+                except smtplib.SMTPRecipientsRefused as e:
+                    # Empfänger abgelehnt - kein Retry, als Bounce werten
+                    code, response = next(iter(e.recipients.values()), (None, b''))
+                    record['smtp_code'] = code
+                    record['smtp_response'] = _decode_smtp_response(response)
+                    record['status'] = 'bounced'
+                    raise
+                except Exception as e:
+                    if isinstance(e, smtplib.SMTPResponseException):
+                        record['smtp_code'] = e.smtp_code
+                        record['smtp_response'] = _decode_smtp_response(e.smtp_error)
+                    if attempt >= self.max_retries or not _is_transient_smtp_error(e):
+                        raise
+                    attempt += 1
+                    record['retry_count'] = attempt
+                    logging.warning(
+                        f"E-Mail an {to_email} fehlgeschlagen ({e}) - Wiederholung {attempt}/{self.max_retries}")
+                    time.sleep(self.retry_backoff * attempt)
+
+            record['status'] = 'sent'
             logging.info(
                 f"E-Mail erfolgreich gesendet an {to_email}: {subject}")
             print(f"SUCCESS: E-Mail an {to_email} gesendet!")
             return True
 
         except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"[:2000]
             logging.error(f"E-Mail-Versand fehlgeschlagen an {to_email}: {e}")
             print(f"FEHLER beim E-Mail-Versand: {e}")
             print(f"Fehlertyp: {type(e).__name__}")
             return False
 
+        finally:
+            _record_delivery(record)
+            if record['status'] == 'bounced':
+                # Erst nach dem Protokoll auswerten, damit dieser Bounce bei den Soft-Bounces mitzählt.
+                # 4xx (z.B. Postfach voll) ist nur vorübergehend - weicher Bounce
+                code = record['smtp_code']
+                process_bounce(to_email, bounce_type='soft' if code and 400 <= code < 500 else 'hard',
+                               smtp_code=record['smtp_code'],
+                               reason=record['smtp_response'],
+                               record=False)
+
+    def _deliver(self, msg, record):
+        """Eine Zustellung über SMTP inkl. Zeitmessung der einzelnen Phasen"""
+        import ssl
+
+        # Sichere SSL/TLS-Konfiguration
+        context = ssl.create_default_context()
+
+        server = None
+        try:
+            print("Verbinde mit SMTP Server...")
+            phase_start = time.time()
+            if self.smtp_port == 465:
+                # SSL-Verbindung für Port 465
+                server = smtplib.SMTP_SSL(self.smtp_server,
+                                          self.smtp_port,
+                                          context=context,
+                                          timeout=self.smtp_timeout)
+                print("SSL-Verbindung hergestellt")
+            else:
+                # STARTTLS für Port 587
+                server = smtplib.SMTP(self.smtp_server, self.smtp_port,
+                                      timeout=self.smtp_timeout)
+                print("SMTP Verbindung hergestellt")
+                server.starttls(context=context)
+                print("TLS-Verschlüsselung aktiviert")
+            record['connect_ms'] = (time.time() - phase_start) * 1000
+
+            phase_start = time.time()
+            server.login(self.smtp_username, self.smtp_password)
+            record['login_ms'] = (time.time() - phase_start) * 1000
+            print("Login erfolgreich")
+
+            phase_start = time.time()
+            server.send_message(msg)
+            record['send_ms'] = (time.time() - phase_start) * 1000
+            # send_message() wirft bei allem außer 250 auf DATA
+            record['smtp_code'] = 250
+            record['smtp_response'] = None
+            print("E-Mail gesendet!")
+
+        finally:
+            # Server-Verbindung sicher schließen
+            if server:
+                try:
+                    server.quit()
+                except:
+                    pass
+
     def send_registration_email(self, customer):
         """Willkommens-E-Mail nach Registrierung"""
         subject = "Willkommen bei ByteDohm.de!"
@@ -180,9 +305,10 @@ class EmailService:
                                            customer=customer,
                                            domain=domain)
 
-        return self._send_email(customer.email, subject, html_body)
+        return self._send_email(customer.email, subject, html_body,
+                                mail_type='registration')
 
-    def send_order_confirmation_email(self, order):
+    def send_order_confirmation_email(self, order, queued_at=None):
         """Bestellbestätigungs-E-Mail"""
         subject = f"Bestellbestätigung #{order.order_number} - ByteDohm.de"
 
@@ -255,9 +381,11 @@ class EmailService:
 
         html_body = render_template_string(html_template, order=order)
 
-        return self._send_email(order.customer.email, subject, html_body)
+        return self._send_email(order.customer.email, subject, html_body,
+                                mail_type='order_confirmation',
+                                queued_at=queued_at)
 
-    def send_shipping_notification_email(self, order):
+    def send_shipping_notification_email(self, order, queued_at=None):
         """Versandbenachrichtigung mit Tracking-Nummer"""
         subject = f"Ihre Bestellung #{order.order_number} wurde versandt - ByteDohm.de"
 
@@ -332,9 +460,11 @@ class EmailService:
 
         html_body = render_template_string(html_template, order=order)
 
-        return self._send_email(order.customer.email, subject, html_body)
+        return self._send_email(order.customer.email, subject, html_body,
+                                mail_type='shipping_notification',
+                                queued_at=queued_at)
 
-    def send_status_update_email(self, order, old_status, new_status):
+    def send_status_update_email(self, order, old_status, new_status, queued_at=None):
         """Status-Update E-Mail"""
         status_names = {
             'pending': 'Ausstehend',
@@ -414,7 +544,9 @@ class EmailService:
             old_status_name=status_names.get(old_status, old_status),
             new_status_name=status_names.get(new_status, new_status))
 
-        return self._send_email(order.customer.email, subject, html_body)
+        return self._send_email(order.customer.email, subject, html_body,
+                                mail_type='status_update',
+                                queued_at=queued_at)
 
     def send_newsletter_email(self, customer, subject, content, preheader=None, footer_text=None):
         """Newsletter E-Mail mit erweiterten Optionen"""
@@ -492,7 +624,8 @@ class EmailService:
             Abmelden: https://bytedohm.de/newsletter/abmelden
             """
 
-            return self._send_email(customer.email, subject, html_body, text_body)
+            return self._send_email(customer.email, subject, html_body, text_body,
+                                    mail_type='newsletter')
 
         except Exception as e:
             logging.error(f"Fehler beim Senden der Newsletter-E-Mail: {e}")
@@ -503,6 +636,72 @@ class EmailService:
 email_service = EmailService()
 
 
+class EmailQueue:
+    """Asynchroner E-Mail-Versand über einen Hintergrund-Thread pro Worker
+
+    Aufträge enthalten nur IDs; die Bestellung wird im Versand-Thread neu geladen.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, kind, **params):
+        self._ensure_worker()
+        self._queue.put((kind, params, time.time()))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def join(self):
+        """Warten, bis alle Aufträge versendet sind (CLI)"""
+        self._queue.join()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work,
+                                                name='bytedohm-email-queue',
+                                                daemon=True)
+                self._thread.start()
+
+    def _work(self):
+        from app import app
+        while True:
+            kind, params, queued_at = self._queue.get()
+            try:
+                with app.app_context():
+                    try:
+                        self._dispatch(kind, params, queued_at)
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logging.error(f"E-Mail-Auftrag {kind} {params} fehlgeschlagen: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _dispatch(self, kind, params, queued_at):
+        order = db.session.get(Order, params['order_id'])
+        if not order or not order.customer:
+            logging.warning(f"E-Mail-Auftrag {kind}: Bestellung {params['order_id']} nicht gefunden")
+            return
+
+        if kind == 'status_update':
+            email_service.send_status_update_email(order, params['old_status'],
+                                                   params['new_status'],
+                                                   queued_at=queued_at)
+        elif kind == 'shipping_notification':
+            email_service.send_shipping_notification_email(order, queued_at=queued_at)
+        elif kind == 'order_confirmation':
+            email_service.send_order_confirmation_email(order, queued_at=queued_at)
+        else:
+            logging.warning(f"Unbekannter E-Mail-Auftrag: {kind}")
+
+
+email_queue = EmailQueue()
+
+
 # Helper functions
 def send_registration_email(customer):
     """Sende Willkommens-E-Mail"""
@@ -525,6 +724,17 @@ def send_status_update_email(order, old_status, new_status):
                                                   new_status)
 
 
+def queue_status_update_email(order_id, old_status, new_status):
+    """Status-Update im Hintergrund senden"""
+    email_queue.enqueue('status_update', order_id=order_id,
+                        old_status=old_status, new_status=new_status)
+
+
+def queue_shipping_notification_email(order_id):
+    """Versandbenachrichtigung im Hintergrund senden"""
+    email_queue.enqueue('shipping_notification', order_id=order_id)
+
+
 def send_newsletter_email(customer,
                           subject,
                           content,
@@ -533,3 +743,121 @@ def send_newsletter_email(customer,
     """Sende Newsletter"""
     return email_service.send_newsletter_email(customer, subject, content,
                                                preheader, footer_text)
+
+
+
+def process_bounce(email, bounce_type='hard', smtp_code=None, reason=None, record=True):
+    """
+    Bounce verarbeiten (SMTP-Ablehnung oder Bounce-Webhook des Mailproviders)
+
+    Harte Bounces beenden das Newsletter-Abonnement sofort, weiche Bounces erst
+    ab SOFT_BOUNCE_LIMIT Bounces innerhalb von SOFT_BOUNCE_WINDOW_DAYS Tagen.
+
+    Returns:
+        dict: Ergebnis mit Anzahl abgemeldeter Kunden
+    """
+    email = (email or '').strip().lower()
+    if not email:
+        return {'success': False, 'error': 'E-Mail-Adresse fehlt'}
+
+    if record:
+        _record_delivery({
+            'mail_type': BOUNCE_MAIL_TYPE,
+            'recipient': email,
+            'subject': None,
+            'status': 'bounced',
+            'smtp_code': smtp_code,
+            'smtp_response': (reason or bounce_type)[:255],
+            'retry_count': 0,
+            'queue_ms': None,
+            'connect_ms': None,
+            'login_ms': None,
+            'send_ms': None,
+            'error': None
+        })
+
+    customers = Customer.__table__
+    email_log = EmailLog.__table__
+    try:
+        # Eigene Verbindung: wird auch aus dem Fehlerpfad von _send_email aufgerufen und darf
+        # die ORM-Session des Aufrufers weder committen noch zurückrollen
+        with db.engine.begin() as connection:
+            if bounce_type != 'hard':
+                since = datetime.utcnow() - timedelta(days=SOFT_BOUNCE_WINDOW_DAYS)
+                bounce_count = connection.execute(
+                    select(func.count()).select_from(email_log).where(
+                        email_log.c.recipient == email,
+                        email_log.c.status == 'bounced',
+                        email_log.c.created_at >= since)
+                ).scalar()
+                if bounce_count < SOFT_BOUNCE_LIMIT:
+                    return {'success': True, 'unsubscribed': 0}
+
+            unsubscribed = connection.execute(
+                customers.update()
+                .where(func.lower(customers.c.email) == email,
+                       customers.c.newsletter_subscription == True)
+                .values(newsletter_subscription=False)
+            ).rowcount
+
+        if unsubscribed:
+            logging.info(f"Newsletter für {email} nach {bounce_type} Bounce deaktiviert")
+        return {'success': True, 'unsubscribed': unsubscribed}
+
+    except Exception as e:
+        logging.error(f"Fehler bei der Bounce-Verarbeitung für {email}: {e}")
+        return {'success': False, 'error': str(e)}
+
+
+def get_delivery_metrics(days=30):
+    """Versandkennzahlen je Mail-Typ für den Admin-Bereich"""
+    since = datetime.utcnow() - timedelta(days=days)
+
+    rows = db.session.query(
+        EmailLog.mail_type,
+        func.count(EmailLog.id).label('total'),
+        func.sum(case((EmailLog.status == 'sent', 1), else_=0)).label('sent'),
+        func.sum(case((EmailLog.status == 'failed', 1), else_=0)).label('failed'),
+        func.sum(case((EmailLog.status == 'bounced', 1), else_=0)).label('bounced'),
+        func.avg(EmailLog.queue_ms).label('avg_queue_ms'),
+        func.avg(EmailLog.connect_ms).label('avg_connect_ms'),
+        func.avg(EmailLog.login_ms).label('avg_login_ms'),
+        func.avg(EmailLog.send_ms).label('avg_send_ms'),
+        func.max(EmailLog.send_ms).label('max_send_ms'),
+        func.sum(EmailLog.retry_count).label('retries')
+    ).filter(
+        EmailLog.created_at >= since,
+        # Provider-Bounces sind keine eigene Sendung - nicht als Mail-Typ auswerten
+        EmailLog.mail_type != BOUNCE_MAIL_TYPE
+    ).group_by(EmailLog.mail_type).all()
+
+    metrics = []
+    for row in rows:
+        total = row.total or 0
+        metrics.append({
+            'mail_type': row.mail_type,
+            'label': MAIL_TYPES.get(row.mail_type, row.mail_type),
+            'total': total,
+            'sent': int(row.sent or 0),
+            'failed': int(row.failed or 0),
+            'bounced': int(row.bounced or 0),
+            'success_rate': (float(row.sent or 0) / total * 100) if total else 0.0,
+            'avg_queue_ms': float(row.avg_queue_ms or 0),
+            'avg_connect_ms': float(row.avg_connect_ms or 0),
+            'avg_login_ms': float(row.avg_login_ms or 0),
+            'avg_send_ms': float(row.avg_send_ms or 0),
+            'max_send_ms': float(row.max_send_ms or 0),
+            'retries': int(row.retries or 0)
+        })
+    metrics.sort(key=lambda m: m['total'], reverse=True)
+
+    recent_failures = EmailLog.query.filter(
+        EmailLog.status != 'sent',
+        EmailLog.created_at >= since
+    ).order_by(EmailLog.created_at.desc()).limit(25).all()
+
+    return {
+        'days': days,
+        'by_type': metrics,
+        'recent_failures': recent_failures
+    }
@@ -0,0 +1,237 @@
+"""
+HTTP-Transport für externe APIs (DHL)
+Gemeinsame Session mit Connection-Pooling, Wiederholungen für sichere Anfragen und Circuit Breaker pro Endpunkt
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Circuit Breaker: nach so vielen Fehlern in Folge wird der Endpunkt gesperrt
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('DHL_BREAKER_FAILURES', '5'))
+# Sekunden bis zum nächsten Probe-Request
+BREAKER_RESET_TIMEOUT = float(os.environ.get('DHL_BREAKER_RESET', '30'))
+
+
+class CircuitOpenError(requests.RequestException):
+    """Endpunkt ist nach wiederholten Fehlern vorübergehend gesperrt"""
+
+
+class CircuitBreaker:
+    """Closed -> Open nach Fehlerserie, Half-Open lässt genau einen Probe-Request durch"""
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or BREAKER_RESET_TIMEOUT
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Darf ein Request durch?
+
+        Returns:
+            tuple: (erlaubt, probe) - probe ist True nur für den einen Request, der im
+                   Half-Open-Zustand den Probe-Slot belegt; nur er darf ihn wieder freigeben
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return True, False
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probe_running:
+                self._probe_running = True
+                return True, True
+            return False, False
+
+    def record_success(self, probe=False):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            if probe:
+                self._probe_running = False
+
+    def record_failure(self, probe=False):
+        with self._lock:
+            self.failures += 1
+            if probe:
+                self._probe_running = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Probe-Slot freigeben - nur vom Request aufrufen, dem allow() den Slot gegeben hat"""
+        with self._lock:
+            self._probe_running = False
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = 0.0
+            if self.state == 'open':
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'retry_in_seconds': round(retry_in, 1)
+            }
+
+
+class EndpointMetrics:
+    """Latenz- und Fehlerzähler eines Endpunkts"""
+
+    def __init__(self, window=500):
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.last_status = None
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms, status=None, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += 1 if error else 0
+            self.last_status = status
+            self._latencies.append(elapsed_ms)
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            requests_count, errors, rejected, last_status = \
+                self.requests, self.errors, self.rejected, self.last_status
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 1)
+
+        return {
+            'requests': requests_count,
+            'errors': errors,
+            'rejected_open_circuit': rejected,
+            'last_status': last_status,
+            'latency_ms': {
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'max': round(latencies[-1], 1) if latencies else None
+            }
+        }
+
+
+class HTTPTransport:
+    """Geteilte requests.Session mit Pool, Retry-Policy und Circuit Breaker"""
+
+    def __init__(self, pool_size=None, retries=None):
+        self.pool_size = pool_size or int(os.environ.get('DHL_HTTP_POOL_SIZE', '16'))
+        self.retries = retries if retries is not None else int(os.environ.get('DHL_HTTP_RETRIES', '2'))
+        self.session = self._build_session()
+        self._breakers = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _build_session(self):
+        # Wiederholungen nur für GET - POST (Etiketten) ist nicht idempotent
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _endpoint(self, name):
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker()
+                self._metrics[name] = EndpointMetrics()
+            return self._breakers[name], self._metrics[name]
+
+    def request(self, endpoint, method, url, **kwargs):
+        """
+        HTTP-Anfrage über den Pool ausführen
+
+        Args:
+            endpoint (str): Name für Breaker und Metriken (z.B. 'tracking')
+
+        Raises:
+            CircuitOpenError: Endpunkt ist gesperrt - sofort auf Fallback wechseln
+            requests.RequestException: Netzwerkfehler (wie jede andere Ausnahme als Fehlschlag gezählt)
+        """
+        breaker, metrics = self._endpoint(endpoint)
+        allowed, probe = breaker.allow()
+        if not allowed:
+            metrics.record_rejected()
+            raise CircuitOpenError(f'DHL Endpunkt {endpoint} vorübergehend gesperrt')
+
+        started = time.perf_counter()
+        try:
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except Exception:
+                # Netzwerkfehler und unerwartete Ausnahmen (z.B. aus Adaptern oder Hooks) sind Fehlschläge
+                metrics.record((time.perf_counter() - started) * 1000, error=True)
+                breaker.record_failure(probe)
+                raise
+
+            # Nur Server-Fehler und Drosselung zählen - 4xx (z.B. 404 Sendung unbekannt) ist eine gültige Antwort
+            failed = response.status_code >= 500 or response.status_code == 429
+            metrics.record((time.perf_counter() - started) * 1000, status=response.status_code, error=failed)
+            if failed:
+                breaker.record_failure(probe)
+                if breaker.state == 'open':
+                    logging.warning(f"Circuit Breaker für DHL Endpunkt {endpoint} geöffnet")
+            else:
+                breaker.record_success(probe)
+            return response
+        finally:
+            # Half-Open: den eigenen Probe-Slot in jedem Fall freigeben, sonst bleibt der Endpunkt gesperrt
+            if probe:
+                breaker.release_probe()
+
+    def get(self, endpoint, url, **kwargs):
+        return self.request(endpoint, 'GET', url, **kwargs)
+
+    def post(self, endpoint, url, **kwargs):
+        return self.request(endpoint, 'POST', url, **kwargs)
+
+    def is_open(self, endpoint):
+        breaker, _ = self._endpoint(endpoint)
+        return breaker.snapshot()['state'] == 'open'
+
+    def metrics(self):
+        """Kennzahlen aller Endpunkte dieses Workers"""
+        with self._lock:
+            endpoints = list(self._breakers)
+        result = {}
+        for name in endpoints:
+            breaker, metrics = self._endpoint(name)
+            result[name] = dict(metrics.snapshot(), circuit=breaker.snapshot())
+        return result
+
+
+# Global instance (pro Worker-Prozess)
+dhl_transport = HTTPTransport()
@@ -0,0 +1,159 @@
+"""
+Identitäts-Cache für ByteDohm
+Lädt angemeldete Admins und Kunden für Flask-Login - über eine Identity-Map pro Request und einen kurzen Cache pro Worker
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from flask import g, has_request_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from backend.models.models import AdminUser, Customer
+
+# Typ-Präfix der Flask-Login ID -> Modell
+IDENTITY_MODELS = {
+    'admin': AdminUser,
+    'customer': Customer
+}
+# Alte Sitzungen ohne Präfix stammen vom Kunden-Login (dessen Loader war bisher aktiv)
+LEGACY_IDENTITY_TYPE = 'customer'
+
+
+def parse_identity(user_id):
+    """'admin:1' -> ('admin', 1); reine Zahlen gelten als Kunden-ID"""
+    kind, _, raw_id = str(user_id).rpartition(':')
+    kind = kind or LEGACY_IDENTITY_TYPE
+    if kind not in IDENTITY_MODELS:
+        return None
+    try:
+        return kind, int(raw_id)
+    except ValueError:
+        return None
+
+
+def identity_kind(instance):
+    for kind, model in IDENTITY_MODELS.items():
+        if isinstance(instance, model):
+            return kind
+    return None
+
+
+class IdentityCache:
+    """Spaltenwerte angemeldeter Benutzer pro Worker mit kurzer Gültigkeit"""
+
+    def __init__(self, maxsize=None, ttl=None):
+        self.maxsize = maxsize or int(os.environ.get('IDENTITY_CACHE_SIZE', '5000'))
+        # Begrenzt, wie lange Änderungen aus anderen Workern unbemerkt bleiben
+        self.ttl = ttl or float(os.environ.get('IDENTITY_CACHE_TTL', '30'))
+        self._entries = OrderedDict()  # (kind, id) -> (expires_at, values)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, instance):
+        mapper = inspect(instance).mapper
+        values = {attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs}
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Global instance (pro Worker-Prozess)
+identity_cache = IdentityCache()
+
+
+def _restore(model, values):
+    """Objekt aus gecachten Spaltenwerten ohne Datenbankabfrage an die Session hängen"""
+    instance = model.__mapper__.class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(instance, key, value)
+    make_transient_to_detached(instance)
+    return db.session.merge(instance, load=False)
+
+
+def get_identity(kind, identity_id):
+    """
+    Benutzer laden - höchstens eine Abfrage pro Request, bei Cache-Treffer keine
+
+    Args:
+        kind (str): 'admin' oder 'customer'
+        identity_id (int): Primärschlüssel
+    """
+    model = IDENTITY_MODELS[kind]
+    key = (kind, identity_id)
+
+    identities = None
+    if has_request_context():
+        identities = g.setdefault('_identity_map', {})
+        if key in identities:
+            return identities[key]
+
+    # Bereits in der Session (z.B. gerade gespeichert) - kein Cache nötig
+    instance = db.session.identity_map.get(db.session.identity_key(model, identity_id))
+    if instance is None:
+        values = identity_cache.get(key)
+        if values is not None:
+            instance = _restore(model, values)
+        else:
+            instance = db.session.get(model, identity_id)
+            if instance is not None:
+                identity_cache.put(key, instance)
+
+    if identities is not None:
+        identities[key] = instance
+    return instance
+
+
+def load_identity(user_id):
+    """Flask-Login user_loader für typisierte IDs ('admin:1', 'customer:7')"""
+    parsed = parse_identity(user_id)
+    if not parsed:
+        return None
+    return get_identity(*parsed)
+
+
+def invalidate_identity(instance):
+    """Cache-Eintrag eines Benutzers verwerfen (Logout, Profil- oder Passwortänderung)"""
+    kind = identity_kind(instance)
+    if kind and instance.id is not None:
+        identity_cache.invalidate((kind, instance.id))
+        if has_request_context():
+            g.setdefault('_identity_map', {}).pop((kind, instance.id), None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_changed_identities(session, flush_context):
+    """Geänderte oder gelöschte Benutzer in diesem Worker sofort neu laden"""
+    for instance in list(session.dirty) + list(session.deleted):
+        if identity_kind(instance):
+            invalidate_identity(instance)
@@ -0,0 +1,307 @@
+"""
+Versandetiketten-Ablage für ByteDohm
+Speichert DHL Etiketten-PDFs einmalig und inhaltsadressiert (SHA-256) im lokalen Dateisystem
+"""
+
+import io
+import os
+import re
+import hashlib
+import logging
+import tempfile
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from backend.services.http_transport import dhl_transport
+
+LABEL_STORE_DIR = os.environ.get(
+    'LABEL_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 'storage', 'labels'))
+LABEL_MAX_BYTES = int(os.environ.get('LABEL_MAX_BYTES', str(10 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+# "Heute" für den Etikettendruck ist der Versandtag in Deutschland, nicht der UTC-Tag
+LABEL_TIMEZONE = ZoneInfo(os.environ.get('LABEL_TIMEZONE', 'Europe/Berlin'))
+
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class LabelStore:
+    """Inhaltsadressierte Ablage: gleiche PDFs werden nur einmal gespeichert"""
+
+    def __init__(self, root=None):
+        self.root = root or LABEL_STORE_DIR
+
+    def path_for(self, sha256):
+        """Dateipfad eines Etiketts - None bei ungültiger Prüfsumme"""
+        if not sha256 or not _SHA256_RE.match(sha256):
+            return None
+        return os.path.join(self.root, sha256[:2], f'{sha256}.pdf')
+
+    def exists(self, sha256):
+        path = self.path_for(sha256)
+        return bool(path) and os.path.isfile(path)
+
+    def store_chunks(self, chunks):
+        """
+        Etikett aus Datenblöcken speichern
+
+        Args:
+            chunks (iterable): bytes-Blöcke des PDFs
+
+        Returns:
+            str: SHA-256 des Inhalts
+        """
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.label_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if size > LABEL_MAX_BYTES:
+                        raise ValueError('Etikett überschreitet die maximale Größe')
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            if size == 0:
+                raise ValueError('Leeres Etikett')
+
+            sha256 = digest.hexdigest()
+            target = self.path_for(sha256)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if os.path.exists(target):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, target)
+            return sha256
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def store_bytes(self, data):
+        return self.store_chunks([data])
+
+    def fetch(self, url, headers=None):
+        """
+        Etikett von DHL herunterladen und ablegen
+
+        Returns:
+            str: SHA-256 des gespeicherten Etiketts
+        """
+        response = dhl_transport.get('label', url, headers=headers, stream=True, timeout=(5, 30))
+        try:
+            if response.status_code != 200:
+                raise ValueError(f'Etikett-Download fehlgeschlagen: HTTP {response.status_code}')
+            return self.store_chunks(response.iter_content(CHUNK_SIZE))
+        finally:
+            response.close()
+
+
+# Global instance
+label_store = LabelStore()
+
+
+def store_label_from_url(url, headers=None):
+    """Etikett herunterladen - Rückgabe SHA-256 oder None bei Fehler"""
+    if not url or not url.lower().startswith(('http://', 'https://')):
+        return None
+    try:
+        return label_store.fetch(url, headers=headers)
+    except Exception as e:
+        logging.warning(f"Versandetikett {url} konnte nicht gespeichert werden: {e}")
+        return None
+
+
+def label_day_range(day=None):
+    """
+    Grenzen eines Versandtags (Mitternacht bis Mitternacht in LABEL_TIMEZONE)
+
+    Args:
+        day (date): optional - Standard ist der heutige Tag in LABEL_TIMEZONE
+
+    Returns:
+        tuple: (Tag, Beginn, Ende) - Beginn/Ende naiv in UTC wie shipping_label_created_at
+    """
+    if day is None:
+        day = datetime.now(LABEL_TIMEZONE).date()
+    start = datetime.combine(day, time.min, tzinfo=LABEL_TIMEZONE)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=LABEL_TIMEZONE)
+    return (day,
+            start.astimezone(timezone.utc).replace(tzinfo=None),
+            end.astimezone(timezone.utc).replace(tzinfo=None))
+
+
+class _LabelPdfStream:
+    """
+    Schreibt ein zusammengefügtes PDF Objekt für Objekt
+
+    Jede Etikett-Datei wird einzeln gelesen, ihre Seiten samt allen erreichbaren Objekten mit
+    neuen Nummern sofort ausgegeben und die Datei wieder geschlossen. Im Speicher bleiben nur
+    eine Datei sowie Offsets und Seitennummern - nicht die Seiten des Ergebnisses.
+    """
+
+    CATALOG_ID = 1
+    PAGES_ID = 2
+
+    def __init__(self):
+        self.offsets = {}
+        self.page_ids = []
+        self.position = 0
+        self.next_id = self.PAGES_ID + 1
+
+    def _emit(self, data):
+        self.position += len(data)
+        return data
+
+    def _object(self, object_id, value):
+        """Ein indirektes Objekt serialisieren und seinen Offset für die xref-Tabelle merken"""
+        buffer = io.BytesIO()
+        buffer.write(f"{object_id} 0 obj\n".encode())
+        value.write_to_stream(buffer)
+        buffer.write(b"\nendobj\n")
+        self.offsets[object_id] = self.position
+        return self._emit(buffer.getvalue())
+
+    def header(self):
+        return self._emit(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def file(self, path):
+        """Alle Seiten einer Etikett-Datei ausgeben - liefert Byte-Blöcke"""
+        from pypdf import PdfReader
+        from pypdf.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject,
+                                   StreamObject)
+
+        mapping = {}
+        pending = []
+
+        def reference(indirect):
+            key = (indirect.idnum, indirect.generation)
+            if key not in mapping:
+                mapping[key] = self.next_id
+                self.next_id += 1
+                pending.append(indirect)
+            return IndirectObject(mapping[key], 0, None)
+
+        def renumber(value):
+            if isinstance(value, IndirectObject):
+                return reference(value)
+            if isinstance(value, StreamObject):
+                copy = value.__class__()
+                # Rohdaten unverändert (komprimiert) übernehmen, /Length schreibt pypdf selbst
+                copy._data = value._data
+                for key, item in dict.items(value):
+                    if key != '/Length':
+                        copy[key] = renumber(item)
+                return copy
+            if isinstance(value, DictionaryObject):
+                copy = DictionaryObject()
+                for key, item in dict.items(value):
+                    copy[key] = renumber(item)
+                return copy
+            if isinstance(value, ArrayObject):
+                return ArrayObject(renumber(item) for item in value)
+            return value
+
+        with open(path, 'rb') as handle:
+            try:
+                reader = PdfReader(handle)
+                source_pages = list(reader.pages)
+            except Exception as e:
+                # Vor dem ersten Byte dieser Datei - überspringen statt das ganze PDF abzubrechen
+                logging.warning(f"Versandetikett {path} nicht lesbar, übersprungen: {e}")
+                return
+
+            # Seiten zuerst nummerieren, damit Verweise auf Seiten (Links, Annotationen) sie treffen
+            pages = []
+            for page in source_pages:
+                page_id = self.next_id
+                self.next_id += 1
+                if page.indirect_reference is not None:
+                    ref = page.indirect_reference
+                    mapping[(ref.idnum, ref.generation)] = page_id
+                pages.append((page_id, page))
+
+            for page_id, page in pages:
+                # Geerbte Attribute (MediaBox, Resources) hat PdfReader bereits in die Seite kopiert
+                copy = DictionaryObject()
+                for key, item in dict.items(page):
+                    if key != '/Parent':
+                        copy[key] = renumber(item)
+                copy[NameObject('/Parent')] = IndirectObject(self.PAGES_ID, 0, None)
+                self.page_ids.append(page_id)
+                yield self._object(page_id, copy)
+
+            while pending:
+                indirect = pending.pop()
+                yield self._object(mapping[(indirect.idnum, indirect.generation)],
+                                   renumber(indirect.get_object()))
+
+    def trailer(self):
+        """Seitenbaum, Katalog, xref-Tabelle und Trailer - liefert Byte-Blöcke"""
+        from pypdf.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject,
+                                   NumberObject)
+
+        pages = DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(IndirectObject(page_id, 0, None) for page_id in self.page_ids),
+            NameObject('/Count'): NumberObject(len(self.page_ids))
+        })
+        yield self._object(self.PAGES_ID, pages)
+        yield self._object(self.CATALOG_ID, DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(self.PAGES_ID, 0, None)
+        }))
+
+        size = self.next_id
+        xref_position = self.position
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for object_id in range(1, size):
+            offset = self.offsets.get(object_id)
+            # Nummern ohne Objekt (nicht auflösbare Verweise) als frei markieren
+            lines.append(f"{offset:010d} 00000 n \n" if offset is not None else "0000000000 65535 f \n")
+        lines.append(f"trailer\n<< /Size {size} /Root {self.CATALOG_ID} 0 R >>\n"
+                     f"startxref\n{xref_position}\n%%EOF\n")
+        for start in range(0, len(lines), 1000):
+            yield self._emit(''.join(lines[start:start + 1000]).encode())
+
+
+def label_paths(sha256_list):
+    """Pfade der lokal vorhandenen Etiketten in der angegebenen Reihenfolge"""
+    return [path for path in (label_store.path_for(sha256) for sha256 in sha256_list)
+            if path and os.path.isfile(path)]
+
+
+def stream_merged_labels(paths):
+    """
+    Etiketten als ein PDF erzeugen - Generator über Byte-Blöcke, direkt als Response streambar
+
+    Speicherbedarf: eine Etikett-Datei plus ein Offset je Objekt, unabhängig von der Anzahl
+    der Etiketten. Benötigt pypdf (ImportError beim ersten Block, wenn es fehlt).
+    """
+    pdf = _LabelPdfStream()
+    yield pdf.header()
+    for path in paths:
+        yield from pdf.file(path)
+    yield from pdf.trailer()
+
+
+def merge_labels(sha256_list, target):
+    """
+    Mehrere Etiketten zu einem PDF zusammenfügen (siehe stream_merged_labels)
+
+    Args:
+        target: beschreibbares Dateiobjekt (binär)
+
+    Returns:
+        int: Anzahl zusammengefügter Etiketten
+    """
+    paths = label_paths(sha256_list)
+    if not paths:
+        return 0
+    for block in stream_merged_labels(paths):
+        target.write(block)
+    return len(paths)
@@ -0,0 +1,167 @@
+"""
+Login-Drosselung für ByteDohm
+Sliding-Window-Limits pro IP und Konto sowie begrenzte Passwortprüfung außerhalb des Request-Threads
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Anmeldeversuche pro IP im Zeitfenster
+LOGIN_IP_LIMIT = int(os.environ.get('LOGIN_IP_LIMIT', '20'))
+LOGIN_IP_WINDOW = int(os.environ.get('LOGIN_IP_WINDOW', '300'))
+# Fehlgeschlagene Anmeldungen pro Konto im Zeitfenster
+LOGIN_ACCOUNT_LIMIT = int(os.environ.get('LOGIN_ACCOUNT_LIMIT', '5'))
+LOGIN_ACCOUNT_WINDOW = int(os.environ.get('LOGIN_ACCOUNT_WINDOW', '900'))
+# Parallele Passwort-Hashes pro Worker und maximale Warteschlange
+LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', '2'))
+LOGIN_HASH_QUEUE = int(os.environ.get('LOGIN_HASH_QUEUE', str(LOGIN_HASH_WORKERS * 4)))
+LOGIN_HASH_TIMEOUT = float(os.environ.get('LOGIN_HASH_TIMEOUT', '5'))
+
+
+class SlidingWindowLimiter:
+    """Zählt Ereignisse pro Schlüssel in einem gleitenden Zeitfenster"""
+
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._events = OrderedDict()  # key -> deque[timestamps]
+        self._lock = threading.Lock()
+
+    def _prune(self, key, now):
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        return events
+
+    def retry_after(self, key):
+        """Sekunden bis zum nächsten erlaubten Versuch - 0 wenn nicht gesperrt"""
+        if not key:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if not events or len(events) < self.limit:
+                return 0
+            return max(1, int(events[0] + self.window - now) + 1)
+
+    def hit(self, key):
+        if not key:
+            return
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if events is None:
+                events = deque()
+                self._events[key] = events
+            events.append(now)
+            self._events.move_to_end(key)
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+
+class LoginBusyError(Exception):
+    """Alle Plätze für Passwortprüfungen sind belegt"""
+
+
+class PasswordVerifier:
+    """Begrenzter Thread-Pool für Passwort-Hashing - bei Überlast sofort ablehnen statt warten"""
+
+    def __init__(self, max_workers=None, max_pending=None, timeout=None):
+        self.max_workers = max_workers or LOGIN_HASH_WORKERS
+        self.timeout = timeout or LOGIN_HASH_TIMEOUT
+        self._slots = threading.BoundedSemaphore(max_pending or LOGIN_HASH_QUEUE)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='bytedohm-login-hash')
+            return self._executor
+
+    def verify(self, check_password, password):
+        """
+        check_password(password) im Pool ausführen
+
+        Raises:
+            LoginBusyError: Warteschlange voll oder Zeitüberschreitung
+        """
+        if not self._slots.acquire(blocking=False):
+            raise LoginBusyError()
+        try:
+            future = self._get_executor().submit(check_password, password)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise LoginBusyError()
+
+
+# Global instances (pro Worker-Prozess)
+ip_limiter = SlidingWindowLimiter(LOGIN_IP_LIMIT, LOGIN_IP_WINDOW)
+account_limiter = SlidingWindowLimiter(LOGIN_ACCOUNT_LIMIT, LOGIN_ACCOUNT_WINDOW)
+password_verifier = PasswordVerifier()
+
+
+def check_login(user, password, ip_address, account):
+    """
+    Anmeldung mit Drosselung prüfen
+
+    Args:
+        user: AdminUser/Customer oder None
+        password (str): eingegebenes Passwort
+        ip_address (str): Client-IP (get_customer_ip)
+        account (str): E-Mail bzw. Benutzername, z.B. 'customer:max@example.com'
+
+    Returns:
+        dict: {'success': bool, 'error': str, 'status': HTTP-Status, 'retry_after': Sekunden}
+    """
+    retry_after = max(ip_limiter.retry_after(ip_address), account_limiter.retry_after(account))
+    if retry_after:
+        logging.warning(f"Login gedrosselt: IP {ip_address}, Konto {account}")
+        return {
+            'success': False,
+            'status': 429,
+            'retry_after': retry_after,
+            'error': f'Zu viele Anmeldeversuche. Bitte versuchen Sie es in {retry_after} Sekunden erneut.'
+        }
+
+    ip_limiter.hit(ip_address)
+
+    valid = False
+    if user is not None:
+        try:
+            valid = password_verifier.verify(user.check_password, password)
+        except LoginBusyError:
+            logging.warning("Passwortprüfung überlastet - Anmeldung abgelehnt")
+            return {
+                'success': False,
+                'status': 429,
+                'retry_after': 5,
+                'error': 'Der Anmeldedienst ist gerade ausgelastet. Bitte versuchen Sie es gleich erneut.'
+            }
+
+    if not valid:
+        account_limiter.hit(account)
+        return {'success': False, 'status': 401, 'error': 'Ungültige Anmeldedaten'}
+
+    account_limiter.reset(account)
+    return {'success': True}
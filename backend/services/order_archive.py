@@ -0,0 +1,143 @@
+"""
+Bestellarchiv für ByteDohm
+Abgeschlossene alte Bestellungen samt Positionen und Rechnungen stapelweise nach *_archive verschieben
+"""
+
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func, union_all
+from app import db
+from backend.models.models import (Order, OrderItem, Invoice, ArchivedOrder, ArchivedOrderItem,
+                                   ArchivedInvoice)
+
+# Nur abgeschlossene Bestellungen - alles andere kann sich noch ändern
+ARCHIVE_STATUSES = ('delivered', 'cancelled')
+ARCHIVE_AFTER_MONTHS = int(os.environ.get('ORDER_ARCHIVE_MONTHS', '12'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ORDER_ARCHIVE_BATCH_SIZE', '500'))
+
+orders_table = Order.__table__
+order_items_table = OrderItem.__table__
+invoices_table = Invoice.__table__
+archive_orders_table = ArchivedOrder.__table__
+archive_items_table = ArchivedOrderItem.__table__
+archive_invoices_table = ArchivedInvoice.__table__
+
+# (aktive Tabelle, Archivtabelle, Spalte mit der Bestell-ID)
+ARCHIVE_TABLES = (
+    (orders_table, archive_orders_table, 'id'),
+    (order_items_table, archive_items_table, 'order_id'),
+    (invoices_table, archive_invoices_table, 'order_id'),
+)
+
+
+# --- Lesen über aktive und archivierte Bestellungen ---------------------------------------
+
+def all_orders(columns, condition=None):
+    """
+    orders und orders_archive als eine Menge (UNION ALL) - für Neuberechnungen der Kennzahlen
+
+    Args:
+        columns (list): Spaltennamen
+        condition: Funktion Tabelle -> WHERE-Bedingung, wird in beiden Teilen angewendet
+                   (so nutzt jeder Teil seinen Index)
+
+    Returns:
+        Subquery mit den angegebenen Spalten
+    """
+    parts = []
+    for table in (orders_table, archive_orders_table):
+        statement = select(*(table.c[name] for name in columns))
+        if condition is not None:
+            statement = statement.where(condition(table))
+        parts.append(statement)
+    return union_all(*parts).subquery('all_orders')
+
+
+def all_order_items(condition=None):
+    """Positionen aktiver und archivierter Bestellungen mit created_at der Bestellung (UNION ALL)"""
+    parts = []
+    for items, orders in ((order_items_table, orders_table), (archive_items_table, archive_orders_table)):
+        statement = select(orders.c.created_at, items.c.item_type, items.c.item_name,
+                           items.c.quantity, items.c.total_price) \
+            .select_from(items.join(orders, orders.c.id == items.c.order_id))
+        if condition is not None:
+            statement = statement.where(condition(orders))
+        parts.append(statement)
+    return union_all(*parts).subquery('all_order_items')
+
+
+# --- Archivieren --------------------------------------------------------------------------
+
+def archive_cutoff(months=None):
+    """Bestellungen vor diesem Zeitpunkt sind archivierbar"""
+    months = ARCHIVE_AFTER_MONTHS if months is None else months
+    return datetime.utcnow() - timedelta(days=30 * months)
+
+
+def _candidate_ids(connection, cutoff, batch_size):
+    """Nächster Stapel archivierbarer Bestellungen - gesperrt, von parallelen Läufen übersprungen"""
+    return connection.execute(
+        select(orders_table.c.id)
+        .where(orders_table.c.status.in_(ARCHIVE_STATUSES), orders_table.c.created_at < cutoff)
+        .order_by(orders_table.c.created_at, orders_table.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+
+
+def move_orders(connection, order_ids):
+    """
+    Bestellungen mit Positionen und Rechnungen ins Archiv kopieren und aus den aktiven Tabellen löschen
+
+    Reine Core-Anweisungen: Es laufen keine Flush-Hooks, customer_stats und Tageskennzahlen
+    bleiben unverändert (sie zählen archivierte Bestellungen weiterhin mit).
+    """
+    for source, target, key in ARCHIVE_TABLES:
+        columns = [column.name for column in target.columns if column.name in source.c]
+        connection.execute(target.insert().from_select(
+            columns, select(*(source.c[name] for name in columns)).where(source.c[key].in_(order_ids))
+        ))
+    # Abhängige Zeilen zuerst löschen (Fremdschlüssel auf orders)
+    for source, _, key in reversed(ARCHIVE_TABLES):
+        connection.execute(delete(source).where(source.c[key].in_(order_ids)))
+
+
+def archive_orders(job=None, months=None, batch_size=None, pause=0.1, max_batches=None):
+    """
+    Abgeschlossene Bestellungen älter als `months` Monate archivieren - je Stapel eine Transaktion
+
+    Returns:
+        dict: {'archived', 'batches', 'seconds', 'cutoff'}
+    """
+    cutoff = archive_cutoff(months)
+    batch_size = batch_size or ARCHIVE_BATCH_SIZE
+    summary = {'archived': 0, 'batches': 0, 'seconds': 0.0, 'cutoff': cutoff.isoformat()}
+    started = time.monotonic()
+    if job:
+        job.set_total(db.session.execute(
+            select(func.count()).select_from(orders_table)
+            .where(orders_table.c.status.in_(ARCHIVE_STATUSES), orders_table.c.created_at < cutoff)
+        ).scalar())
+
+    while max_batches is None or summary['batches'] < max_batches:
+        with db.engine.begin() as connection:
+            order_ids = _candidate_ids(connection, cutoff, batch_size)
+            if order_ids:
+                move_orders(connection, order_ids)
+        if not order_ids:
+            break
+        summary['archived'] += len(order_ids)
+        summary['batches'] += 1
+        if job:
+            job.advance(done=len(order_ids))
+        if len(order_ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    summary['seconds'] = round(time.monotonic() - started, 2)
+    logging.info(f"Bestellarchiv: {summary['archived']} Bestellungen in {summary['batches']} Stapeln "
+                 f"archiviert (vor {cutoff:%d.%m.%Y}, {summary['seconds']}s)")
+    return summary
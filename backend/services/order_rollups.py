@@ -0,0 +1,261 @@
+"""
+Bestell-Kennzahlen für ByteDohm
+Hält customer_stats und die Tageskennzahlen bei jeder Bestelländerung inkrementell aktuell (gleiche Transaktion wie die Bestellung)
+"""
+
+import logging
+from datetime import datetime
+from sqlalchemy import event, func, case, select, update, inspect
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+from app import db
+from backend.models.models import Order, OrderItem, Customer, CustomerStats
+from backend.services.daily_rollups import update_daily_rollups, refresh_daily_for_orders
+from backend.services.order_archive import all_orders
+
+# Bestellstatus -> Zählspalte in customer_stats
+STATUS_COLUMNS = {
+    'pending': 'pending_count',
+    'processing': 'processing_count',
+    'shipped': 'shipped_count',
+    'delivered': 'delivered_count',
+    'cancelled': 'cancelled_count'
+}
+COUNTER_COLUMNS = ['order_count', 'paid_total'] + list(STATUS_COLUMNS.values())
+TRACKED_ATTRIBUTES = ('customer_id', 'status', 'payment_status', 'total_amount', 'created_at')
+
+stats_table = CustomerStats.__table__
+orders_table = Order.__table__
+
+
+def _old_value(state, key):
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(state.obj(), key)
+
+
+def _snapshot(order, state=None, old=False):
+    if old:
+        return {key: _old_value(state, key) for key in TRACKED_ATTRIBUTES}
+    return {key: getattr(order, key) for key in TRACKED_ATTRIBUTES}
+
+
+def _contribution(values):
+    """Beitrag einer Bestellung zu den Kennzahlen ihres Kunden"""
+    delta = dict.fromkeys(COUNTER_COLUMNS, 0)
+    delta['order_count'] = 1
+    if values['payment_status'] == 'paid':
+        delta['paid_total'] = float(values['total_amount'] or 0)
+    column = STATUS_COLUMNS.get(values['status'])
+    if column:
+        delta[column] = 1
+    return delta
+
+
+def _add(deltas, customer_id, contribution, sign, last_order_at=None, removed=False):
+    if customer_id is None:
+        return
+    entry = deltas.setdefault(customer_id, {'values': dict.fromkeys(COUNTER_COLUMNS, 0),
+                                            'last_order_at': None, 'removed': False})
+    for key, value in contribution.items():
+        entry['values'][key] += sign * value
+    if last_order_at and (entry['last_order_at'] is None or last_order_at > entry['last_order_at']):
+        entry['last_order_at'] = last_order_at
+    if removed:
+        entry['removed'] = True
+
+
+def collect_order_changes(session):
+    """
+    Alte und neue Zustände geänderter Bestellungen aus einem Flush sammeln
+
+    Returns:
+        list: (alt, neu) Snapshots - None für neu angelegte bzw. gelöschte Bestellungen
+    """
+    changes = []
+    for order in session.new:
+        if isinstance(order, Order):
+            changes.append((None, _snapshot(order)))
+    for order in session.dirty:
+        if isinstance(order, Order):
+            state = inspect(order)
+            if not any(state.attrs[key].history.has_changes() for key in TRACKED_ATTRIBUTES):
+                continue
+            changes.append((_snapshot(order, state, old=True), _snapshot(order)))
+    for order in session.deleted:
+        if isinstance(order, Order):
+            changes.append((_snapshot(order, inspect(order), old=True), None))
+    return changes
+
+
+def apply_customer_deltas(connection, changes):
+    """Deltas auf bestehende customer_stats-Zeilen addieren, fehlende Zeilen aus orders aufbauen"""
+    deltas = {}
+    for old, new in changes:
+        if old:
+            # Bestellung gelöscht oder einem anderen Kunden zugeordnet
+            removed = new is None or new['customer_id'] != old['customer_id']
+            _add(deltas, old['customer_id'], _contribution(old), -1, removed=removed)
+        if new:
+            _add(deltas, new['customer_id'], _contribution(new), 1, new['created_at'])
+    if not deltas:
+        return
+
+    existing = set(connection.execute(
+        select(stats_table.c.customer_id).where(stats_table.c.customer_id.in_(list(deltas)))
+    ).scalars())
+
+    # Noch keine Kennzahlen (z.B. vor dem Backfill) - vollständig berechnen statt Delta
+    missing = [customer_id for customer_id in deltas if customer_id not in existing]
+    if missing:
+        refresh_customer_stats(missing, connection)
+
+    now = datetime.utcnow()
+    for customer_id in existing:
+        entry = deltas[customer_id]
+        values = {key: stats_table.c[key] + value for key, value in entry['values'].items() if value}
+        if entry['removed']:
+            # Nach Löschung/Umhängen letzte Bestellung neu bestimmen (inkl. Archiv)
+            orders = all_orders(['created_at'], lambda table: table.c.customer_id == customer_id)
+            values['last_order_at'] = select(func.max(orders.c.created_at)).scalar_subquery()
+        elif entry['last_order_at']:
+            values['last_order_at'] = func.coalesce(
+                func.greatest(stats_table.c.last_order_at, entry['last_order_at']),
+                entry['last_order_at'])
+        if not values:
+            continue
+        values['updated_at'] = now
+        connection.execute(update(stats_table)
+                           .where(stats_table.c.customer_id == customer_id)
+                           .values(**values))
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_rollups(session, flush_context):
+    """Kennzahlen im selben Flush wie die Bestellungen fortschreiben"""
+    changes = collect_order_changes(session)
+    items_changed = any(isinstance(instance, OrderItem)
+                        for instance in list(session.new) + list(session.dirty) + list(session.deleted))
+    if not changes and not items_changed:
+        return
+    connection = session.connection()
+    if changes:
+        apply_customer_deltas(connection, changes)
+    # Tageskennzahlen (Statistikseite)
+    update_daily_rollups(session, connection, changes)
+
+
+# Alte Werte auch bei nicht geladenen Attributen vorhalten, damit Deltas exakt sind
+def _keep_history(target, value, oldvalue, initiator):
+    pass
+
+
+for _key in TRACKED_ATTRIBUTES:
+    event.listen(getattr(Order, _key), 'set', _keep_history, active_history=True)
+
+
+def refresh_customer_stats(customer_ids, connection=None):
+    """
+    Kennzahlen einzelner Kunden vollständig aus orders und orders_archive neu berechnen
+
+    Für Massen-Updates (Query.update, bulk_update_mappings), die keine Flush-Events auslösen.
+    """
+    customer_ids = [cid for cid in set(customer_ids) if cid is not None]
+    if not customer_ids:
+        return 0
+    connection = connection or db.session.connection()
+    orders = all_orders(['customer_id', 'status', 'payment_status', 'total_amount', 'created_at'],
+                        lambda table: table.c.customer_id.in_(customer_ids))
+
+    columns = [
+        orders.c.customer_id,
+        func.count().label('order_count'),
+        func.coalesce(func.sum(case((orders.c.payment_status == 'paid', orders.c.total_amount),
+                                    else_=0)), 0).label('paid_total'),
+        func.max(orders.c.created_at).label('last_order_at')
+    ]
+    for status, column in STATUS_COLUMNS.items():
+        columns.append(func.coalesce(func.sum(case((orders.c.status == status, 1), else_=0)), 0).label(column))
+
+    rows = {row.customer_id: row for row in connection.execute(
+        select(*columns).group_by(orders.c.customer_id))}
+
+    now = datetime.utcnow()
+    for customer_id in customer_ids:
+        row = rows.get(customer_id)
+        values = {key: (getattr(row, key) if row else 0) for key in COUNTER_COLUMNS}
+        values['paid_total'] = float(values['paid_total'] or 0)
+        stmt = mysql_insert(stats_table).values(
+            customer_id=customer_id,
+            last_order_at=row.last_order_at if row else None,
+            updated_at=now,
+            **values
+        )
+        connection.execute(stmt.on_duplicate_key_update(
+            last_order_at=stmt.inserted.last_order_at,
+            updated_at=stmt.inserted.updated_at,
+            **{key: stmt.inserted[key] for key in COUNTER_COLUMNS}
+        ))
+    return len(customer_ids)
+
+
+def refresh_stats_for_orders(order_ids, connection=None):
+    """Kunden- und Tageskennzahlen der angegebenen Bestellungen neu berechnen"""
+    if not order_ids:
+        return 0
+    connection = connection or db.session.connection()
+    customer_ids = connection.execute(
+        select(orders_table.c.customer_id).distinct().where(orders_table.c.id.in_(order_ids))
+    ).scalars().all()
+    refresh_daily_for_orders(order_ids, connection)
+    return refresh_customer_stats(customer_ids, connection)
+
+
+def get_customer_stats(customer_id):
+    """Kennzahlen eines Kunden - fehlende Zeile wird einmalig aus orders aufgebaut"""
+    stats = db.session.get(CustomerStats, customer_id)
+    if stats is None:
+        refresh_customer_stats([customer_id])
+        db.session.commit()
+        stats = db.session.get(CustomerStats, customer_id)
+    return stats
+
+
+def get_order_counts(customer_ids):
+    """Bestellanzahl mehrerer Kunden (z.B. einer Listenseite) mit einer Abfrage"""
+    customer_ids = list(set(customer_ids))
+    if not customer_ids:
+        return {}
+    counts = dict(db.session.execute(
+        select(stats_table.c.customer_id, stats_table.c.order_count)
+        .where(stats_table.c.customer_id.in_(customer_ids))
+    ).all())
+    # Kunden ohne Kennzahlen-Zeile (vor dem Backfill) direkt aus orders zählen
+    missing = [customer_id for customer_id in customer_ids if customer_id not in counts]
+    if missing:
+        counts.update(dict(db.session.execute(
+            select(orders_table.c.customer_id, func.count())
+            .where(orders_table.c.customer_id.in_(missing))
+            .group_by(orders_table.c.customer_id)
+        ).all()))
+    return counts
+
+
+def rebuild_customer_stats(batch_size=1000):
+    """Alle Kundenkennzahlen neu aufbauen (Backfill) - seitenweise nach Kunden-ID"""
+    last_id = 0
+    total = 0
+    while True:
+        customer_ids = db.session.execute(
+            select(Customer.id).where(Customer.id > last_id).order_by(Customer.id).limit(batch_size)
+        ).scalars().all()
+        if not customer_ids:
+            break
+        total += refresh_customer_stats(customer_ids)
+        db.session.commit()
+        last_id = customer_ids[-1]
+    logging.info(f"Kundenkennzahlen neu aufgebaut: {total} Kunden")
+    return total
@@ -0,0 +1,192 @@
+"""
+Versandkosten-Berechnung für ByteDohm
+Gewichte aus den Produktdaten, Preise aus der Zonen-/Gewichtsstaffel in backend/config/shipping_rates.json
+"""
+
+import os
+import json
+import math
+import logging
+import threading
+from bisect import bisect_left
+from app import db
+from backend.models.models import Component, PrebuiltPC
+
+RATE_TABLE_PATH = os.environ.get(
+    'SHIPPING_RATES_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'shipping_rates.json'))
+
+# Standardgewichte (kg) für Artikel ohne gepflegtes Gewicht
+CATEGORY_DEFAULT_WEIGHTS = {
+    'cpus': 0.5,
+    'gpus': 1.5,
+    'motherboards': 1.0,
+    'ram': 0.2,
+    'ssds': 0.1,
+    'cases': 3.0,
+    'psus': 1.5,
+    'coolers': 0.8
+}
+DEFAULT_COMPONENT_WEIGHT = 0.5
+DEFAULT_PREBUILT_WEIGHT = 8.0  # Kompletter PC
+
+
+class RateTable:
+    """Zonen-/Gewichtsstaffel im Speicher - wird bei Dateiänderung neu geladen"""
+
+    def __init__(self, path=RATE_TABLE_PATH):
+        self.path = path
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.currency = 'EUR'
+        self.max_parcel_weight = 31.5
+        self.min_weight = 1.0
+        self.default_zone = None
+        self._country_zone = {}
+        self._zones = {}
+
+    def _ensure_loaded(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime and self._zones:
+            return
+
+        with self._lock:
+            if mtime == self._mtime and self._zones:
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+
+            zones = {}
+            country_zone = {}
+            for name, zone in config['zones'].items():
+                bands = sorted(zone['bands'], key=lambda band: band['max_weight_kg'])
+                zones[name] = {
+                    'service': zone['service'],
+                    'delivery_time': zone['delivery_time'],
+                    # Parallele, sortierte Listen für die Suche per bisect
+                    'limits': [float(band['max_weight_kg']) for band in bands],
+                    'prices': [float(band['price']) for band in bands]
+                }
+                for country in zone.get('countries', []):
+                    country_zone[country.upper()] = name
+
+            self.currency = config.get('currency', 'EUR')
+            self.max_parcel_weight = float(config.get('max_parcel_weight_kg', 31.5))
+            self.min_weight = float(config.get('min_weight_kg', 1.0))
+            self.default_zone = config.get('default_zone')
+            self._country_zone = country_zone
+            self._zones = zones
+            self._mtime = mtime
+            logging.info(f"Versandkosten-Tabelle geladen: {len(zones)} Zonen")
+
+    def zone_for(self, country):
+        self._ensure_loaded()
+        return self._country_zone.get((country or 'DE').upper(), self.default_zone)
+
+    def rates_for(self, country, weight):
+        """
+        Versandoptionen für ein Zielland und Gesamtgewicht
+
+        Schwere Sendungen werden auf mehrere Pakete bis zum Höchstgewicht aufgeteilt.
+        """
+        self._ensure_loaded()
+        zone_name = self.zone_for(country)
+        zone = self._zones.get(zone_name)
+        if not zone:
+            return []
+
+        weight = max(self.min_weight, float(weight or 0))
+        parcels = max(1, math.ceil(weight / self.max_parcel_weight))
+        parcel_weight = weight / parcels
+
+        band = bisect_left(zone['limits'], parcel_weight)
+        if band >= len(zone['limits']):
+            return []
+
+        return [{
+            'service': zone['service'],
+            'price': round(zone['prices'][band] * parcels, 2),
+            'currency': self.currency,
+            'delivery_time': zone['delivery_time'],
+            'zone': zone_name,
+            'parcels': parcels
+        }]
+
+    def quote_many(self, weight, countries):
+        """Ein Gewicht für mehrere Zielländer bepreisen"""
+        return {country: self.rates_for(country, weight) for country in countries}
+
+
+# Global instance
+rate_table = RateTable()
+
+
+def _item_quantity(item):
+    try:
+        return max(1, int(item.get('quantity', 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def resolve_cart_weight(cart_items):
+    """
+    Gesamtgewicht eines Warenkorbs (kg)
+
+    Gewichte werden mit einer Abfrage je Produkttabelle geladen, fehlende Werte
+    über die Standardgewichte der Kategorie ergänzt.
+    """
+    component_ids = set()
+    prebuilt_ids = set()
+    for item in cart_items:
+        if item.get('type') == 'prebuilt':
+            if item.get('prebuiltId') is not None:
+                prebuilt_ids.add(int(item['prebuiltId']))
+        elif item.get('componentId') is not None:
+            component_ids.add(int(item['componentId']))
+
+    component_weights = {}
+    if component_ids:
+        rows = db.session.query(Component.id, Component.category, Component.weight_kg) \
+            .filter(Component.id.in_(component_ids)).all()
+        component_weights = {
+            row.id: row.weight_kg or CATEGORY_DEFAULT_WEIGHTS.get(row.category, DEFAULT_COMPONENT_WEIGHT)
+            for row in rows
+        }
+
+    prebuilt_weights = {}
+    if prebuilt_ids:
+        rows = db.session.query(PrebuiltPC.id, PrebuiltPC.weight_kg) \
+            .filter(PrebuiltPC.id.in_(prebuilt_ids)).all()
+        prebuilt_weights = {row.id: row.weight_kg or DEFAULT_PREBUILT_WEIGHT for row in rows}
+
+    total_weight = 0.0
+    for item in cart_items:
+        quantity = _item_quantity(item)
+        if item.get('type') == 'prebuilt':
+            weight = prebuilt_weights.get(int(item['prebuiltId'])) if item.get('prebuiltId') is not None else None
+            total_weight += (weight or DEFAULT_PREBUILT_WEIGHT) * quantity
+        else:
+            weight = component_weights.get(int(item['componentId'])) if item.get('componentId') is not None else None
+            if weight is None:
+                weight = CATEGORY_DEFAULT_WEIGHTS.get((item.get('category') or '').lower(), DEFAULT_COMPONENT_WEIGHT)
+            total_weight += weight * quantity
+
+    return round(total_weight, 3)
+
+
+def quote_cart(cart_items, countries=('DE',)):
+    """
+    Versandkosten eines Warenkorbs für ein oder mehrere Zielländer
+
+    Returns:
+        dict: {'success': True, 'weight': kg, 'quotes': {land: [optionen]}}
+    """
+    weight = max(rate_table.min_weight, resolve_cart_weight(cart_items))
+    return {
+        'success': True,
+        'weight': weight,
+        'quotes': rate_table.quote_many(weight, countries)
+    }
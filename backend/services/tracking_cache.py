@@ -0,0 +1,157 @@
+"""
+Sendungsverfolgungs-Cache für ByteDohm
+Zwischenspeicher für DHL Tracking-Antworten mit statusabhängiger Gültigkeit
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+# Gültigkeit in Sekunden je Sendungsstatus
+TTL_DELIVERED = int(os.environ.get('TRACKING_TTL_DELIVERED', '21600'))  # 6 Stunden - ändert sich nicht mehr
+TTL_IN_TRANSIT = int(os.environ.get('TRACKING_TTL_IN_TRANSIT', '600'))  # 10 Minuten
+TTL_NOT_FOUND = int(os.environ.get('TRACKING_TTL_NOT_FOUND', '900'))  # 15 Minuten (Negativ-Cache)
+TTL_ERROR = int(os.environ.get('TRACKING_TTL_ERROR', '30'))  # DHL nicht erreichbar - kurz dämpfen
+
+
+def is_delivered(result):
+    """Prüfe, ob eine Tracking-Antwort die Zustellung meldet"""
+    if not result or not result.get('success'):
+        return False
+    status = (result.get('data') or {}).get('status') or {}
+    status_code = (status.get('statusCode') or status.get('status') or '').lower()
+    return status_code == 'delivered'
+
+
+def ttl_for_result(result):
+    """Gültigkeit einer Tracking-Antwort bestimmen"""
+    if not result.get('success'):
+        return TTL_NOT_FOUND if result.get('not_found') else TTL_ERROR
+    if is_delivered(result):
+        return TTL_DELIVERED
+    return TTL_IN_TRANSIT
+
+
+class _Flight:
+    """Laufende Abfrage, auf die gleichzeitige Anfragen warten"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class TrackingCache:
+    """LRU-Cache je Tracking-Nummer mit Request-Coalescing"""
+
+    def __init__(self, maxsize=None, wait_timeout=20):
+        self.maxsize = maxsize or int(os.environ.get('TRACKING_CACHE_SIZE', '5000'))
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()  # tracking_number -> (expires_at, result)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def normalize(tracking_number):
+        return (tracking_number or '').strip().upper()
+
+    def get_or_fetch(self, tracking_number, fetch):
+        """
+        Tracking-Daten aus dem Cache liefern oder genau einmal abfragen
+
+        Args:
+            tracking_number (str): Sendungsnummer
+            fetch (callable): fetch(tracking_number) -> Ergebnis-dict
+        """
+        key = self.normalize(tracking_number)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    if not entry[1].get('success'):
+                        self.negative_hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            flight = self._inflight.get(key)
+            if flight:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            # Gleiche Sendungsnummer wird bereits abgefragt - auf Ergebnis warten
+            if flight.event.wait(self.wait_timeout) and flight.result is not None:
+                return flight.result
+            return {'success': False, 'error': 'Zeitüberschreitung bei der Sendungsverfolgung'}
+
+        result = None
+        try:
+            result = fetch(key)
+        except Exception as e:
+            logging.error(f"Tracking-Abfrage für {key} fehlgeschlagen: {e}")
+            result = {'success': False, 'error': f'Tracking-Fehler: {str(e)}'}
+        finally:
+            with self._lock:
+                if result is not None:
+                    self._store(key, result)
+                self._inflight.pop(key, None)
+            flight.result = result
+            flight.event.set()
+
+        return result
+
+    def put(self, tracking_number, result):
+        """Ergebnis aus einer Sammelabfrage übernehmen"""
+        with self._lock:
+            self._store(self.normalize(tracking_number), result)
+
+    def invalidate(self, tracking_number):
+        with self._lock:
+            self._entries.pop(self.normalize(tracking_number), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key, result):
+        ttl = ttl_for_result(result)
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.time() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Cache-Kennzahlen dieses Workers"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._inflight),
+                'hit_ratio': ((self.hits + self.coalesced) / lookups) if lookups else 0.0
+            }
+
+
+# Global instance (pro Worker-Prozess)
+tracking_cache = TrackingCache()
@@ -0,0 +1,131 @@
+"""
+Sendungsverfolgungs-Abgleich für ByteDohm
+Prüft alle versendeten Bestellungen bei DHL und setzt zugestellte Bestellungen automatisch auf 'delivered'
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from app import db
+from backend.models.models import Order
+from backend.services.dhl_integration import track_order_shipment
+from backend.services.email_service import queue_status_update_email
+from backend.services.order_rollups import refresh_stats_for_orders
+from backend.services.tracking_cache import is_delivered
+
+POLL_BATCH_SIZE = int(os.environ.get('TRACKING_POLL_BATCH_SIZE', '200'))
+POLL_MAX_WORKERS = int(os.environ.get('TRACKING_POLL_WORKERS', '8'))
+POLL_RATE_PER_SECOND = float(os.environ.get('TRACKING_POLL_RATE', '5'))
+
+
+class RateLimiter:
+    """Token-Bucket: begrenzt DHL-Anfragen pro Sekunde über alle Threads"""
+
+    def __init__(self, rate_per_second, burst=None):
+        self.rate = float(rate_per_second)
+        self.capacity = float(burst or max(1, int(rate_per_second)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def poll_shipped_orders(job, batch_size=None, max_workers=None, rate_per_second=None):
+    """
+    Alle versendeten Bestellungen mit Sendungsnummer abgleichen
+
+    Die Bestellungen werden seitenweise nach ID gelesen, die DHL-Abfragen laufen
+    parallel mit Ratenbegrenzung. Statuswechsel werden je Seite in einer
+    Transaktion gespeichert, die Kunden-E-Mails danach in die Versand-Warteschlange gestellt.
+
+    Args:
+        job (JobContext): Fortschritt des Hintergrund-Jobs
+
+    Returns:
+        dict: Zusammenfassung des Laufs
+    """
+    batch_size = batch_size or POLL_BATCH_SIZE
+    limiter = RateLimiter(rate_per_second or POLL_RATE_PER_SECOND)
+
+    open_orders = Order.query.filter(Order.status == 'shipped',
+                                     Order.tracking_number.isnot(None),
+                                     Order.tracking_number != '')
+    job.set_total(open_orders.count())
+
+    def check(tracking_number):
+        limiter.acquire()
+        return track_order_shipment(tracking_number)
+
+    summary = {'checked': 0, 'delivered': 0, 'errors': 0}
+    last_id = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers or POLL_MAX_WORKERS,
+                            thread_name_prefix='bytedohm-tracking') as executor:
+        while True:
+            batch = db.session.query(Order.id, Order.tracking_number) \
+                .filter(Order.status == 'shipped',
+                        Order.tracking_number.isnot(None),
+                        Order.tracking_number != '',
+                        Order.id > last_id) \
+                .order_by(Order.id) \
+                .limit(batch_size) \
+                .all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            # DHL-Abfragen ohne Datenbankzugriff parallel ausführen
+            results = executor.map(check, [row.tracking_number for row in batch])
+
+            delivered_ids = []
+            for row, result in zip(batch, results):
+                summary['checked'] += 1
+                if is_delivered(result):
+                    delivered_ids.append(row.id)
+                    job.advance(result={'order_id': row.id, 'tracking_number': row.tracking_number,
+                                        'status': 'delivered'})
+                elif not result.get('success') and not result.get('not_found'):
+                    summary['errors'] += 1
+                    job.advance(failed=1, result={'order_id': row.id,
+                                                  'tracking_number': row.tracking_number,
+                                                  'error': result.get('error')})
+                else:
+                    job.advance()
+
+            if delivered_ids:
+                # Nur Bestellungen umstellen, die noch 'shipped' sind (Admin könnte parallel geändert
+                # haben) - gesperrt bis zum Commit, damit Update, Kennzahlen und E-Mails übereinstimmen
+                shipped_ids = [order_id for order_id, in db.session.query(Order.id)
+                               .filter(Order.id.in_(delivered_ids), Order.status == 'shipped')
+                               .with_for_update()]
+                if shipped_ids:
+                    Order.query \
+                        .filter(Order.id.in_(shipped_ids)) \
+                        .update({Order.status: 'delivered', Order.updated_at: datetime.utcnow()},
+                                synchronize_session=False)
+                    # Massen-Update löst keine Flush-Events aus - Kundenkennzahlen direkt nachziehen
+                    refresh_stats_for_orders(shipped_ids)
+                db.session.commit()
+                summary['delivered'] += len(shipped_ids)
+
+                for order_id in shipped_ids:
+                    queue_status_update_email(order_id, 'shipped', 'delivered')
+
+            db.session.expunge_all()
+
+    logging.info(f"Tracking-Abgleich abgeschlossen: {summary}")
+    return summary
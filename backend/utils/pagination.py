@@ -0,0 +1,178 @@
+"""
+Keyset-Pagination für ByteDohm
+Blättert über (Sortierspalte, id) statt OFFSET - Seite 500 kostet so viel wie Seite 1
+"""
+
+import json
+import base64
+import logging
+from datetime import datetime, date
+from sqlalchemy import and_, or_, text
+from app import db
+
+
+def encode_cursor(value, row_id, direction='next'):
+    """Position als undurchsichtiger, URL-sicherer Cursor"""
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    payload = json.dumps({'v': value, 'i': row_id, 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, column):
+    """
+    Cursor zurück in (Wert, id, Richtung) wandeln
+
+    Returns:
+        tuple oder None bei fehlendem bzw. ungültigem Cursor
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        value = data['v']
+        if value is not None:
+            python_type = column.type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+        direction = data.get('d', 'next')
+        if direction not in ('next', 'prev'):
+            return None
+        return value, int(data['i']), direction
+    except (ValueError, TypeError, KeyError, NotImplementedError):
+        logging.debug(f"Ungültiger Pagination-Cursor: {cursor!r}")
+        return None
+
+
+def approximate_count(table_name):
+    """Geschätzte Zeilenzahl aus den InnoDB-Statistiken - ohne COUNT(*) über die Tabelle"""
+    try:
+        return db.session.execute(
+            text("SELECT TABLE_ROWS FROM information_schema.TABLES "
+                 "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"),
+            {'table': table_name}
+        ).scalar()
+    except Exception as e:
+        logging.warning(f"Zeilenschätzung für {table_name} fehlgeschlagen: {e}")
+        return None
+
+
+class KeysetPage:
+    """Eine Seite einer Keyset-Pagination (neueste zuerst)"""
+
+    def __init__(self, items, per_page, has_next, has_prev, next_cursor, prev_cursor,
+                 total=None, total_is_estimate=False):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+
+    @property
+    def has_pages(self):
+        return self.has_next or self.has_prev
+
+
+def keyset_paginate(query, order_column, id_column, cursor=None, per_page=20, total=None,
+                    total_is_estimate=False):
+    """
+    Abfrage absteigend nach (order_column, id_column) seitenweise laden
+
+    Die Bedingung wird als (a < x) OR (a = x AND id < y) formuliert, damit MySQL einen
+    Range-Scan über den Index (order_column, id) nutzt. Zeilen mit NULL in order_column
+    werden nicht erfasst.
+
+    Args:
+        query: gefilterte Query ohne ORDER BY
+        order_column: Sortierspalte, z.B. Order.created_at
+        id_column: eindeutiger Tiebreaker, z.B. Order.id
+        cursor (str): Cursor aus einer vorherigen Seite
+        per_page (int): Einträge pro Seite
+        total (int): optionale Gesamtzahl (exakt aus Kennzahlen oder geschätzt)
+
+    Returns:
+        KeysetPage
+    """
+    position = decode_cursor(cursor, order_column)
+    direction = position[2] if position else 'next'
+    rows = _keyset_query(query, order_column, id_column, position, direction, per_page).all()
+    return _keyset_page(rows, order_column.key, id_column.key, position, direction, per_page,
+                        total, total_is_estimate)
+
+
+def keyset_paginate_merged(sources, cursor=None, per_page=20, total=None, total_is_estimate=False):
+    """
+    Mehrere Abfragen (z.B. aktive Tabelle und Archiv) als eine Keyset-Folge blättern
+
+    Jede Quelle liest höchstens per_page + 1 Zeilen über ihren Index (order_column, id), die
+    Zeilen werden in Python zusammengeführt - Seite 500 kostet so viel wie Seite 1. Die ids
+    müssen über alle Quellen eindeutig sein; Zeilen mit NULL in order_column fehlen.
+
+    Args:
+        sources (list): [(query, order_column, id_column)] - gleiche Spaltennamen in allen Quellen
+
+    Returns:
+        KeysetPage
+    """
+    _, first_order, first_id = sources[0]
+    position = decode_cursor(cursor, first_order)
+    direction = position[2] if position else 'next'
+
+    rows = []
+    for query, order_column, id_column in sources:
+        rows.extend(_keyset_query(query.filter(order_column.isnot(None)), order_column, id_column,
+                                  position, direction, per_page))
+    order_key, id_key = first_order.key, first_id.key
+    rows.sort(key=lambda row: (getattr(row, order_key), getattr(row, id_key)),
+              reverse=direction == 'next')
+    return _keyset_page(rows[:per_page + 1], order_key, id_key, position, direction, per_page,
+                        total, total_is_estimate)
+
+
+def _keyset_query(query, order_column, id_column, position, direction, per_page):
+    """Bedingung und Sortierung ab der Cursor-Position - eine Zeile mehr, um zu wissen, ob es weitergeht"""
+    if position:
+        value, row_id, _ = position
+        if direction == 'next':
+            query = query.filter(or_(order_column < value,
+                                     and_(order_column == value, id_column < row_id)))
+        else:
+            query = query.filter(or_(order_column > value,
+                                     and_(order_column == value, id_column > row_id)))
+
+    if direction == 'next':
+        query = query.order_by(order_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(order_column.asc(), id_column.asc())
+    return query.limit(per_page + 1)
+
+
+def _keyset_page(rows, order_key, id_key, position, direction, per_page, total, total_is_estimate):
+    """Geladene Zeilen (in Abfragereihenfolge) in eine KeysetPage mit Cursorn umwandeln"""
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    if direction == 'next':
+        has_next, has_prev = has_more, position is not None
+    else:
+        has_next, has_prev = True, has_more
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, order_key), getattr(last, id_key), 'next')
+    if rows and has_prev:
+        first = rows[0]
+        prev_cursor = encode_cursor(getattr(first, order_key), getattr(first, id_key), 'prev')
+
+    return KeysetPage(rows, per_page, has_next and next_cursor is not None,
+                      has_prev and prev_cursor is not None, next_cursor, prev_cursor,
+                      total=total, total_is_estimate=total_is_estimate)
@@ -0,0 +1,166 @@
+"""
+Anzahl der SQL-Anweisungen je Seite prüfen
+Bestelllisten und -details werden mit 1 und mit N Zeilen gerendert - wächst die Zahl der Anweisungen mit N,
+ist ein N+1 zurück (nur lesend, nutzt vorhandene Bestellungen)
+"""
+
+import logging
+from contextlib import contextmanager
+from flask import url_for
+from sqlalchemy import event, func, select
+from app import app, db
+from backend.models.models import AdminUser, Order, OrderItem
+from backend.utils.pagination import encode_cursor
+
+
+@contextmanager
+def count_statements(engine):
+    """SQL-Anweisungen im Block zählen (before_cursor_execute) - liefert die Liste der Anweisungen"""
+    statements = []
+
+    def _count(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', _count)
+
+
+def measure_page(engine, identity, url):
+    """
+    Seite als angemeldeter Benutzer abrufen und ihre SQL-Anweisungen zählen
+
+    Der erste Abruf wärmt die Caches je Worker (Identität, Session-Token) auf, gezählt wird der zweite.
+
+    Returns:
+        tuple: (HTTP-Status, Anzahl Anweisungen)
+    """
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = identity
+        session['_fresh'] = True
+    client.get(url)
+    with count_statements(engine) as statements:
+        response = client.get(url)
+    return response.status_code, len(statements)
+
+
+def _orders_by_item_count(descending):
+    """(Bestell-ID, Kunden-ID, Positionen) der Bestellung mit den meisten bzw. wenigsten Positionen"""
+    items = func.count(OrderItem.id).label('items')
+    return db.session.execute(
+        select(Order.id, Order.customer_id, items)
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .group_by(Order.id, Order.customer_id)
+        .order_by(items.desc() if descending else items.asc(), Order.id)
+        .limit(1)
+    ).first()
+
+
+def _customers_by_order_count(descending):
+    """(Kunden-ID, Bestellungen) des Kunden mit den meisten bzw. wenigsten Bestellungen"""
+    orders = func.count(Order.id).label('orders')
+    return db.session.execute(
+        select(Order.customer_id, orders)
+        .group_by(Order.customer_id)
+        .order_by(orders.desc() if descending else orders.asc(), Order.customer_id)
+        .limit(1)
+    ).first()
+
+
+def build_cases():
+    """
+    Prüffälle aus den vorhandenen Bestellungen als (Name, (Identität, URL, Zeilen) klein, ... groß)
+
+    Braucht App- und Request-Kontext (url_for). Fälle ohne passende Daten fehlen in der Liste.
+    """
+    cases = []
+    admin = AdminUser.query.filter_by(is_active=True).order_by(AdminUser.id).first()
+
+    if admin:
+        admin_identity = admin.get_id()
+        oldest = db.session.execute(
+            select(Order.id, Order.created_at)
+            .where(Order.created_at.isnot(None))
+            .order_by(Order.created_at, Order.id)
+            .limit(2)
+        ).all()
+        total = db.session.execute(select(func.count()).select_from(Order)).scalar()
+        if len(oldest) == 2:
+            # Cursor hinter der zweitältesten Bestellung - die Seite enthält nur die älteste
+            cursor = encode_cursor(oldest[1].created_at, oldest[1].id, 'next')
+            cases.append(('admin_orders',
+                          (admin_identity, url_for('admin_orders', cursor=cursor), 1),
+                          (admin_identity, url_for('admin_orders'), total)))
+
+    smallest = _orders_by_item_count(descending=False)
+    largest = _orders_by_item_count(descending=True)
+    if smallest and largest:
+        if admin:
+            cases.append(('admin_order_detail',
+                          (admin_identity, url_for('admin_order_detail', order_id=smallest.id),
+                           smallest.items),
+                          (admin_identity, url_for('admin_order_detail', order_id=largest.id),
+                           largest.items)))
+        cases.append(('customer_order_detail',
+                      (f'customer:{smallest.customer_id}',
+                       url_for('customer_dashboard.order_detail', order_id=smallest.id), smallest.items),
+                      (f'customer:{largest.customer_id}',
+                       url_for('customer_dashboard.order_detail', order_id=largest.id), largest.items)))
+
+    fewest = _customers_by_order_count(descending=False)
+    most = _customers_by_order_count(descending=True)
+    if fewest and most:
+        cases.append(('customer_orders',
+                      (f'customer:{fewest.customer_id}', url_for('customer_dashboard.orders'),
+                       fewest.orders),
+                      (f'customer:{most.customer_id}', url_for('customer_dashboard.orders'),
+                       most.orders)))
+    return cases
+
+
+def check_query_counts():
+    """
+    Anweisungen je Seite mit 1 und N Zeilen vergleichen
+
+    Außerhalb eines App-Kontexts aufrufen: jeder Abruf läuft wie im Betrieb mit eigenem
+    App-Kontext und eigener Session, sonst verdeckt die Identity-Map ein N+1.
+
+    Returns:
+        dict: {'success': bool, 'results': [...], 'regressions': [...], 'skipped': [...]}
+    """
+    with app.test_request_context():
+        engine = db.engine
+        cases = build_cases()
+
+    names = [name for name, _, _ in cases]
+    skipped = [name for name in ('admin_orders', 'admin_order_detail', 'customer_orders',
+                                 'customer_order_detail') if name not in names]
+    results, regressions = [], []
+    for name, small, large in cases:
+        if large[2] < 2:
+            # Keine Daten mit mehreren Zeilen - Vergleich nicht aussagekräftig
+            skipped.append(name)
+            continue
+        small_status, small_count = measure_page(engine, small[0], small[1])
+        large_status, large_count = measure_page(engine, large[0], large[1])
+        entry = {
+            'name': name,
+            'rows': (small[2], large[2]),
+            'statements': (small_count, large_count),
+            'status': (small_status, large_status)
+        }
+        results.append(entry)
+        if small_status != 200 or large_status != 200:
+            entry['error'] = f'HTTP {small_status}/{large_status}'
+            regressions.append(entry)
+            logging.error(f"Query-Anzahl {name}: Seite nicht abrufbar ({entry['error']})")
+        elif large_count > small_count:
+            regressions.append(entry)
+            logging.error(f"Query-Anzahl {name}: {small_count} Anweisungen bei {small[2]} Zeilen, "
+                          f"{large_count} bei {large[2]} Zeilen")
+
+    return {'success': not regressions, 'results': results,
+            'regressions': regressions, 'skipped': skipped}
@@ -0,0 +1,119 @@
+"""
+Ausführungspläne der häufigsten ByteDohm-Abfragen prüfen
+EXPLAIN je Abfrage - ein Full Table Scan ohne den erwarteten Index gilt als Regression
+"""
+
+import logging
+from datetime import datetime
+from sqlalchemy import select, text
+from sqlalchemy.dialects import mysql
+from app import db
+from backend.models.models import (Customer, Order, Configuration, Component, CustomerSession,
+                                   Invoice, CustomerSearchIndex)
+
+# Tabellen unterhalb dieser Zeilenzahl darf MySQL bewusst komplett lesen
+SMALL_TABLE_ROWS = 1000
+
+# (Name, Abfrage, erwarteter Index) - Werte sind Platzhalter, es zählt nur der Plan
+HOT_QUERIES = [
+    ('customer_by_email',
+     lambda: select(Customer.id).where(Customer.email == 'kunde@example.com'),
+     'ix_customers_email'),
+    ('order_by_stripe_session',
+     lambda: select(Order.id).where(Order.stripe_session_id == 'cs_test_123'),
+     'ix_orders_stripe_session'),
+    ('customer_orders',
+     lambda: select(Order.id).where(Order.customer_id == 1).order_by(Order.created_at.desc()),
+     'ix_orders_customer_created'),
+    ('admin_orders_by_status',
+     lambda: select(Order.id).where(Order.status == 'pending')
+     .order_by(Order.created_at.desc(), Order.id.desc()).limit(25),
+     'ix_orders_status_created'),
+    ('admin_orders_by_payment',
+     lambda: select(Order.id).where(Order.payment_status == 'paid')
+     .order_by(Order.created_at.desc(), Order.id.desc()).limit(25),
+     'ix_orders_payment_created'),
+    ('customer_configurations',
+     lambda: select(Configuration.id).where(Configuration.customer_id == 1)
+     .order_by(Configuration.created_at.desc()),
+     'ix_configurations_customer_created'),
+    ('active_components_by_category',
+     lambda: select(Component.id).where(Component.category == 'cpu', Component.is_active.is_(True)),
+     'ix_components_category_active'),
+    ('session_by_token',
+     lambda: select(CustomerSession.customer_id)
+     .where(CustomerSession.session_token == 'token', CustomerSession.is_active.is_(True)),
+     'session_token'),
+    ('expired_sessions',
+     lambda: select(CustomerSession.id).where(CustomerSession.is_active.is_(True),
+                                              CustomerSession.expires_at < datetime(2000, 1, 1)),
+     'ix_customer_sessions_active_expires'),
+    ('invoices_by_order',
+     lambda: select(Invoice.id).where(Invoice.order_id == 1),
+     'ix_invoices_order_id'),
+    ('newsletter_subscribers',
+     lambda: select(Customer.email).where(Customer.newsletter_subscription.is_(True)),
+     'ix_customers_newsletter'),
+    ('customer_fulltext_search',
+     lambda: select(CustomerSearchIndex.customer_id)
+     .where(CustomerSearchIndex.document.match('+muster*')),
+     'ft_customer_search_document'),
+]
+
+
+def compile_statement(statement):
+    """Abfrage mit eingesetzten Werten als MySQL-SQL"""
+    return str(statement.compile(dialect=mysql.dialect(), compile_kwargs={'literal_binds': True}))
+
+
+def explain(statement, connection=None):
+    """EXPLAIN-Zeilen einer Abfrage als dicts"""
+    connection = connection or db.session.connection()
+    result = connection.execute(text('EXPLAIN ' + compile_statement(statement)))
+    return [dict(row._mapping) for row in result]
+
+
+def _keys(value):
+    return set(value.split(',')) if value else set()
+
+
+def check_query_plans(queries=None):
+    """
+    Pläne aller Hot Queries prüfen
+
+    Returns:
+        dict: {'success': bool, 'results': [...], 'regressions': [...], 'warnings': [...]}
+    """
+    if db.engine.dialect.name != 'mysql':
+        return {'success': False, 'error': 'EXPLAIN-Prüfung nur unter MySQL möglich',
+                'results': [], 'regressions': [], 'warnings': []}
+
+    results, regressions, warnings = [], [], []
+    for name, build_statement, expected_index in queries or HOT_QUERIES:
+        rows = explain(build_statement())
+        plan = rows[0] if rows else {}
+        possible = _keys(plan.get('possible_keys'))
+        entry = {
+            'name': name,
+            'expected_index': expected_index,
+            'type': plan.get('type'),
+            'key': plan.get('key'),
+            'possible_keys': sorted(possible),
+            'rows': plan.get('rows')
+        }
+        results.append(entry)
+
+        if plan.get('type') != 'ALL':
+            continue
+        if expected_index not in possible:
+            regressions.append(entry)
+            logging.error(f"Query-Plan {name}: Full Table Scan, Index {expected_index} fehlt")
+        elif (plan.get('rows') or 0) < SMALL_TABLE_ROWS:
+            # Optimizer liest kleine Tabellen lieber komplett - unkritisch, solange der Index existiert
+            warnings.append(entry)
+        else:
+            regressions.append(entry)
+            logging.error(f"Query-Plan {name}: Full Table Scan trotz Index {expected_index}")
+
+    return {'success': not regressions, 'results': results,
+            'regressions': regressions, 'warnings': warnings}
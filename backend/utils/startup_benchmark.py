@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Kaltstart-Benchmark für ByteDohm
+Misst, wie lange ein frischer Worker-Prozess für `import app` braucht und ob dabei die Datenbank berührt wird
+
+Aufruf: python -m backend.utils.startup_benchmark [--runs 5] [--first-request /]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Läuft in einem eigenen Python-Prozess je Messung (wie ein neuer Passenger-Worker)
+CHILD_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+connections = []
+event.listen(Engine, 'connect', lambda *args: connections.append(time.perf_counter()))
+import app
+imported = time.perf_counter()
+result = {'import_seconds': imported - started, 'db_connections': len(connections)}
+path = sys.argv[1] if len(sys.argv) > 1 else None
+if path:
+    status = app.app.test_client().get(path).status_code
+    result['first_request_seconds'] = time.perf_counter() - imported
+    result['first_request_status'] = status
+print('BENCHMARK ' + json.dumps(result))
+'''
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure_once(first_request=None):
+    """Ein Kaltstart in einem neuen Prozess - Ergebnis als dict"""
+    command = [sys.executable, '-c', CHILD_SCRIPT]
+    if first_request:
+        command.append(first_request)
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith('BENCHMARK '):
+            return json.loads(line[len('BENCHMARK '):])
+    raise RuntimeError(f"Kaltstart fehlgeschlagen:\n{completed.stderr[-2000:]}")
+
+
+def _summary(values):
+    return {
+        'min': min(values),
+        'median': statistics.median(values),
+        'max': max(values)
+    }
+
+
+def run_benchmark(runs=5, first_request=None):
+    """
+    Mehrere Kaltstarts messen
+
+    Returns:
+        dict: Import-Zeiten (min/median/max), DB-Verbindungen beim Import, optional erster Request
+    """
+    results = [measure_once(first_request) for _ in range(runs)]
+    report = {
+        'runs': runs,
+        'import_seconds': _summary([result['import_seconds'] for result in results]),
+        'db_connections_on_import': max(result['db_connections'] for result in results)
+    }
+    if first_request:
+        report['first_request'] = first_request
+        report['first_request_seconds'] = _summary([result['first_request_seconds'] for result in results])
+        report['first_request_status'] = results[-1]['first_request_status']
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kaltstart-Zeit eines Workers messen')
+    parser.add_argument('--runs', type=int, default=5, help='Anzahl Kaltstarts')
+    parser.add_argument('--first-request', default=None, help='Zusätzlich diesen Pfad einmal abrufen, z.B. /')
+    parser.add_argument('--json', action='store_true', help='Ergebnis als JSON ausgeben')
+    args = parser.parse_args()
+
+    report = run_benchmark(runs=args.runs, first_request=args.first_request)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    timing = report['import_seconds']
+    print(f"=== KALTSTART ({report['runs']} Läufe) ===")
+    print(f"import app: min {timing['min'] * 1000:.0f} ms, median {timing['median'] * 1000:.0f} ms, "
+          f"max {timing['max'] * 1000:.0f} ms")
+    print(f"DB-Verbindungen beim Import: {report['db_connections_on_import']}")
+    if args.first_request:
+        timing = report['first_request_seconds']
+        print(f"Erster Request {args.first_request} (HTTP {report['first_request_status']}): "
+              f"median {timing['median'] * 1000:.0f} ms")
+    if report['db_connections_on_import']:
+        print("WARNUNG: Der Import öffnet Datenbankverbindungen - AUTO_INIT_DB gesetzt?")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
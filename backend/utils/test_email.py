@@ -45,7 +45,8 @@ def test_email_service():
     """
     
     print(f"\nSende Test-E-Mail an: {test_email}")
-    success = email_service._send_email(test_email, subject, html_body, text_body)
+    success = email_service._send_email(test_email, subject, html_body, text_body,
+                                        mail_type='test')
     
     if success:
         print("✅ E-Mail-Test ERFOLGREICH!")
@@ -1,23 +1,60 @@
+import os
 import secrets
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import session, request, redirect, url_for, flash, current_app
-from flask_login import LoginManager, login_user, logout_user, current_user
-from app import app, db
+from flask_login import login_user, logout_user, current_user
+from sqlalchemy.orm import joinedload
+from app import db
 from backend.models.models import Customer, CustomerSession
+from backend.services.identity_cache import get_identity, invalidate_identity
 
-# Initialize Flask-Login for customer authentication
-customer_login_manager = LoginManager()
-customer_login_manager.init_app(app)
-customer_login_manager.login_view = 'customer_auth.login'
-customer_login_manager.login_message = 'Bitte melden Sie sich an, um auf diese Seite zuzugreifen.'
-customer_login_manager.login_message_category = 'info'
+# Customers share the app's LoginManager (see app.py); ids are typed as 'customer:<id>'
 
 
-@customer_login_manager.user_loader
-def load_customer(customer_id):
-    """Load customer for Flask-Login"""
-    return Customer.query.get(int(customer_id))
+class SessionTokenCache:
+    """Per-worker LRU cache of session token -> (customer_id, expires_at) with a short TTL"""
+    
+    def __init__(self, maxsize=None, ttl=None):
+        self.maxsize = maxsize or int(os.environ.get('CUSTOMER_SESSION_CACHE_SIZE', '10000'))
+        # Bounds how long a session revoked on another worker stays valid here
+        self.ttl = ttl or int(os.environ.get('CUSTOMER_SESSION_CACHE_TTL', '60'))
+        self._entries = OrderedDict()  # token -> (cached_until, customer_id, expires_at)
+        self._lock = threading.Lock()
+    
+    def get(self, token):
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._entries.get(token)
+            if not entry:
+                return None
+            cached_until, customer_id, expires_at = entry
+            if cached_until <= now or expires_at <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return customer_id
+    
+    def put(self, token, customer_id, expires_at):
+        cached_until = min(expires_at, datetime.utcnow() + timedelta(seconds=self.ttl))
+        with self._lock:
+            self._entries[token] = (cached_until, customer_id, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+session_token_cache = SessionTokenCache()
 
 
 def customer_login_required(f):
@@ -52,6 +89,7 @@ def create_customer_session(customer, ip_address=None, user_agent=None):
     
     # Store session token in Flask session
     session['customer_session_token'] = session_token
+    session_token_cache.put(session_token, customer.id, expires_at)
     
     return customer_session
 
@@ -70,8 +108,17 @@ def validate_customer_session():
         if not session_token:
             return None
         
-        # Find active session
-        customer_session = CustomerSession.query.filter_by(
+        customer_id = session_token_cache.get(session_token)
+        if customer_id is not None:
+            customer = get_identity('customer', customer_id)
+            if customer:
+                return customer
+            session_token_cache.invalidate(session_token)
+        
+        # Cache miss: load session and customer in one round trip
+        customer_session = CustomerSession.query.options(
+            joinedload(CustomerSession.customer)
+        ).filter_by(
             session_token=session_token,
             is_active=True
         ).first()
@@ -86,6 +133,7 @@ def validate_customer_session():
             session.pop('customer_session_token', None)
             return None
         
+        session_token_cache.put(session_token, customer_session.customer_id, customer_session.expires_at)
         return customer_session.customer
     except Exception as e:
         print(f"Error validating customer session: {e}")
@@ -96,7 +144,11 @@ def invalidate_customer_session():
     """Invalidate current customer session"""
     session_token = session.get('customer_session_token')
     
+    if current_user.is_authenticated:
+        invalidate_identity(current_user)
+    
     if session_token:
+        session_token_cache.invalidate(session_token)
         customer_session = CustomerSession.query.filter_by(
             session_token=session_token,
             is_active=True
@@ -110,18 +162,15 @@ def invalidate_customer_session():
 
 
 def cleanup_expired_sessions():
-    """Clean up expired customer sessions"""
-    expired_sessions = CustomerSession.query.filter(
+    """Deactivate expired customer sessions in a single UPDATE (rows are purged by `flask run-retention`)"""
+    expired = CustomerSession.query.filter(
         CustomerSession.expires_at < datetime.utcnow(),
         CustomerSession.is_active == True
-    ).all()
-    
-    for session_obj in expired_sessions:
-        session_obj.is_active = False
+    ).update({CustomerSession.is_active: False}, synchronize_session=False)
     
     db.session.commit()
     
-    return len(expired_sessions)
+    return expired
 
 
 def get_customer_ip():
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_user, logout_user, current_user
 from app import db
 from backend.models.models import Customer
+from backend.services.login_throttle import check_login
 from customer.auth import (
     create_customer_session, 
     invalidate_customer_session,
@@ -37,7 +38,12 @@ def login():
         # Find customer
         customer = Customer.query.filter_by(email=email).first()
         
-        if not customer or not customer.check_password(password):
+        result = check_login(customer, password, get_customer_ip(), f'customer:{email}')
+        if result.get('status') == 429:
+            flash(result['error'], 'error')
+            return render_template('customer/auth/login.html'), 429, {'Retry-After': str(result['retry_after'])}
+        
+        if not result['success']:
             flash('Ungültige E-Mail oder Passwort.', 'error')
             return render_template('customer/auth/login.html')
         
@@ -190,7 +196,11 @@ def api_login():
         # Find customer
         customer = Customer.query.filter_by(email=email).first()
         
-        if not customer or not customer.check_password(password):
+        result = check_login(customer, password, get_customer_ip(), f'customer:{email}')
+        if result.get('status') == 429:
+            return jsonify({'success': False, 'error': result['error']}), 429, {'Retry-After': str(result['retry_after'])}
+        
+        if not result['success']:
             return jsonify({'success': False, 'error': 'Ungültige E-Mail oder Passwort'}), 401
         
         # Login customer
@@ -1,9 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import current_user
 from sqlalchemy import func, desc
+from sqlalchemy.orm import contains_eager, selectinload
 from app import db
 from customer.auth import customer_login_required
-from backend.models.models import Customer, Order, Configuration, Component, Invoice
+from backend.models.models import Customer, Order, Configuration, Invoice, ArchivedOrder, ArchivedInvoice
+from backend.services.order_rollups import get_customer_stats
+from backend.utils.pagination import keyset_paginate_merged
+from backend.services.component_loader import resolve_configuration, resolve_configurations
 
 # Create blueprint for customer dashboard
 customer_dashboard = Blueprint('customer_dashboard', __name__, 
@@ -18,9 +22,10 @@ def dashboard():
     """Customer dashboard overview"""
     customer = current_user
     
-    # Get customer statistics
-    total_orders = len(customer.orders)
-    total_spent = customer.get_total_spent()
+    # Get customer statistics from the customer_stats rollup
+    customer_stats = get_customer_stats(customer.id)
+    total_orders = customer_stats.order_count
+    total_spent = customer_stats.paid_total
     recent_orders = customer.get_recent_orders(limit=5)
     
     # Get customer configurations
@@ -29,10 +34,7 @@ def dashboard():
     ).order_by(desc(Configuration.created_at)).limit(5).all()
     
     # Order status counts
-    order_status_counts = {}
-    for order in customer.orders:
-        status = order.status
-        order_status_counts[status] = order_status_counts.get(status, 0) + 1
+    order_status_counts = customer_stats.status_counts()
     
     stats = {
         'total_orders': total_orders,
@@ -51,17 +53,13 @@ def orders():
     """Customer orders page"""
     customer = current_user
     
-    # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
-    
-    # Get orders with pagination
-    orders = Order.query.filter_by(customer_id=customer.id).order_by(
-        desc(Order.created_at)
-    ).paginate(
-        page=page, 
-        per_page=per_page, 
-        error_out=False
+    # Active orders and orders_archive as one keyset stream over (created_at, id) -
+    # the total comes from the customer_stats rollup, which still counts archived orders
+    cursor = request.args.get('cursor')
+    orders = keyset_paginate_merged(
+        [(Order.query.filter_by(customer_id=customer.id), Order.created_at, Order.id),
+         (ArchivedOrder.query.filter_by(customer_id=customer.id), ArchivedOrder.created_at, ArchivedOrder.id)],
+        cursor=cursor, per_page=10, total=get_customer_stats(customer.id).order_count
     )
     
     return render_template('customer/dashboard/orders.html', orders=orders)
@@ -73,10 +71,23 @@ def order_detail(order_id):
     """Customer order detail page"""
     customer = current_user
     
-    order = Order.query.filter_by(
+    order = Order.query.options(
+        selectinload(Order.order_items),
+        selectinload(Order.invoice)
+    ).filter_by(
         id=order_id, 
         customer_id=customer.id
-    ).first_or_404()
+    ).first()
+    
+    if order is None:
+        # Fall through to the archive for old, closed orders
+        order = ArchivedOrder.query.options(
+            selectinload(ArchivedOrder.order_items),
+            selectinload(ArchivedOrder.invoice)
+        ).filter_by(
+            id=order_id,
+            customer_id=customer.id
+        ).first_or_404()
     
     return render_template('customer/dashboard/order_detail.html', order=order)
 
@@ -100,7 +111,10 @@ def configurations():
         error_out=False
     )
     
-    return render_template('customer/dashboard/configurations.html', configs=configs)
+    # Parts of all configurations on this page in one query
+    parts = resolve_configurations(configs.items)
+    
+    return render_template('customer/dashboard/configurations.html', configs=configs, parts=parts)
 
 
 @customer_dashboard.route('/api/configuration/<int:config_id>')
@@ -119,28 +133,8 @@ def get_configuration_api(config_id):
         return jsonify({'success': False, 'error': 'Konfiguration nicht gefunden'}), 404
     
     try:
-        # Parse components from JSON
-        import json
-        components_data = json.loads(config.components)
-        
-        # Fetch component details for each category
-        enriched_components = {}
-        
-        for category, component_id in components_data.items():
-            if component_id:
-                # Get component from database
-                component = Component.query.filter_by(
-                    id=component_id,
-                    category=category + 's' if category != 'ram' else 'ram'
-                ).first()
-                
-                if component:
-                    enriched_components[category] = {
-                        'id': component.id,
-                        'name': component.name,
-                        'price': component.price,
-                        'category': component.category
-                    }
+        # Resolve all components with a single query
+        enriched_components = resolve_configuration(config)
         
         return jsonify({
             'success': True,
@@ -265,17 +259,20 @@ def change_password():
 @customer_login_required  
 def invoices():
     """Customer invoices page"""
-    # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
+    query = db.session.query(Invoice).join(Order).filter(Order.customer_id == current_user.id)
+    archived_query = db.session.query(ArchivedInvoice).join(ArchivedOrder).filter(
+        ArchivedOrder.customer_id == current_user.id
+    )
     
-    # Get invoices for customer's orders with pagination
-    invoices = db.session.query(Invoice).join(Order).filter(
-        Order.customer_id == current_user.id
-    ).order_by(Invoice.issue_date.desc()).paginate(
-        page=page, 
-        per_page=per_page, 
-        error_out=False
+    # Active and archived invoices as one keyset stream over (issue_date, id);
+    # the order is already joined - fill invoice.order from the same row.
+    # No total: there is no invoice rollup, and an exact COUNT would make every page cost a full join
+    cursor = request.args.get('cursor')
+    invoices = keyset_paginate_merged(
+        [(query.options(contains_eager(Invoice.order)), Invoice.issue_date, Invoice.id),
+         (archived_query.options(contains_eager(ArchivedInvoice.order)),
+          ArchivedInvoice.issue_date, ArchivedInvoice.id)],
+        cursor=cursor, per_page=10
     )
     
     return render_template('customer/dashboard/invoices.html', invoices=invoices)
@@ -286,10 +283,21 @@ def invoices():
 def invoice_detail(invoice_id):
     """Customer invoice detail page"""
     # Ensure invoice belongs to current customer
-    invoice = db.session.query(Invoice).join(Order).filter(
+    invoice = db.session.query(Invoice).join(Order).options(
+        contains_eager(Invoice.order).selectinload(Order.order_items)
+    ).filter(
         Invoice.id == invoice_id,
         Order.customer_id == current_user.id
-    ).first_or_404()
+    ).first()
+    
+    if invoice is None:
+        # Fall through to the archive for invoices of archived orders
+        invoice = db.session.query(ArchivedInvoice).join(ArchivedOrder).options(
+            contains_eager(ArchivedInvoice.order).selectinload(ArchivedOrder.order_items)
+        ).filter(
+            ArchivedInvoice.id == invoice_id,
+            ArchivedOrder.customer_id == current_user.id
+        ).first_or_404()
     
     return render_template('customer/dashboard/invoice_detail.html', invoice=invoice)
 
@@ -298,13 +306,13 @@ def invoice_detail(invoice_id):
 @customer_login_required
 def api_quick_stats():
     """API endpoint for quick customer statistics"""
-    customer = current_user
+    customer_stats = get_customer_stats(current_user.id)
     
     stats = {
-        'total_orders': len(customer.orders),
-        'total_spent': float(customer.get_total_spent()),
-        'pending_orders': len([o for o in customer.orders if o.status == 'pending']),
-        'completed_orders': len([o for o in customer.orders if o.status == 'delivered'])
+        'total_orders': customer_stats.order_count,
+        'total_spent': float(customer_stats.paid_total),
+        'pending_orders': customer_stats.pending_count,
+        'completed_orders': customer_stats.delivered_count
     }
     
     return jsonify(stats)